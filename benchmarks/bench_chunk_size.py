@@ -0,0 +1,79 @@
+"""Cost of parsing chunk-size lines in chunked request bodies.
+
+First times ``decode_chunk_size_line`` alone on a million size lines,
+with and without a chunk extension, next to the replace/split/generator
+parser it replaced. Then decodes a million-chunk body through
+``ChunkedReader.parse_chunked`` with each of the two parsers.
+
+    uv run python -m benchmarks.bench_chunk_size
+"""
+
+import io
+import socket
+import time
+from collections.abc import Callable
+from typing import cast
+from unittest import mock
+
+from web_server.errors import InvalidChunkSize
+from web_server.http import SocketReader, reader
+
+LINES = 1_000_000
+CHUNKS = 1_000_000
+CHUNK_DATA = b"x" * 16
+SIZE_LINES = {"plain": b"100\r\n", "extension": b"100;name=value\r\n"}
+
+
+def legacy_decode_chunk_size_line(line: bytes) -> int:
+    chunk_size_line = line.replace(b"\r\n", b"")
+    chunk_size, *_ = chunk_size_line.split(b";", 1)
+    if not chunk_size or any(n not in b"0123456789abcdefABCDEF" for n in chunk_size):
+        raise InvalidChunkSize(chunk_size)
+    return int(chunk_size.rstrip(b" \t"), 16)
+
+
+class BufferSocket:
+    def __init__(self, data: bytes):
+        self.buf = io.BytesIO(data)
+
+    def recv(self, size: int) -> bytes:
+        return self.buf.read(size)
+
+
+def time_lines(decode: Callable[[bytes], int], line: bytes) -> float:
+    started = time.perf_counter()
+    for _ in range(LINES):
+        decode(line)
+    return time.perf_counter() - started
+
+
+def time_body(decode: Callable[[bytes], int], body: bytes) -> float:
+    sock = cast(socket.socket, BufferSocket(body))
+    with mock.patch.object(reader, "decode_chunk_size_line", decode):
+        started = time.perf_counter()
+        reader.ChunkedReader.parse_chunked(SocketReader(sock, max_chunk=65536))
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parsers = {
+        "legacy": legacy_decode_chunk_size_line,
+        "current": reader.decode_chunk_size_line,
+    }
+    print(f"{'size line':>10}", *(f"{name + ' ns':>12}" for name in parsers))
+    for label, line in SIZE_LINES.items():
+        results = [
+            time_lines(decode, line) / LINES * 1e9 for decode in parsers.values()
+        ]
+        print(f"{label:>10}", *(f"{result:>12.1f}" for result in results))
+
+    chunk = b"%x\r\n%s\r\n" % (len(CHUNK_DATA), CHUNK_DATA)
+    body = chunk * CHUNKS + b"0\r\n\r\n"
+    print(f"\n{CHUNKS} chunks of {len(CHUNK_DATA)} bytes through ChunkedReader")
+    for name, decode in parsers.items():
+        elapsed = time_body(decode, body)
+        print(f"{name:>10} {elapsed:>8.2f} s {CHUNKS / elapsed:>12.0f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
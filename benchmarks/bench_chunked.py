@@ -0,0 +1,67 @@
+"""Throughput of chunked response framing over a local socket pair.
+
+Compares joining size line, payload and CRLF into one bytes object per
+chunk, sending them as separate buffers of one vectored write, and
+``frame_chunk``, which joins small chunks and writes large ones vectored.
+
+    uv run python -m benchmarks.bench_chunked
+"""
+
+import socket
+import threading
+import time
+from collections.abc import Callable
+
+from web_server.http import LAST_CHUNK, SocketWriter, frame_chunk
+
+CHUNK_SIZES = {"1 KB": 1024, "64 KB": 64 * 1024, "1 MB": 1024 * 1024}
+BYTES_PER_RUN = 256 * 1024 * 1024
+
+
+def joined(writer: SocketWriter, data: bytes) -> None:
+    writer.write(b"".join([b"%x\r\n" % len(data), data, b"\r\n"]))
+
+
+def vectored(writer: SocketWriter, data: bytes) -> None:
+    writer.writev((b"%x\r\n" % len(data), data, b"\r\n"))
+
+
+def framed(writer: SocketWriter, data: bytes) -> None:
+    writer.writev(frame_chunk(data))
+
+
+def drain(sock: socket.socket) -> None:
+    while sock.recv(1024 * 1024):
+        pass
+
+
+def run(send_chunk: Callable[[SocketWriter, bytes], None], chunk_size: int) -> float:
+    server_side, client_side = socket.socketpair()
+    server_side.setblocking(False)
+    reader = threading.Thread(target=drain, args=(client_side,))
+    reader.start()
+
+    data = b"x" * chunk_size
+    writer = SocketWriter(server_side)
+    started = time.perf_counter()
+    for _ in range(BYTES_PER_RUN // chunk_size):
+        send_chunk(writer, data)
+    writer.write(LAST_CHUNK)
+    elapsed = time.perf_counter() - started
+
+    server_side.close()
+    reader.join()
+    client_side.close()
+    return writer.bytes_written / elapsed
+
+
+def main() -> None:
+    senders = (joined, vectored, framed)
+    print(f"{'chunk':>8}", *(f"{send.__name__ + ' MB/s':>15}" for send in senders))
+    for label, chunk_size in CHUNK_SIZES.items():
+        results = [run(send, chunk_size) / 1024 / 1024 for send in senders]
+        print(f"{label:>8}", *(f"{result:>15.1f}" for result in results))
+
+
+if __name__ == "__main__":
+    main()
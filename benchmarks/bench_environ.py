@@ -0,0 +1,126 @@
+"""Per-request cost of building the WSGI environ.
+
+Builds the environ for a browser-like GET request with the builder
+``WSGIEnviron.dict()`` used before, which assigned every CGI key into a new
+dict and then merged a second dict of every ``HTTP_*`` key into it, and with
+the one used now, which copies the listener's template, assigns the
+per-request keys and adds the headers with one update. Each builder is timed
+on its own and followed by three access patterns: reading a few CGI keys,
+reading one header, and iterating the whole mapping.
+
+    uv run python -m benchmarks.bench_environ
+"""
+
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from web_server import config, http, wsgi
+
+REQUESTS = 200_000
+ROUNDS = 5
+
+HEADERS = [
+    ("Host", "example.com"),
+    ("User-Agent", "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Firefox/128.0"),
+    ("Accept", "text/html,application/xhtml+xml,*/*;q=0.8"),
+    ("Accept-Language", "en-US,en;q=0.5"),
+    ("Accept-Encoding", "gzip, deflate, br"),
+    ("Connection", "keep-alive"),
+    ("Cookie", "session=0123456789abcdef; theme=dark"),
+    ("Upgrade-Insecure-Requests", "1"),
+    ("Cache-Control", "max-age=0"),
+]
+
+
+def legacy_dict(environ: wsgi.WSGIEnviron) -> dict[str, Any]:
+    constants = environ.base
+    base_environ = {
+        "REQUEST_METHOD": environ.request_method,
+        "SCRIPT_NAME": constants["SCRIPT_NAME"],
+        "PATH_INFO": environ.path_info,
+        "QUERY_STRING": environ.query_string,
+        "CONTENT_TYPE": environ.content_type,
+        "CONTENT_LENGTH": environ.content_length,
+        "SERVER_NAME": constants["SERVER_NAME"],
+        "SERVER_PORT": constants["SERVER_PORT"],
+        "SERVER_PROTOCOL": environ.server_protocol,
+        "wsgi.version": constants["wsgi.version"],
+        "wsgi.url_scheme": constants["wsgi.url_scheme"],
+        "wsgi.input": environ.wsgi_input,
+        "wsgi.errors": constants["wsgi.errors"],
+        "wsgi.multithread": constants["wsgi.multithread"],
+        "wsgi.multiprocess": constants["wsgi.multiprocess"],
+        "wsgi.run_once": constants["wsgi.run_once"],
+    }
+    return base_environ | {name: value for name, value in environ.http_headers}
+
+
+def build_only(environ: dict[str, Any]) -> None:
+    pass
+
+
+def read_cgi_keys(environ: dict[str, Any]) -> None:
+    environ["REQUEST_METHOD"]
+    environ["PATH_INFO"]
+    environ.get("QUERY_STRING")
+    environ["wsgi.input"]
+
+
+def read_header(environ: dict[str, Any]) -> None:
+    environ.get("HTTP_COOKIE")
+
+
+def iterate(environ: dict[str, Any]) -> None:
+    for _ in environ.items():
+        pass
+
+
+def best_rate(
+    builder: Callable[[wsgi.WSGIEnviron], dict[str, Any]],
+    access: Callable[[dict[str, Any]], None],
+    environ: wsgi.WSGIEnviron,
+) -> float:
+    elapsed = min(
+        timeit.repeat(lambda: access(builder(environ)), number=REQUESTS, repeat=ROUNDS)
+    )
+    return elapsed / REQUESTS * 1e9
+
+
+def main() -> None:
+    request = http.Request(
+        method="GET",
+        path="/articles/42",
+        query="page=2",
+        fragment="",
+        version=(1, 1),
+        headers=HEADERS,
+        body=None,
+        trailers=[],
+    )
+    cfg = config.Config.default()
+    environ = wsgi.WSGIEnviron.build(
+        cfg=cfg,
+        template=wsgi.WSGIEnviron.template(
+            cfg=cfg,
+            server=("localhost", 8000),
+            errors=wsgi.WSGIErrorStream.with_stderr(),
+        ),
+        request=request,
+    )
+    builders = {"merge": legacy_dict, "copy": wsgi.WSGIEnviron.dict}
+    accesses = {
+        "build only": build_only,
+        "cgi keys": read_cgi_keys,
+        "one header": read_header,
+        "iterate": iterate,
+    }
+    print(f"{len(HEADERS)} request headers, best of {ROUNDS} x {REQUESTS} builds")
+    print(f"{'access':>12}", *(f"{name + ' ns':>10}" for name in builders))
+    for label, access in accesses.items():
+        results = [best_rate(builder, access, environ) for builder in builders.values()]
+        print(f"{label:>12}", *(f"{result:>10.1f}" for result in results))
+
+
+if __name__ == "__main__":
+    main()
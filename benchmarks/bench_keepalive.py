@@ -0,0 +1,118 @@
+"""Objects allocated per request with and without keep-alive.
+
+Sends the same requests to ``Worker.handle`` over a socket pair in two
+ways: one connection per request with keep-alive turned off, and all of
+them pipelined on a single keep-alive connection, where the parser,
+socket reader, request body, connection and cycle are reset and reused
+between requests. Reports how many of each per-connection and
+per-request object were constructed per request, and requests/s.
+
+    uv run python -m benchmarks.bench_keepalive
+"""
+
+import collections
+import contextlib
+import socket
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+from web_server import config, connection, cycle, http, wsgi
+from web_server.http import body, parser
+from web_server.worker import Worker
+
+REQUESTS = 2000
+KEEPALIVE_TIMEOUT = 2.0
+REQUEST = b"GET /health HTTP/1.1\r\nHost: example.com\r\nAccept: */*\r\n\r\n"
+COUNTED = (
+    connection.Connection,
+    http.SocketReader,
+    parser.Parser,
+    body.RequestBody,
+    cycle.Cycle,
+    http.Request,
+    wsgi.WSGIEnviron,
+)
+
+
+def app(environ, start_response):
+    start_response("204 No Content", [])
+    return []
+
+
+@contextlib.contextmanager
+def counting(classes: tuple[type, ...]) -> Iterator[collections.Counter]:
+    counts: collections.Counter = collections.Counter()
+    originals = {cls: cls.__init__ for cls in classes}
+
+    def counted(cls: type, init: Callable) -> Callable:
+        def __init__(self, *args, **kwargs):
+            counts[cls.__name__] += 1
+            init(self, *args, **kwargs)
+
+        return __init__
+
+    for cls, init in originals.items():
+        cls.__init__ = counted(cls, init)
+    try:
+        yield counts
+    finally:
+        for cls, init in originals.items():
+            cls.__init__ = init
+
+
+def serve(worker: Worker, requests: int) -> None:
+    server, client = socket.socketpair()
+    server.setblocking(False)
+    with server, client:
+        # responses are read while the worker writes them, so a full socket
+        # buffer never stalls it
+        reader = threading.Thread(target=drain, args=(client,))
+        reader.start()
+        client.sendall(REQUEST * requests)
+        client.shutdown(socket.SHUT_WR)
+        worker.handle(server, None)
+        server.shutdown(socket.SHUT_WR)
+        reader.join()
+
+
+def drain(sock: socket.socket) -> None:
+    while sock.recv(65536):
+        pass
+
+
+def run(worker: Worker, connections: int, per_connection: int) -> None:
+    for _ in range(connections):
+        serve(worker, per_connection)
+
+
+def main() -> None:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        modes = {
+            "close": (0, REQUESTS, 1),
+            "keep-alive": (KEEPALIVE_TIMEOUT, 1, REQUESTS),
+        }
+        names = [cls.__name__ for cls in COUNTED]
+        print(f"{'mode':>10} {'req/s':>8}", *(f"{name:>14}" for name in names))
+        for mode, (keepalive_timeout, connections, per_connection) in modes.items():
+            cfg = config.Config.custom(
+                response=config.ResponseConfig.custom(
+                    keepalive_timeout=keepalive_timeout
+                )
+            )
+            worker = Worker(server_socket=listener, app=app, cfg=cfg)
+            with counting(COUNTED) as counts:
+                run(worker, connections, per_connection)
+            started = time.perf_counter()
+            run(worker, connections, per_connection)
+            elapsed = time.perf_counter() - started
+            worker.error_stream.close()
+            print(
+                f"{mode:>10} {REQUESTS / elapsed:>8.0f}",
+                *(f"{counts[name] / REQUESTS:>14.4f}" for name in names),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Memory held per idle connection and per in-flight request.
+
+An idle connection is what a worker keeps for an open socket between
+requests: the ``Connection`` with its ``SocketWriter``, the
+``SocketReader`` and the parser. An in-flight request is everything
+built while one is being served: the parsed ``Request`` with its headers
+and body readers, the ``WSGIEnviron`` and the environ dict handed to the
+application, the ``Cycle`` and the drafted ``Response``.
+
+Many of each are kept alive at once under tracemalloc, and the bytes
+allocated are divided by their number. The sockets they read from are
+created before tracing starts, so they are not counted. Results are
+compared with ``benchmarks/baselines/bench_memory.json``; ``--save``
+stores the current run in it.
+
+    uv run python -m benchmarks.bench_memory [--save]
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import tracemalloc
+from collections.abc import Callable
+from typing import Any, cast
+
+from web_server import config, connection, cycle, http, wsgi
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "bench_memory.json")
+INSTANCES = 10_000
+REQUESTS = {
+    "get": (
+        b"GET /articles/42?page=2 HTTP/1.1\r\n"
+        b"Host: example.com\r\n"
+        b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Firefox/128.0\r\n"
+        b"Accept: text/html,application/xhtml+xml,*/*;q=0.8\r\n"
+        b"Accept-Language: en-US,en;q=0.5\r\n"
+        b"Accept-Encoding: gzip, deflate, br\r\n"
+        b"Cookie: session=0123456789abcdef; theme=dark\r\n"
+        b"\r\n"
+    ),
+    "post": (
+        b"POST /upload HTTP/1.1\r\n"
+        b"Host: example.com\r\n"
+        b"Content-Type: application/octet-stream\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n" + b"10\r\n0123456789abcdef\r\n" * 4 + b"0\r\n\r\n"
+    ),
+}
+
+
+TEMPLATE = wsgi.WSGIEnviron.template(
+    cfg=config.Config.default(),
+    server=("localhost", 8000),
+    errors=wsgi.WSGIErrorStream.with_stderr(),
+)
+
+
+class BufferSocket:
+    def __init__(self, data: bytes):
+        self.buf = io.BytesIO(data)
+
+    def recv(self, size: int) -> bytes:
+        return self.buf.read(size)
+
+
+def app(environ, start_response):
+    return []
+
+
+def idle_connection(cfg: config.Config, sock: socket.socket) -> Any:
+    return (
+        connection.Connection(sock=sock, write_timeout=cfg.response.write_timeout),
+        http.create_parser(cfg=cfg.message, socket_reader=http.SocketReader(sock=sock)),
+    )
+
+
+def in_flight_request(cfg: config.Config, sock: socket.socket) -> Any:
+    parser = http.create_parser(
+        cfg=cfg.message, socket_reader=http.SocketReader(sock=sock)
+    )
+    req = next(parser.parse())
+    environ = wsgi.WSGIEnviron.build(cfg=cfg, template=TEMPLATE, request=req)
+    request_cycle = cycle.Cycle(
+        conn=cast(connection.Connection, None),
+        request=req,
+        environ=environ,
+        app=app,
+        cfg=cfg.response,
+    )
+    request_cycle.start_response("200 OK", [("Content-Type", "text/plain")])
+    return request_cycle, environ.dict()
+
+
+def bytes_per_instance(
+    build: Callable[[config.Config, socket.socket], Any], data: bytes
+) -> float:
+    cfg = config.Config.default()
+    socks = [cast(socket.socket, BufferSocket(data)) for _ in range(INSTANCES)]
+    # warm up caches (header names, environ keys) so they are not counted
+    build(cfg, cast(socket.socket, BufferSocket(data)))
+
+    tracemalloc.start()
+    started = tracemalloc.get_traced_memory()[0]
+    kept = [build(cfg, sock) for sock in socks]
+    allocated = tracemalloc.get_traced_memory()[0] - started
+    tracemalloc.stop()
+    del kept
+    return allocated / INSTANCES
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "--save", action="store_true", help="store this run as the new baseline"
+    )
+    args = arg_parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as handle:
+            baseline = json.load(handle)
+
+    cases = {"idle connection": (idle_connection, REQUESTS["get"])} | {
+        f"in-flight {name}": (in_flight_request, data)
+        for name, data in REQUESTS.items()
+    }
+    results = {}
+    print(f"{'case':>20} {'bytes':>10} {'baseline':>10}")
+    for case, (build, data) in cases.items():
+        result = results[case] = bytes_per_instance(build, data)
+        base = baseline.get(case)
+        if base:
+            print(
+                f"{case:>20} {result:>10.0f} {base:>10.0f} {(result - base) / base:>+6.0%}"
+            )
+        else:
+            print(f"{case:>20} {result:>10.0f} {'-':>10}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w") as handle:
+            json.dump(baseline | results, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+        print(f"baseline saved to {os.path.relpath(BASELINE)}")
+
+
+if __name__ == "__main__":
+    main()
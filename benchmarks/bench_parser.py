@@ -0,0 +1,160 @@
+"""Throughput of RequestParser over the request corpus.
+
+Replays every file in ``tests/http/requests/valid`` and
+``tests/http/requests/invalid`` through ``RequestParser`` with each of the
+send strategies ``tests/http/treq.py`` uses, and reports requests/s, MB/s
+and the peak memory allocated per request (measured in a separate pass
+under tracemalloc, so it does not slow down the timed one).
+
+Results are compared with ``benchmarks/baselines/bench_parser.json``;
+``--save`` stores the current run in it. ``--backend`` picks the parser
+backend from ``MessageConfig.parser_backend``, so backends can be compared
+case by case.
+
+    uv run python -m benchmarks.bench_parser [--backend fast] [--save]
+"""
+
+import argparse
+import dataclasses
+import glob
+import json
+import os
+import random
+import socket
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from typing import cast
+
+from tests import fake
+from tests.http import treq
+from web_server.config import PARSER_BACKENDS, MessageConfig
+from web_server.http import SocketReader, create_parser
+
+REQUESTS_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "http", "requests"
+)
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "bench_parser.json")
+SENDERS: dict[str, Callable[[object], Iterator[bytes]]] = {
+    "all": treq.request.send_all,
+    "lines": treq.request.send_lines,
+    "bytes": treq.request.send_bytes,
+    "random": treq.request.send_random,
+    "special_chunks": treq.request.send_special_chunks,
+}
+ROUNDS = 30
+
+
+class Message:
+    def __init__(self, fname: str, data: bytes, cfg: MessageConfig, requests: int):
+        self.name = os.path.basename(fname)
+        self.data = data
+        self.cfg = cfg
+        self.requests = requests
+
+
+def load_corpus(kind: str, parser_backend: str) -> list[Message]:
+    messages = []
+    for fname in sorted(glob.glob(os.path.join(REQUESTS_DIR, kind, "*.http"))):
+        env = treq.load_py(os.path.splitext(fname)[0] + ".py")
+        cfg = dataclasses.replace(env["cfg"], parser_backend=parser_backend)
+        if kind == "valid":
+            req = treq.request(fname, env["request"])
+            messages.append(Message(fname, req.data, cfg, len(req.expect)))
+        else:
+            req = treq.badrequest(fname)
+            messages.append(Message(fname, req.data, cfg, 1))
+    return messages
+
+
+def parse(cfg: MessageConfig, pieces: list[bytes]) -> None:
+    sock = cast(socket.socket, fake.FakeSocket(pieces))
+    parser = create_parser(cfg=cfg, socket_reader=SocketReader(sock, max_chunk=8192))
+    try:
+        for req in parser.parse():
+            req.body.read()
+    except Exception:
+        # the invalid corpus is expected to fail, that is part of the cost
+        pass
+
+
+def run(messages: list[Message], sender: Callable) -> dict[str, float]:
+    random.seed(0)
+    cases = [(message, list(sender(message))) for message in messages]
+    requests = sum(message.requests for message in messages)
+    size = sum(len(message.data) for message in messages)
+
+    # like timeit, the fastest round is the one least disturbed by the rest
+    # of the machine
+    elapsed = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for message, pieces in cases:
+            parse(message.cfg, pieces)
+        elapsed = min(elapsed, time.perf_counter() - started)
+
+    peaks = []
+    tracemalloc.start()
+    for message, pieces in cases:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        parse(message.cfg, pieces)
+        peaks.append((tracemalloc.get_traced_memory()[1] - current) / message.requests)
+    tracemalloc.stop()
+
+    return {
+        "requests_per_sec": requests / elapsed,
+        "mb_per_sec": size / elapsed / 1024 / 1024,
+        "peak_bytes_per_request": sum(peaks) / len(peaks),
+    }
+
+
+def change(current: float, baseline: float | None) -> str:
+    if not baseline:
+        return ""
+    return f"({(current - baseline) / baseline:+.0%})"
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "--save", action="store_true", help="store this run as the new baseline"
+    )
+    arg_parser.add_argument(
+        "--backend", choices=PARSER_BACKENDS, default="reference", help="parser backend"
+    )
+    args = arg_parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as handle:
+            baseline = json.load(handle)
+
+    results = {}
+    print(f"{'case':>32} {'req/s':>16} {'MB/s':>14} {'peak B/req':>16}")
+    for kind in ("valid", "invalid"):
+        messages = load_corpus(kind, args.backend)
+        for name, sender in SENDERS.items():
+            case = f"{args.backend}/{kind}/{name}"
+            result = results[case] = run(messages, sender)
+            base = baseline.get(case, {})
+            print(
+                f"{case:>32}"
+                f" {result['requests_per_sec']:>8.0f}"
+                f" {change(result['requests_per_sec'], base.get('requests_per_sec')):>7}"
+                f" {result['mb_per_sec']:>6.2f}"
+                f" {change(result['mb_per_sec'], base.get('mb_per_sec')):>7}"
+                f" {result['peak_bytes_per_request']:>8.0f}"
+                f" {change(result['peak_bytes_per_request'], base.get('peak_bytes_per_request')):>7}"
+            )
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w") as handle:
+            json.dump(baseline | results, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+        print(f"baseline saved to {os.path.relpath(BASELINE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cost of serving small static files from disk and from the file cache.
+
+Calls ``StaticFiles`` directly, without sockets, for a set of small
+assets requested with a skewed popularity, so a few are hot and most are
+cold. Without a cache every request stats the file (and its ``.gz``
+sibling), opens it and builds its headers; with ``FileCache`` a hit
+returns the bytes or mapping and the headers built when it was loaded,
+revalidating at most once per interval. Reports requests/s, syscalls
+per request and, for the cache, its hit rate and the bytes it holds.
+
+    uv run python -m benchmarks.bench_static
+"""
+
+import os
+import random
+import tempfile
+import time
+from collections.abc import Callable
+from unittest import mock
+
+from web_server import static
+
+FILES = 200
+REQUESTS = 50_000
+SIZES = (512, 4 * 1024, 32 * 1024)
+CACHE_SIZES = (256 * 1024, 16 * 1024 * 1024)
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+def make_files(directory: str) -> list[str]:
+    rng = random.Random(0)
+    paths = []
+    for n in range(FILES):
+        name = f"asset-{n:03d}.css"
+        with open(os.path.join(directory, name), "wb") as handle:
+            handle.write(rng.randbytes(SIZES[n % len(SIZES)]))
+        paths.append(f"/static/{name}")
+    return paths
+
+
+def run(app: static.StaticFiles, paths: list[str]) -> tuple[float, float]:
+    calls = {"stat": 0, "open": 0}
+
+    def counted(name: str, func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    with (
+        mock.patch("os.stat", counted("stat", os.stat)),
+        mock.patch("web_server.static.open", counted("open", open), create=True),
+    ):
+        started = time.perf_counter()
+        for path in paths:
+            body = app({"REQUEST_METHOD": "GET", "PATH_INFO": path}, start_response)
+            if hasattr(body, "close"):
+                body.close()
+        elapsed = time.perf_counter() - started
+    return len(paths) / elapsed, sum(calls.values()) / len(paths)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        files = make_files(directory)
+        rng = random.Random(1)
+        # a Zipf-like popularity: the first files take most of the requests
+        weights = [1 / (rank + 1) for rank in range(FILES)]
+        paths = rng.choices(files, weights=weights, k=REQUESTS)
+
+        print(
+            f"{'cache':>12} {'req/s':>9} {'syscalls':>9} {'hit rate':>9} {'bytes':>10}"
+        )
+        req_s, syscalls = run(static.StaticFiles(directory, prefix="/static"), paths)
+        print(f"{'none':>12} {req_s:>9.0f} {syscalls:>9.2f} {'-':>9} {'-':>10}")
+        for max_size in CACHE_SIZES:
+            cache = static.FileCache(max_size=max_size)
+            app = static.StaticFiles(directory, prefix="/static", cache=cache)
+            req_s, syscalls = run(app, paths)
+            stats = cache.stats()
+            print(
+                f"{max_size:>12} {req_s:>9.0f} {syscalls:>9.2f}"
+                f" {stats.hit_rate:>9.1%} {stats.size:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
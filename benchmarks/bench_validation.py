@@ -0,0 +1,108 @@
+"""Cost of validating request tokens with regexes versus translate tables.
+
+Collects the methods, header names and chunk-size lines of the valid and
+invalid request corpora in ``tests/http/requests`` and runs each through
+the regex and generator checks the parser used before, and through the
+``bytes.translate`` checks it uses now.
+
+    uv run python -m benchmarks.bench_validation
+"""
+
+import glob
+import os
+import re
+import timeit
+from collections.abc import Callable
+
+from web_server.http.parser import NOT_METHOD_BADCHARS, is_token
+
+REQUESTS_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "http", "requests"
+)
+REPEAT = 2000
+
+TOKEN_PATTERN = re.compile(rf"[{re.escape(r"!#$%&'*+-.^_`|~")}0-9a-zA-Z]+")
+METHOD_BADCHAR_RE = re.compile("[a-z#]")
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+
+
+def load_corpus(kind: str) -> list[bytes]:
+    messages = []
+    for fname in sorted(glob.glob(os.path.join(REQUESTS_DIR, kind, "*.http"))):
+        with open(fname, "rb") as handle:
+            data = handle.read()
+        data = data.replace(b"\n", b"").replace(b"\\r\\n", b"\r\n")
+        data = data.replace(b"\\t", b"\t").replace(b"\\0", b"\000")
+        messages.append(data)
+    return messages
+
+
+def collect(messages: list[bytes]) -> dict[str, list[bytes]]:
+    methods, names, chunk_sizes = [], [], []
+    for message in messages:
+        head, _, body = message.partition(b"\r\n\r\n")
+        request_line, *fields = head.split(b"\r\n")
+        methods.append(request_line.split(b" ", 1)[0])
+        names.extend(field.partition(b":")[0] for field in fields)
+        if b"chunked" in head.lower():
+            chunk_sizes.extend(
+                line.split(b";", 1)[0] for line in body.split(b"\r\n")[::2]
+            )
+    return {"method": methods, "header name": names, "chunk size": chunk_sizes}
+
+
+def regex_method(method: bytes) -> bool:
+    decoded = method.decode("latin1")
+    return not METHOD_BADCHAR_RE.search(decoded) and bool(
+        TOKEN_PATTERN.fullmatch(decoded)
+    )
+
+
+def translate_method(method: bytes) -> bool:
+    return not method.translate(None, NOT_METHOD_BADCHARS) and is_token(method)
+
+
+def regex_header_name(name: bytes) -> bool:
+    return bool(TOKEN_PATTERN.fullmatch(name.decode("latin1")))
+
+
+def generator_chunk_size(size: bytes) -> bool:
+    return bool(size) and not any(n not in HEX_DIGITS for n in size)
+
+
+def translate_chunk_size(size: bytes) -> bool:
+    return bool(size) and not size.translate(None, HEX_DIGITS)
+
+
+CHECKS: dict[str, tuple[Callable[[bytes], bool], Callable[[bytes], bool]]] = {
+    "method": (regex_method, translate_method),
+    "header name": (regex_header_name, is_token),
+    "chunk size": (generator_chunk_size, translate_chunk_size),
+}
+
+
+def run(check: Callable[[bytes], bool], values: list[bytes]) -> float:
+    elapsed = min(
+        timeit.repeat(
+            lambda: [check(value) for value in values], number=REPEAT, repeat=5
+        )
+    )
+    return elapsed / (REPEAT * len(values)) * 1e9
+
+
+def main() -> None:
+    print(f"{'corpus':>8} {'field':>12} {'count':>6} {'old ns':>8} {'new ns':>8}")
+    for kind in ("valid", "invalid"):
+        for field, values in collect(load_corpus(kind)).items():
+            if not values:
+                continue
+            old, new = CHECKS[field]
+            assert [old(v) for v in values] == [new(v) for v in values]
+            print(
+                f"{kind:>8} {field:>12} {len(values):>6}"
+                f" {run(old, values):>8.1f} {run(new, values):>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import socket
 from collections.abc import Iterable
 
+from web_server.config import Config, MessageConfig
 from web_server.worker import Worker
 
 
@@ -21,7 +22,9 @@ def app(environ, start_response) -> Iterable[bytes]:
 def main():
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.bind(("localhost", 8000))
-    worker = Worker(server_socket=sock, app=app)
+    # tune the limits here; the worker shares this one config across connections
+    cfg = Config.custom(message=MessageConfig.custom())
+    worker = Worker(server_socket=sock, app=app, cfg=cfg)
     worker.run()
 
 
@@ -6,7 +6,7 @@ import pytest
 
 from tests import fake
 from web_server.errors import InvalidChunkSize
-from web_server.http.reader import Chunk, SocketReader
+from web_server.http.reader import Chunk, SocketReader, decode_chunk_size_line
 
 
 @pytest.fixture(params=[3, 8192])
@@ -152,3 +152,37 @@ def test_is_last():
 )
 def test_trailers(chunk: Chunk, expected: list[tuple[str, str]]):
     assert chunk.trailers == expected
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        (b"0\r\n", 0),
+        (b"1a\r\n", 26),
+        (b"FF;name=value\r\n", 255),
+        (b"10", 16),
+        (b"ffffffffffffffff\r\n", 2**64 - 1),
+        (b"5;a=b;c\r\n", 5),
+    ],
+)
+def test_decode_chunk_size_line(line: bytes, expected: int):
+    assert decode_chunk_size_line(line) == expected
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b"\r\n",
+        b"-1\r\n",
+        b"0x10\r\n",
+        b"1 \r\n",
+        b";ext\r\n",
+        b"+5\r\n",
+        b"6_0\r\n",
+        b"5\n;\r\n",
+        b"1" + b"0" * 16 + b"\r\n",
+    ],
+)
+def test_decode_chunk_size_line_with_invalid_size(line: bytes):
+    with pytest.raises(InvalidChunkSize):
+        decode_chunk_size_line(line)
@@ -0,0 +1,171 @@
+import zlib
+
+import pytest
+
+from web_server.config import ResponseConfig
+from web_server.http import Compressor, Headers
+from web_server.http.compression import accepts, is_compressible, negotiate
+
+JSON_BODY = b'{"items": [' + b", ".join(b'{"id": %d}' % i for i in range(200)) + b"]}"
+ENABLED = ResponseConfig.custom(compression=True)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("deflate", "deflate"),
+        ("deflate, gzip", "gzip"),
+        ("gzip;q=0.5, deflate", "deflate"),
+        ("GZIP; Q=1.0", "gzip"),
+        ("br", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", "deflate"),
+        ("gzip;q=0, deflate;q=0", None),
+        ("gzip;q=abc", None),
+    ],
+)
+def test_negotiate(accept_encoding: str | None, expected: str | None):
+    assert negotiate(accept_encoding) == expected
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, False),
+        ("gzip", True),
+        ("deflate, gzip;q=0.1", True),
+        ("gzip;q=0", False),
+        ("*", True),
+        ("*, gzip;q=0", False),
+        ("br", False),
+    ],
+)
+def test_accepts(accept_encoding: str | None, expected: bool):
+    assert accepts(accept_encoding, "gzip") is expected
+
+
+@pytest.mark.parametrize(
+    "content_type, expected",
+    [
+        ("application/json", True),
+        ("application/json; charset=utf-8", True),
+        ("text/html", True),
+        ("image/svg+xml", True),
+        ("image/png", False),
+        ("video/mp4", False),
+        ("application/zip", False),
+        ("Application/GZIP", False),
+        (None, False),
+    ],
+)
+def test_is_compressible(content_type: str | None, expected: bool):
+    assert is_compressible(content_type) is expected
+
+
+@pytest.mark.parametrize(
+    "cfg, request_headers, status_code, response_headers, expected",
+    [
+        (
+            ENABLED,
+            [("Accept-Encoding", "gzip")],
+            200,
+            [("Content-Type", "application/json")],
+            "gzip",
+        ),
+        (
+            ENABLED,
+            [],
+            200,
+            [("Content-Type", "application/json")],
+            None,
+        ),
+        (
+            ENABLED,
+            [("Accept-Encoding", "gzip")],
+            200,
+            [("Content-Type", "application/json"), ("Accept-Ranges", "none")],
+            "gzip",
+        ),
+    ],
+)
+def test_compressor_negotiate(
+    cfg: ResponseConfig,
+    request_headers: list[tuple[str, str]],
+    status_code: int,
+    response_headers: list[tuple[str, str]],
+    expected: str | None,
+):
+    compressor = Compressor.negotiate(
+        cfg, Headers(request_headers), status_code, Headers(response_headers)
+    )
+
+    assert compressor is not None
+    assert compressor.encoding == expected
+    assert (compressor.level, compressor.min_size) == (6, 1024)
+
+
+@pytest.mark.parametrize(
+    "cfg, status_code, response_headers",
+    [
+        (ResponseConfig.default(), 200, [("Content-Type", "application/json")]),
+        (ENABLED, 101, [("Content-Type", "application/json")]),
+        (ENABLED, 204, [("Content-Type", "application/json")]),
+        (ENABLED, 206, [("Content-Type", "application/json")]),
+        (ENABLED, 304, [("Content-Type", "application/json")]),
+        (ENABLED, 200, []),
+        (ENABLED, 200, [("Content-Type", "image/png")]),
+        (
+            ENABLED,
+            200,
+            [("Content-Type", "application/json"), ("Content-Encoding", "br")],
+        ),
+        (
+            ENABLED,
+            200,
+            [("Content-Type", "application/json"), ("Cache-Control", "no-transform")],
+        ),
+        (
+            ENABLED,
+            200,
+            [("Content-Type", "text/css"), ("Accept-Ranges", "bytes")],
+        ),
+    ],
+)
+def test_compressor_negotiate_without_compression(
+    cfg: ResponseConfig, status_code: int, response_headers: list[tuple[str, str]]
+):
+    compressor = Compressor.negotiate(
+        cfg,
+        Headers([("Accept-Encoding", "gzip")]),
+        status_code,
+        Headers(response_headers),
+    )
+
+    assert compressor is None
+
+
+@pytest.mark.parametrize("encoding, wbits", [("gzip", 31), ("deflate", 15)])
+def test_compress(encoding: str, wbits: int):
+    compressed = Compressor(encoding, 6, 1024).compress(JSON_BODY)
+
+    assert len(compressed) < len(JSON_BODY)
+    assert zlib.decompress(compressed, wbits=wbits) == JSON_BODY
+
+
+@pytest.mark.parametrize(
+    "min_size, expected_flushes",
+    [(0, 26), (500, 5), (len(JSON_BODY) + 1, 0)],
+)
+def test_stream(min_size: int, expected_flushes: int):
+    chunks = [JSON_BODY[i : i + 100] for i in range(0, len(JSON_BODY), 100)]
+
+    pieces = list(Compressor("gzip", 6, min_size).stream(iter([b"", *chunks])))
+
+    # every sync flush ends its output with an empty stored block
+    assert sum(piece.endswith(b"\x00\x00\xff\xff") for piece in pieces) == (
+        expected_flushes
+    )
+    assert zlib.decompress(b"".join(pieces), wbits=31) == JSON_BODY
@@ -0,0 +1,60 @@
+import io
+import pathlib
+
+import pytest
+
+from web_server.http import FileWrapper
+
+DATA = b"0123456789" * 10
+
+
+@pytest.fixture
+def path(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "data.txt"
+    path.write_bytes(DATA)
+    return path
+
+
+@pytest.mark.parametrize(
+    "offset, block_size, length, expected",
+    [
+        (0, 8192, None, [DATA]),
+        (0, 40, None, [DATA[:40], DATA[40:80], DATA[80:]]),
+        (10, 40, 50, [DATA[10:50], DATA[50:60]]),
+        (95, 40, 50, [DATA[95:]]),
+    ],
+)
+def test_iter(offset: int, block_size: int, length: int | None, expected: list[bytes]):
+    filelike = io.BytesIO(DATA)
+    filelike.seek(offset)
+
+    assert list(FileWrapper(filelike, block_size, length=length)) == expected
+
+
+@pytest.mark.parametrize(
+    "offset, length, expected",
+    [(0, None, (0, 100)), (10, None, (10, 90)), (10, 50, (10, 50)), (90, 50, (90, 10))],
+)
+def test_sendfile_range(
+    path: pathlib.Path,
+    offset: int,
+    length: int | None,
+    expected: tuple[int, int],
+):
+    with open(path, "rb") as file:
+        file.seek(offset)
+        file_range = FileWrapper(file, length=length).sendfile_range()
+
+        assert file_range == (file.fileno(), *expected)
+
+
+def test_sendfile_range_without_file():
+    assert FileWrapper(io.BytesIO(DATA)).sendfile_range() is None
+
+
+def test_close(path: pathlib.Path):
+    file = open(path, "rb")
+
+    FileWrapper(file).close()
+
+    assert file.closed
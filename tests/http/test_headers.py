@@ -0,0 +1,178 @@
+import pytest
+
+from web_server.http import Headers, environ_key
+from web_server.http.headers import HEADER_NAMES
+
+
+@pytest.fixture
+def headers(request: pytest.FixtureRequest) -> Headers:
+    fields: list[tuple[str, str]] = request.param
+    return Headers(fields)
+
+
+@pytest.mark.parametrize(
+    "headers, name, expected",
+    [
+        ([("Host", "example.com")], "host", "example.com"),
+        ([("HOST", "example.com")], "Host", "example.com"),
+        ([("Accept", "*/*"), ("Accept", "text/html")], "accept", "*/*"),
+        ([("Host", "example.com")], "content-length", None),
+    ],
+    indirect=["headers"],
+)
+def test_get(headers: Headers, name: str, expected: str | None):
+    assert headers.get(name) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, name, expected",
+    [
+        ([("Host", "example.com")], "HOST", ["example.com"]),
+        (
+            [("Accept", "*/*"), ("Host", "example.com"), ("ACCEPT", "text/html")],
+            "accept",
+            ["*/*", "text/html"],
+        ),
+        ([("Host", "example.com")], "accept", []),
+    ],
+    indirect=["headers"],
+)
+def test_get_all(headers: Headers, name: str, expected: list[str]):
+    assert headers.get_all(name) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, name, expected",
+    [
+        ([("Upgrade", "websocket")], "upgrade", [("Upgrade", "websocket")]),
+        ([("UPGRADE", "websocket")], "Upgrade", [("UPGRADE", "websocket")]),
+        ([("Host", "example.com")], "upgrade", []),
+    ],
+    indirect=["headers"],
+)
+def test_fields(headers: Headers, name: str, expected: list[tuple[str, str]]):
+    assert headers.fields(name) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, name, expected",
+    [
+        ([("Host", "example.com")], "host", True),
+        ([("Host", "example.com")], "HOST", True),
+        ([("Host", "example.com")], "accept", False),
+    ],
+    indirect=["headers"],
+)
+def test_contains(headers: Headers, name: str, expected: bool):
+    assert (name in headers) is expected
+
+
+@pytest.mark.parametrize(
+    "headers, field, expected",
+    [
+        (
+            [("Connection", "keep-alive"), ("Content-Type", "text/plain")],
+            ("Connection", "close"),
+            [("Connection", "close"), ("Content-Type", "text/plain")],
+        ),
+        (
+            [("Accept", "*/*"), ("Host", "example.com"), ("Accept", "text/html")],
+            ("Accept", "application/json"),
+            [("Accept", "application/json"), ("Host", "example.com")],
+        ),
+        (
+            [("Host", "example.com")],
+            ("Content-Length", "13"),
+            [("Host", "example.com"), ("Content-Length", "13")],
+        ),
+    ],
+    indirect=["headers"],
+)
+def test_set(headers: Headers, field: tuple[str, str], expected: list[tuple[str, str]]):
+    headers.set(*field)
+
+    assert headers == expected
+    assert headers.get(field[0]) == field[1]
+    assert len(headers) == len(expected)
+
+
+@pytest.mark.parametrize(
+    "headers, name, expected",
+    [
+        (
+            [("Accept", "*/*"), ("Host", "example.com"), ("ACCEPT", "text/html")],
+            "accept",
+            [("Host", "example.com")],
+        ),
+        ([("Host", "example.com")], "Content-Length", [("Host", "example.com")]),
+    ],
+    indirect=["headers"],
+)
+def test_remove(headers: Headers, name: str, expected: list[tuple[str, str]]):
+    headers.remove(name)
+
+    assert headers == expected
+    assert name not in headers
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        (
+            [("Accept", "*/*"), ("Host", "example.com"), ("ACCEPT", "text/html")],
+            [("Accept", "*/*,text/html"), ("Host", "example.com")],
+        ),
+        ([], []),
+    ],
+    indirect=["headers"],
+)
+def test_combined(headers: Headers, expected: list[tuple[str, str]]):
+    assert headers.combined() == expected
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [[("Host", "example.com"), ("Accept", "*/*")]],
+    indirect=["headers"],
+)
+def test_copy(headers: Headers):
+    copied = headers.copy()
+    copied.append("Accept", "text/html")
+
+    assert headers.get_all("accept") == ["*/*"]
+    assert copied.get_all("accept") == ["*/*", "text/html"]
+
+
+def test_of():
+    headers = Headers([("Host", "example.com")])
+
+    assert Headers.of(headers) is headers
+    assert Headers.of([("Host", "example.com")]) == headers
+
+
+@pytest.mark.parametrize(
+    "raw_name, expected",
+    [
+        (b"Host", "HOST"),
+        (b"host", "HOST"),
+        (b"CONTENT-LENGTH", "CONTENT-LENGTH"),
+        (b"X-Forwarded-For", "X-FORWARDED-FOR"),
+        (b"hOST", None),
+        (b"X-Custom", None),
+    ],
+)
+def test_header_names(raw_name: bytes, expected: str | None):
+    assert HEADER_NAMES.get(raw_name) == expected
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("HOST", "HTTP_HOST"),
+        ("Host", "HTTP_HOST"),
+        ("X-FORWARDED-FOR", "HTTP_X_FORWARDED_FOR"),
+        ("X-Custom-Header", "HTTP_X_CUSTOM_HEADER"),
+    ],
+)
+def test_environ_key(name: str, expected: str):
+    assert environ_key(name) == expected
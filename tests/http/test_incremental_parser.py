@@ -0,0 +1,238 @@
+import pytest
+
+from web_server.config import MessageConfig
+from web_server.errors import (
+    ChunkMissingTerminator,
+    InvalidChunkSize,
+    InvalidHeader,
+    InvalidRequestLine,
+    LimitRequestHeaders,
+    LimitRequestHeadersTotal,
+    LimitRequestLine,
+    NoMoreData,
+)
+from web_server.http import Headers
+from web_server.http.parser import (
+    BodyData,
+    IncrementalParser,
+    MessageComplete,
+    RequestHead,
+    RequestHeadCache,
+    Trailers,
+)
+
+
+@pytest.fixture
+def incremental_parser(request: pytest.FixtureRequest) -> IncrementalParser:
+    cfg_param = getattr(request, "param", dict())
+    return IncrementalParser(MessageConfig.custom(**cfg_param))
+
+
+def feed_all(parser: IncrementalParser, pieces: list[bytes]) -> list:
+    events = []
+    for piece in pieces:
+        events.extend(parser.feed(piece))
+    return events
+
+
+def split_every(payload: bytes, size: int) -> list[bytes]:
+    return [payload[i : i + size] for i in range(0, len(payload), size)]
+
+
+def merge_body(events: list) -> list:
+    merged = []
+    for event in events:
+        if isinstance(event, BodyData) and merged and isinstance(merged[-1], BodyData):
+            merged[-1] = BodyData(merged[-1].data + event.data)
+        else:
+            merged.append(event)
+    return merged
+
+
+CONTENT_LENGTH_REQUEST = (
+    b"POST /submit?a=1#top HTTP/1.1\r\n"
+    b"Host: example.com\r\n"
+    b"Content-Length: 13\r\n"
+    b"\r\n"
+    b"Hello, World!"
+)
+CONTENT_LENGTH_EVENTS = [
+    RequestHead(
+        method="POST",
+        path="/submit",
+        query="a=1",
+        fragment="top",
+        version=(1, 1),
+        headers=Headers([("HOST", "example.com"), ("CONTENT-LENGTH", "13")]),
+    ),
+    BodyData(b"Hello, World!"),
+    MessageComplete(keep_alive=True),
+]
+CHUNKED_REQUEST = (
+    b"POST /upload HTTP/1.1\r\n"
+    b"Transfer-Encoding: chunked\r\n"
+    b"\r\n"
+    b"5\r\nHello\r\n"
+    b"8;ext=1\r\n, World!\r\n"
+    b"0\r\n"
+    b"Checksum: abc\r\n"
+    b"\r\n"
+)
+CHUNKED_EVENTS = [
+    RequestHead(
+        method="POST",
+        path="/upload",
+        query="",
+        fragment="",
+        version=(1, 1),
+        headers=Headers([("TRANSFER-ENCODING", "chunked")]),
+    ),
+    BodyData(b"Hello, World!"),
+    Trailers(Headers([("CHECKSUM", "abc")])),
+    MessageComplete(keep_alive=True),
+]
+
+
+@pytest.mark.parametrize(
+    "payload, size, expected",
+    [
+        (CONTENT_LENGTH_REQUEST, len(CONTENT_LENGTH_REQUEST), CONTENT_LENGTH_EVENTS),
+        (CONTENT_LENGTH_REQUEST, 1, CONTENT_LENGTH_EVENTS),
+        (CONTENT_LENGTH_REQUEST, 7, CONTENT_LENGTH_EVENTS),
+        (CHUNKED_REQUEST, len(CHUNKED_REQUEST), CHUNKED_EVENTS),
+        (CHUNKED_REQUEST, 1, CHUNKED_EVENTS),
+        (CHUNKED_REQUEST, 3, CHUNKED_EVENTS),
+    ],
+)
+def test_feed(
+    incremental_parser: IncrementalParser,
+    payload: bytes,
+    size: int,
+    expected: list,
+):
+    events = feed_all(incremental_parser, split_every(payload, size))
+
+    assert merge_body(events) == expected
+
+
+def test_feed_keeps_incomplete_input(incremental_parser: IncrementalParser):
+    assert incremental_parser.feed(b"GET / HTTP/1.1\r\nHost: exa") == []
+    assert incremental_parser.feed(b"mple.com\r\n\r\n") == [
+        RequestHead(
+            method="GET",
+            path="/",
+            query="",
+            fragment="",
+            version=(1, 1),
+            headers=Headers([("HOST", "example.com")]),
+        ),
+        MessageComplete(keep_alive=True),
+    ]
+
+
+def test_feed_pipelined_requests(incremental_parser: IncrementalParser):
+    events = incremental_parser.feed(
+        b"GET /first HTTP/1.1\r\n\r\n"
+        b"GET /second HTTP/1.1\r\nConnection: close\r\n\r\n"
+        b"GET /ignored HTTP/1.1\r\n\r\n"
+    )
+
+    assert [event.path for event in events if isinstance(event, RequestHead)] == [
+        "/first",
+        "/second",
+    ]
+    assert [e for e in events if isinstance(e, MessageComplete)] == [
+        MessageComplete(keep_alive=True),
+        MessageComplete(keep_alive=False),
+    ]
+    assert incremental_parser.closed
+    assert incremental_parser.feed(b"GET / HTTP/1.1\r\n\r\n") == []
+
+
+@pytest.mark.parametrize(
+    "pieces, closed",
+    [
+        ([b""], True),
+        ([b"GET / HTTP/1.1\r\n\r\n", b""], True),
+    ],
+)
+def test_feed_eof(incremental_parser: IncrementalParser, pieces: list, closed: bool):
+    feed_all(incremental_parser, pieces)
+
+    assert incremental_parser.closed is closed
+
+
+@pytest.mark.parametrize(
+    "pieces",
+    [
+        [b"GET / HTTP/1.1\r\nHost", b""],
+        [b"POST / HTTP/1.1\r\nContent-Length: 5\r\n\r\nab", b""],
+    ],
+)
+def test_feed_eof_in_message(incremental_parser: IncrementalParser, pieces: list):
+    with pytest.raises(NoMoreData):
+        feed_all(incremental_parser, pieces)
+
+
+@pytest.mark.parametrize(
+    "incremental_parser, payload, error_type",
+    [
+        (dict(), b"GET\r\n", InvalidRequestLine),
+        (dict(limit_request_line=16), b"GET /" + b"a" * 20, LimitRequestLine),
+        (
+            dict(limit_request_fields=2, limit_request_field_size=20),
+            b"GET / HTTP/1.1\r\n" + b"H: 1\r\n" * 20,
+            LimitRequestHeaders,
+        ),
+        (
+            dict(limit_request_headers_total=64),
+            b"GET / HTTP/1.1\r\n" + b"X-Filler: 0123456789\r\n" * 4,
+            LimitRequestHeadersTotal,
+        ),
+        (
+            dict(),
+            b"POST / HTTP/1.1\r\nContent-Length: 1\r\nContent-Length: 2\r\n\r\n",
+            InvalidHeader,
+        ),
+        (
+            dict(),
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n",
+            InvalidChunkSize,
+        ),
+        (
+            dict(),
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabcde",
+            ChunkMissingTerminator,
+        ),
+    ],
+    indirect=["incremental_parser"],
+)
+def test_feed_with_invalid_request(
+    incremental_parser: IncrementalParser,
+    payload: bytes,
+    error_type: type[Exception],
+):
+    with pytest.raises(error_type):
+        for piece in split_every(payload, 1):
+            incremental_parser.feed(piece)
+
+
+def test_feed_ignores_empty_lines_before_request_line(
+    incremental_parser: IncrementalParser,
+):
+    events = incremental_parser.feed(b"\r\n\r\nGET / HTTP/1.1\r\n\r\n")
+
+    assert [type(event) for event in events] == [RequestHead, MessageComplete]
+
+
+def test_feed_with_request_head_cache():
+    cache = RequestHeadCache(maxsize=8)
+    payload = b"GET /health HTTP/1.1\r\nHost: example.com\r\n\r\n"
+
+    heads = []
+    for _ in range(3):
+        events = IncrementalParser(MessageConfig.default(), cache).feed(payload)
+        heads.extend(event for event in events if isinstance(event, RequestHead))
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert heads[0] == heads[1] == heads[2]
@@ -1,3 +1,4 @@
+import io
 import socket
 from typing import cast
 
@@ -6,7 +7,7 @@ import pytest
 from tests import fake
 from web_server.http.body import RequestBody
 from web_server.errors import InvalidHeader, UnsupportedTransferCoding
-from web_server.http.reader import SocketReader
+from web_server.http.reader import LengthReader, SocketReader
 
 
 @pytest.fixture
@@ -239,3 +240,12 @@ def test_readlines(request_body: RequestBody, hint: int | None, expected: list[b
     lines = request_body.readlines(hint)
 
     assert lines == expected
+
+
+@pytest.mark.parametrize("request_body", [b"Hello, World!"], indirect=True)
+def test_reset(request_body: RequestBody):
+    assert request_body.read(5) == b"Hello"
+
+    request_body.reset(LengthReader(io.BytesIO(b"Bye"), 3))
+
+    assert request_body.read() == b"Bye"
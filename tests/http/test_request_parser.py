@@ -12,10 +12,19 @@ from web_server.errors import (
     InvalidHTTPVersion,
     LimitRequestLine,
     LimitRequestHeaders,
+    LimitRequestHeadersTotal,
     InvalidHeaderName,
     NoMoreData,
 )
-from web_server.http.parser import RequestParser, should_close
+from web_server.http.parser import (
+    FastRequestParser,
+    RequestHeadCache,
+    RequestParser,
+    create_parser,
+    is_token,
+    should_close,
+)
+from web_server.http import Headers
 from web_server.http.reader import SocketReader
 
 
@@ -205,6 +214,20 @@ def test_parse_request_line_with_invalid_stream(
             ),
             [("HEADER1", "Value1"), ("HEADER2", "Value2"), ("HEADER3", "Value3")],
         ),
+        (
+            (
+                dict(limit_request_headers_total=53),
+                b"Header1: Value1\r\nHeader2: Value2\r\nHeader3: Value3\r\n\r\n",
+            ),
+            [("HEADER1", "Value1"), ("HEADER2", "Value2"), ("HEADER3", "Value3")],
+        ),
+        (
+            (
+                dict(),
+                b"host:localhost\r\nCONTENT-TYPE: text/plain \t\r\nAccept: \r\n\r\n",
+            ),
+            [("HOST", "localhost"), ("CONTENT-TYPE", "text/plain"), ("ACCEPT", "")],
+        ),
     ],
     indirect=["request_parser"],
 )
@@ -249,11 +272,48 @@ def test_parse_headers(request_parser: RequestParser, expected: list[tuple[str,
             InvalidHeaderName,
             "Invalid HTTP header name: 'Header1 '",
         ),
+        (
+            (
+                dict(),
+                b"Host : localhost\r\n\r\n",
+            ),
+            InvalidHeaderName,
+            "Invalid HTTP header name: 'Host '",
+        ),
         (
             (dict(), b"baz"),
             NoMoreData,
             "No more data after: b'baz'",
         ),
+        (
+            (
+                dict(limit_request_headers_total=32),
+                b"Header1: Value1\r\nHeader2: Value2\r\nHeader3: Value3\r\n\r\n",
+            ),
+            LimitRequestHeadersTotal,
+            "Request header block is larger than 32 bytes",
+        ),
+        (
+            (dict(), b"Header1: Value1\r\nHeader2: Value2\r\n"),
+            NoMoreData,
+            "No more data after: b''",
+        ),
+        (
+            (
+                dict(limit_request_field_size=20),
+                b"Header1: Value1\r\nHeader2: " + b"x" * 200,
+            ),
+            LimitRequestHeaders,
+            "limit request header field size",
+        ),
+        (
+            (
+                dict(limit_request_fields=2, limit_request_field_size=20),
+                b"H: 1\r\n" * 20,
+            ),
+            LimitRequestHeaders,
+            "limit request headers fields",
+        ),
     ],
     indirect=["request_parser"],
 )
@@ -518,3 +578,132 @@ def test_should_close(
     version: tuple[int, int], headers: list[tuple[str, str]], expected: bool
 ):
     assert should_close(version=version, headers=headers) is expected
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"GET", True),
+        (b"Content-Type", True),
+        (b"!#$%&'*+-.^_`|~09azAZ", True),
+        (b"", False),
+        (b"Header ", False),
+        (b"Content-Length\xdf", False),
+        (b"a:b", False),
+        (b"(comment)", False),
+    ],
+)
+def test_is_token(data: bytes, expected: bool):
+    assert is_token(data) is expected
+
+
+@pytest.mark.parametrize(
+    "parser_backend, expected",
+    [("reference", RequestParser), ("fast", FastRequestParser)],
+)
+def test_create_parser(parser_backend: str, expected: type):
+    cfg = MessageConfig.custom(parser_backend=parser_backend)
+    sock = cast(socket.socket, fake.FakeSocket(b""))
+
+    assert type(create_parser(cfg, SocketReader(sock))) is expected
+
+
+@pytest.mark.parametrize("parser_backend", ["reference", "fast"])
+def test_parse_with_oversized_header_block(parser_backend: str):
+    cfg = MessageConfig.custom(
+        limit_request_line=64,
+        limit_request_headers_total=1024,
+        parser_backend=parser_backend,
+    )
+    payload = b"GET / HTTP/1.1\r\n" + (b"X-Filler: " + b"x" * 100 + b"\r\n") * 1000
+    sock = fake.FakeSocket([payload[i : i + 512] for i in range(0, len(payload), 512)])
+    socket_reader = SocketReader(cast(socket.socket, sock), max_chunk=512)
+
+    with pytest.raises(LimitRequestHeadersTotal):
+        next(create_parser(cfg, socket_reader).parse())
+    # the reader stopped at the limit instead of buffering the whole head
+    assert len(socket_reader.buf.getvalue()) < 2048
+
+
+def test_request_head_cache():
+    cache = RequestHeadCache(maxsize=2)
+    head = ("GET", ("/", "", ""), (1, 1), Headers([("HOST", "example.com")]))
+
+    assert cache.get(b"GET / HTTP/1.1\r\n", b"\r\n") is None
+    cache.put(b"GET / HTTP/1.1\r\n", b"\r\n", head)
+    cached = cache.get(b"GET / HTTP/1.1\r\n", b"\r\n")
+    cached[3].append("X-CHANGED", "1")
+
+    assert cached[:3] == head[:3]
+    assert cache.get(b"GET / HTTP/1.1\r\n", b"\r\n")[3] == head[3]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_request_head_cache_evicts_least_recently_used():
+    cache = RequestHeadCache(maxsize=2)
+    head = ("GET", ("/", "", ""), (1, 1), Headers())
+    for line in (b"a", b"b"):
+        cache.put(line, b"\r\n", head)
+    cache.get(b"a", b"\r\n")
+    cache.put(b"c", b"\r\n", head)
+    cache.put(b"x" * RequestHeadCache.MAX_HEAD_SIZE, b"\r\n", head)
+
+    assert len(cache) == 2
+    assert cache.get(b"b", b"\r\n") is None
+    assert cache.get(b"a", b"\r\n") is not None
+    assert cache.get(b"c", b"\r\n") is not None
+
+
+@pytest.mark.parametrize("parser_backend", ["reference", "fast"])
+def test_parse_with_request_head_cache(parser_backend: str):
+    cfg = MessageConfig.custom(parser_backend=parser_backend)
+    cache = RequestHeadCache(maxsize=8)
+    payload = b"GET /health?full=1 HTTP/1.1\r\nHost: example.com\r\n\r\n"
+
+    requests = []
+    for _ in range(3):
+        sock = cast(socket.socket, fake.FakeSocket(payload))
+        requests.extend(create_parser(cfg, SocketReader(sock), cache).parse())
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    for req in requests:
+        assert (req.method, req.path, req.query, req.version) == (
+            "GET",
+            "/health",
+            "full=1",
+            (1, 1),
+        )
+        assert req.headers == [("HOST", "example.com")]
+
+
+def test_parse_keeps_pipelined_request_pending():
+    payload = b"GET /a HTTP/1.1\r\n\r\nGET /b HTTP/1.1\r\n\r\n"
+    sock = cast(socket.socket, fake.FakeSocket(payload))
+    parser = RequestParser(MessageConfig.default(), SocketReader(sock))
+    requests = parser.parse()
+
+    assert next(requests).path == "/a"
+    assert parser.has_pending is True
+    assert next(requests).path == "/b"
+    assert parser.has_pending is False
+
+
+@pytest.mark.parametrize("parser_backend", ["reference", "fast"])
+def test_parse_reuses_spare_body(parser_backend: str):
+    cfg = MessageConfig.custom(parser_backend=parser_backend)
+    payload = (
+        b"POST /a HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc"
+        b"POST /b HTTP/1.1\r\nContent-Length: 2\r\n\r\nde"
+    )
+    sock = cast(socket.socket, fake.FakeSocket(payload))
+    parser = create_parser(cfg, SocketReader(sock))
+    requests = parser.parse()
+
+    first = next(requests)
+    assert first.body.read() == b"abc"
+    parser.reset(spare_body=first.body)
+    second = next(requests)
+
+    assert second.body is first.body
+    assert (second.path, second.body.read()) == ("/b", b"de")
+    assert parser.spare_body is None
@@ -1,10 +1,12 @@
+import pathlib
+import zlib
 from collections.abc import Iterable
 from unittest import mock
 
 import pytest
 
-from web_server.http import Response, Request, RequestBody
-from web_server.errors import InvalidHeader, ParseException
+from web_server.http import Compressor, FileWrapper, Response, Request, RequestBody
+from web_server.errors import InvalidHeader, LimitRequestHeadersTotal, ParseException
 
 
 @pytest.fixture
@@ -191,7 +193,7 @@ def resp(request: pytest.FixtureRequest) -> Response:
             [
                 ("Date", "Thu, 03 Jul 2025 10:00:00 -0000"),
                 ("Server", "hello-web-server"),
-                ("Connection", "close"),
+                ("Connection", "keep-alive"),
                 ("Content-Type", "application/json"),
             ],
         ),
@@ -374,6 +376,69 @@ def test_set_status_with_already_set_status(resp: Response):
                 [b"Hello, ", b"World!"],
             ),
         ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                ],
+            ),
+            [b"Hello, ", b"World!"],
+            (
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Length", "13"),
+                ],
+                [b"Hello, ", b"World!"],
+            ),
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                ],
+            ),
+            [],
+            (
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Length", "0"),
+                ],
+                [],
+            ),
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                ],
+            ),
+            (data for data in [b"Hello, ", b"World!"]),
+            (
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Length", "13"),
+                ],
+                [b"Hello, World!"],
+            ),
+        ),
     ],
     indirect=["resp"],
 )
@@ -387,6 +452,89 @@ def test_set_body(
     assert (resp.headers, list(resp.body)) == expected
 
 
+@pytest.mark.parametrize(
+    "resp, response_body, max_buffered_size, expected",
+    [
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                ],
+            ),
+            (data for data in [b"Hello, ", b"World!", b"!!"]),
+            8,
+            (
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Transfer-Encoding", "chunked"),
+                ],
+                [b"Hello, ", b"World!", b"!!"],
+            ),
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Length", "15"),
+                ],
+            ),
+            (data for data in [b"Hello, ", b"World!", b"!!"]),
+            8,
+            (
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Length", "15"),
+                ],
+                [b"Hello, ", b"World!", b"!!"],
+            ),
+        ),
+        (
+            (
+                (1, 0),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "close"),
+                ],
+            ),
+            (data for data in [b"Hello, ", b"World!", b"!!"]),
+            8,
+            (
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "close"),
+                ],
+                [b"Hello, ", b"World!", b"!!"],
+            ),
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_with_unbuffered_stream(
+    resp: Response,
+    response_body: Iterable[bytes],
+    max_buffered_size: int,
+    expected: tuple[list[tuple[str, str]], list[bytes]],
+):
+    resp.set_body(response_body, max_buffered_size)
+
+    assert (resp.headers, list(resp.body)) == expected
+
+
 @pytest.mark.parametrize(
     "resp, response_body, error_type, error_message",
     [
@@ -413,11 +561,12 @@ def test_set_body(
                     ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
                     ("Server", "hello-web-server"),
                     ("Connection", "keep-alive"),
+                    ("Content-Length", "14"),
                 ],
             ),
-            [b"Hello, ", b"World!"],
+            (data for data in [b"Hello, ", b"World!"]),
             ValueError,
-            "Content-Length data must be a single byte string, not multiple chunks",
+            "Content-Length is wrong: expected 13, got 14",
         ),
     ],
     indirect=["resp"],
@@ -432,6 +581,303 @@ def test_set_body_with_invalid_body(
         resp.set_body(response_body)
 
 
+JSON_BODY = b'{"items": [' + b", ".join(b'{"id": %d}' % i for i in range(200)) + b"]}"
+
+
+@pytest.mark.parametrize(
+    "resp, response_body, expected",
+    [
+        (
+            ((1, 1), "200 OK", [("Content-Type", "application/json")]),
+            [JSON_BODY],
+            [
+                ("Content-Type", "application/json"),
+                ("Vary", "Accept-Encoding"),
+                ("Content-Encoding", "gzip"),
+            ],
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Content-Type", "application/json"),
+                    ("Content-Length", str(len(JSON_BODY))),
+                    ("Vary", "Origin, accept-encoding"),
+                ],
+            ),
+            (data for data in [JSON_BODY[:100], JSON_BODY[100:]]),
+            [
+                ("Content-Type", "application/json"),
+                ("Vary", "Origin, accept-encoding"),
+                ("Content-Encoding", "gzip"),
+            ],
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_with_compressor(
+    resp: Response,
+    response_body: Iterable[bytes],
+    expected: list[tuple[str, str]],
+):
+    resp.set_body(response_body, compressor=Compressor("gzip", 6, 1024))
+
+    body = b"".join(resp.body)
+    assert resp.headers == [*expected, ("Content-Length", str(len(body)))]
+    assert zlib.decompress(body, wbits=31) == JSON_BODY
+
+
+@pytest.mark.parametrize(
+    "resp, compressor, expected",
+    [
+        (
+            ((1, 1), "200 OK", [("ETag", '"v1"')]),
+            Compressor("gzip", 6, 0),
+            'W/"v1"',
+        ),
+        (
+            ((1, 1), "200 OK", [("ETag", 'W/"v1"')]),
+            Compressor("gzip", 6, 0),
+            'W/"v1"',
+        ),
+        (
+            ((1, 1), "200 OK", [("ETag", '"v1"')]),
+            Compressor(None, 6, 0),
+            '"v1"',
+        ),
+        (
+            ((1, 1), "200 OK", [("ETag", '"v1"')]),
+            Compressor("gzip", 6, 1024),
+            '"v1"',
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_with_compressor_and_etag(
+    resp: Response, compressor: Compressor, expected: str
+):
+    resp.set_body([JSON_BODY[:100]], compressor=compressor)
+
+    assert resp.headers.get("etag") == expected
+
+
+@pytest.mark.parametrize(
+    "resp, version",
+    [
+        (((1, 1), "200 OK", [("Content-Type", "application/json")]), (1, 1)),
+        (((1, 0), "200 OK", [("Content-Type", "application/json")]), (1, 0)),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_with_compressor_and_unbuffered_stream(
+    resp: Response, version: tuple[int, int]
+):
+    resp.set_body(
+        (JSON_BODY[i : i + 100] for i in range(0, len(JSON_BODY), 100)),
+        max_buffered_size=512,
+        compressor=Compressor("deflate", 6, 1024),
+    )
+
+    assert "content-length" not in resp.headers
+    assert resp.headers.get("content-encoding") == "deflate"
+    assert resp.is_chunked is (version >= (1, 1))
+    assert zlib.decompress(b"".join(resp.body)) == JSON_BODY
+
+
+@pytest.mark.parametrize(
+    "resp, compressor, expected",
+    [
+        (
+            ((1, 1), "200 OK", [("Content-Type", "application/json")]),
+            Compressor("gzip", 6, 1024),
+            [("Content-Type", "application/json"), ("Content-Length", "13")],
+        ),
+        (
+            ((1, 1), "200 OK", [("Content-Type", "application/json")]),
+            Compressor(None, 6, 0),
+            [
+                ("Content-Type", "application/json"),
+                ("Vary", "Accept-Encoding"),
+                ("Content-Length", "13"),
+            ],
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [("Content-Type", "application/json"), ("Vary", "*")],
+            ),
+            Compressor(None, 6, 0),
+            [
+                ("Content-Type", "application/json"),
+                ("Vary", "*"),
+                ("Content-Length", "13"),
+            ],
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_without_compression(
+    resp: Response, compressor: Compressor, expected: list[tuple[str, str]]
+):
+    resp.set_body([b"Hello, World!"], compressor=compressor)
+
+    assert (resp.headers, list(resp.body)) == (expected, [b"Hello, World!"])
+
+
+@pytest.mark.parametrize(
+    "resp, content_length, expected",
+    [
+        (((1, 1), "200 OK", [("Content-Type", "text/plain")]), None, 90),
+        (
+            ((1, 1), "206 Partial Content", [("Content-Length", "20")]),
+            "20",
+            20,
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_with_file_wrapper(
+    resp: Response,
+    tmp_path: pathlib.Path,
+    content_length: str | None,
+    expected: int,
+):
+    path = tmp_path / "data.txt"
+    path.write_bytes(JSON_BODY[:100])
+    with open(path, "rb") as file:
+        file.seek(10)
+        body = FileWrapper(file)
+
+        resp.set_body(body, compressor=Compressor("gzip", 6, 0))
+
+        assert resp.body is body
+        assert resp.headers.get("content-length") == str(expected)
+        assert resp.headers.get("content-encoding") is None
+        assert resp.sendfile_range() == (file.fileno(), 10, expected)
+
+
+@pytest.mark.parametrize(
+    "resp",
+    [
+        ((1, 1), "304 Not Modified", [("ETag", '"abc"')]),
+        ((1, 1), "204 No Content", []),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_without_content(resp: Response):
+    resp.set_body([])
+
+    assert "content-length" not in resp.headers
+    assert list(resp.body_stream()) == []
+
+
+@pytest.mark.parametrize(
+    "resp",
+    [((1, 1), "200 OK", [("Content-Type", "text/plain")])],
+    indirect=["resp"],
+)
+def test_sendfile_range_without_file(resp: Response):
+    resp.set_body([b"Hello, World!"])
+
+    assert resp.sendfile_range() is None
+
+
+@pytest.mark.parametrize(
+    "resp, response_body, expected",
+    [
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                ],
+            ),
+            [b"Hello, ", b"World!"],
+            [
+                ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                ("Server", "hello-web-server"),
+                ("Connection", "keep-alive"),
+                ("Content-Length", "13"),
+            ],
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Length", "1024"),
+                ],
+            ),
+            (data for data in [b"Hello, ", b"World!"]),
+            [
+                ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                ("Server", "hello-web-server"),
+                ("Connection", "keep-alive"),
+                ("Content-Length", "1024"),
+            ],
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                ],
+            ),
+            (data for data in [b"Hello, ", b"World!"]),
+            [
+                ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                ("Server", "hello-web-server"),
+                ("Connection", "keep-alive"),
+            ],
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_omit_body(
+    resp: Response,
+    response_body: Iterable[bytes],
+    expected: list[tuple[str, str]],
+):
+    resp.omit_body(response_body)
+
+    assert resp.headers == expected
+    assert resp.body == []
+
+
+@pytest.mark.parametrize(
+    "resp, expected",
+    [
+        (((1, 1), "200 OK", []), "90"),
+        (((1, 1), "200 OK", [("Content-Length", "20")]), "20"),
+    ],
+    indirect=["resp"],
+)
+def test_omit_body_with_file_wrapper(
+    resp: Response, tmp_path: pathlib.Path, expected: str
+):
+    path = tmp_path / "data.txt"
+    path.write_bytes(JSON_BODY[:100])
+    with open(path, "rb") as file:
+        file.seek(10)
+
+        resp.omit_body(FileWrapper(file), compressor=Compressor("gzip", 6, 0))
+
+    assert resp.headers.get("content-length") == expected
+    assert resp.headers.get("content-encoding") is None
+    assert resp.body == []
+
+
 @pytest.fixture
 def body_written_response(request: pytest.FixtureRequest) -> Response:
     version, status, headers, body = request.param
@@ -594,7 +1040,7 @@ def test_is_chunked(resp: Response, expected: bool):
                 ],
                 [b"Hello, world!"],
             ),
-            [b"Hello, world!"],
+            [(b"Hello, world!",)],
         ),
         (
             (
@@ -608,7 +1054,7 @@ def test_is_chunked(resp: Response, expected: bool):
                 ],
                 [b"<h1>Not Found</h1>"],
             ),
-            [b"<h1>Not Found</h1>"],
+            [(b"<h1>Not Found</h1>",)],
         ),
         (
             (
@@ -622,7 +1068,11 @@ def test_is_chunked(resp: Response, expected: bool):
                 ],
                 [b"Hello, ", b"world!"],
             ),
-            [b"7\r\nHello, \r\n", b"6\r\nworld!\r\n", b"0\r\n\r\n"],
+            [
+                (b"7\r\nHello, \r\n",),
+                (b"6\r\nworld!\r\n",),
+                (b"0\r\n\r\n",),
+            ],
         ),
         (
             (
@@ -636,7 +1086,29 @@ def test_is_chunked(resp: Response, expected: bool):
                 ],
                 [b"Hello, ", b"world!", b""],
             ),
-            [b"7\r\nHello, \r\n", b"6\r\nworld!\r\n", b"0\r\n\r\n"],
+            [
+                (b"7\r\nHello, \r\n",),
+                (b"6\r\nworld!\r\n",),
+                (b"0\r\n\r\n",),
+            ],
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Thu, 04 Jul 2025 10:00:00 -0000"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Transfer-Encoding", "chunked"),
+                ],
+                [b"abcdefghijklmnopqrstuvwxyz", b"x" * 65536],
+            ),
+            [
+                (b"1a\r\nabcdefghijklmnopqrstuvwxyz\r\n",),
+                (b"10000\r\n", b"x" * 65536, b"\r\n"),
+                (b"0\r\n\r\n",),
+            ],
         ),
     ],
     indirect=["body_written_response"],
@@ -697,6 +1169,22 @@ def test_body_stream(body_written_response: Response, expected: list[bytes]):
             ),
             False,
         ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [("Connection", "keep-alive"), ("Content-Length", "13")],
+            ),
+            False,
+        ),
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [("Connection", "keep-alive"), ("Transfer-Encoding", "chunked")],
+            ),
+            False,
+        ),
     ],
     indirect=["resp"],
 )
@@ -744,6 +1232,22 @@ def test_bad_request(
     assert response.body == body
 
 
+def test_request_header_fields_too_large():
+    response = Response.request_header_fields_too_large(LimitRequestHeadersTotal(1024))
+
+    content = (
+        b"<h1>431 Request Header Fields Too Large</h1>"
+        b"<p>Request header block is larger than 1024 bytes</p>"
+    )
+    assert response.status == "431 Request Header Fields Too Large"
+    assert response.headers == [
+        ("Content-Type", "text/html"),
+        ("Connection", "close"),
+        ("Content-Length", f"{len(content)}"),
+    ]
+    assert response.body == [content]
+
+
 @pytest.mark.parametrize(
     "exc, expected",
     [
@@ -780,3 +1284,68 @@ def test_internal_server_error(
     assert response.status == "500 Internal Server Error"
     assert response.headers == headers
     assert response.body == body
+
+
+@pytest.mark.parametrize(
+    "resp, response_body, expected",
+    [
+        (
+            ((1, 1), "200 OK", [("Connection", "keep-alive")]),
+            [b"hi"],
+            [("Connection", "keep-alive"), ("Content-Length", "2")],
+        ),
+        (
+            ((1, 1), "200 OK", [("Connection", "keep-alive")]),
+            (data for data in [b"x" * 100_000, b"x" * 20_000]),
+            [("Connection", "keep-alive"), ("Transfer-Encoding", "chunked")],
+        ),
+        (
+            ((1, 0), "200 OK", [("Connection", "keep-alive")]),
+            (data for data in [b"x" * 100_000, b"x" * 20_000]),
+            [("Connection", "close")],
+        ),
+        (
+            ((1, 1), "204 No Content", [("Connection", "keep-alive")]),
+            [],
+            [("Connection", "keep-alive")],
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_set_body_chooses_connection(
+    resp: Response,
+    response_body: Iterable[bytes],
+    expected: list[tuple[str, str]],
+):
+    resp.set_body(response_body)
+
+    assert resp.headers == expected
+
+
+@pytest.mark.parametrize(
+    "resp, expected",
+    [
+        (
+            ((1, 1), "200 OK", [("Connection", "keep-alive")]),
+            [("Connection", "keep-alive"), ("Transfer-Encoding", "chunked")],
+        ),
+        (
+            ((1, 1), "200 OK", [("Connection", "keep-alive"), ("Content-Length", "5")]),
+            [("Connection", "keep-alive"), ("Content-Length", "5")],
+        ),
+        (
+            ((1, 0), "200 OK", [("Connection", "keep-alive")]),
+            [("Connection", "close")],
+        ),
+        (
+            ((1, 1), "304 Not Modified", [("Connection", "keep-alive")]),
+            [("Connection", "keep-alive")],
+        ),
+    ],
+    indirect=["resp"],
+)
+def test_stream_body(resp: Response, expected: list[tuple[str, str]]):
+    resp.stream_body()
+
+    assert resp.headers == expected
+    assert resp.body == []
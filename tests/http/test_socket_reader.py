@@ -76,6 +76,19 @@ def test_unread(socket_reader_factory: SocketReaderFactory):
     assert socket_reader.read(size=None) == b"qwertyasdfgh"
 
 
+def test_reset(socket_reader_factory: SocketReaderFactory):
+    socket_reader = socket_reader_factory(b"GET /a\r\nGET /b\r\n", 8192)
+    assert socket_reader.read_until(b"\r\n") == b"GET /a\r\n"
+
+    socket_reader.reset()
+
+    assert socket_reader.pending == 8
+    assert socket_reader.buf.getvalue() == b"GET /b\r\n"
+    assert socket_reader.read(size=3) == b"GET"
+    assert socket_reader.read(size=None) == b" /b\r\n"
+    assert socket_reader.pending == 0
+
+
 @pytest.mark.parametrize(
     "size, error_type, error_message",
     [
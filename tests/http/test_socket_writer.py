@@ -0,0 +1,185 @@
+import pathlib
+import socket
+import threading
+import time
+from collections.abc import Generator
+from unittest import mock
+
+import pytest
+
+from tests.conftest import MockCallList
+from web_server.errors import WriteTimeout
+from web_server.http.writer import SocketWriter
+
+
+@pytest.fixture
+def socket_pair() -> Generator[tuple[socket.socket, socket.socket], None, None]:
+    server_side, client_side = socket.socketpair()
+    server_side.setblocking(False)
+    server_side.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    with server_side, client_side:
+        yield server_side, client_side
+
+
+@pytest.mark.parametrize(
+    "sent_sizes, data, expected",
+    [
+        (
+            [13],
+            b"Hello, World!",
+            [mock.call(b"Hello, World!")],
+        ),
+        (
+            [5, 8],
+            b"Hello, World!",
+            [mock.call(b"Hello, World!"), mock.call(b", World!")],
+        ),
+        (
+            [1, 2, 10],
+            b"Hello, World!",
+            [
+                mock.call(b"Hello, World!"),
+                mock.call(b"ello, World!"),
+                mock.call(b"lo, World!"),
+            ],
+        ),
+        ([], b"", []),
+    ],
+)
+def test_write_with_partial_send(
+    sent_sizes: list[int], data: bytes, expected: MockCallList
+):
+    sock = mock.Mock(spec=socket.socket)
+    sock.send.side_effect = sent_sizes
+    writer = SocketWriter(sock)
+
+    writer.write(data)
+
+    assert sock.send.call_args_list == expected
+    assert writer.bytes_written == len(data)
+
+
+@pytest.mark.parametrize(
+    "sent_sizes, buffers, expected",
+    [
+        (
+            [12],
+            (b"7\r\n", b"Hello, ", b"\r\n"),
+            [mock.call((b"7\r\n", b"Hello, ", b"\r\n"))],
+        ),
+        (
+            [5, 7],
+            (b"7\r\n", b"Hello, ", b"\r\n"),
+            [
+                mock.call((b"7\r\n", b"Hello, ", b"\r\n")),
+                mock.call((b"llo, ", b"\r\n")),
+            ],
+        ),
+        (
+            [3, 9],
+            (b"7\r\n", b"", b"Hello, ", b"\r\n"),
+            [
+                mock.call((b"7\r\n", b"", b"Hello, ", b"\r\n")),
+                mock.call((b"Hello, ", b"\r\n")),
+            ],
+        ),
+        ([], (b"",), []),
+    ],
+)
+def test_writev_with_partial_send(
+    sent_sizes: list[int], buffers: tuple[bytes, ...], expected: MockCallList
+):
+    sock = mock.Mock(spec=socket.socket)
+    sock.sendmsg.side_effect = sent_sizes
+    writer = SocketWriter(sock)
+
+    writer.writev(buffers)
+
+    assert sock.sendmsg.call_args_list == expected
+    assert writer.bytes_written == sum(len(buf) for buf in buffers)
+
+
+def test_write_waits_for_slow_reader(socket_pair: tuple[socket.socket, socket.socket]):
+    server_side, client_side = socket_pair
+    data = b"x" * (1024 * 1024)
+    received = bytearray()
+
+    def slow_reader() -> None:
+        while len(received) < len(data):
+            time.sleep(0.001)
+            received.extend(client_side.recv(65536))
+
+    reader = threading.Thread(target=slow_reader)
+    reader.start()
+    writer = SocketWriter(server_side, timeout=5.0)
+    writer.write(data)
+    reader.join()
+
+    assert bytes(received) == data
+    assert writer.bytes_written == len(data)
+    assert writer.blocked_time > 0
+
+
+def test_write_with_stalled_reader(socket_pair: tuple[socket.socket, socket.socket]):
+    server_side, _ = socket_pair
+    writer = SocketWriter(server_side, timeout=0.05)
+
+    with pytest.raises(WriteTimeout, match="Write timed out after 0.05s"):
+        writer.write(b"x" * (16 * 1024 * 1024))
+
+    assert 0 < writer.bytes_written < 16 * 1024 * 1024
+    assert writer.blocked_time >= 0.05
+
+
+def test_write_with_trickling_reader(
+    socket_pair: tuple[socket.socket, socket.socket],
+):
+    server_side, client_side = socket_pair
+    stop = threading.Event()
+
+    def trickling_reader() -> None:
+        while not stop.wait(0.1):
+            client_side.recv(65536)
+
+    reader = threading.Thread(target=trickling_reader)
+    reader.start()
+    writer = SocketWriter(server_side, timeout=0.3)
+    try:
+        with pytest.raises(WriteTimeout):
+            writer.write(b"x" * (64 * 1024 * 1024))
+    finally:
+        stop.set()
+        reader.join()
+
+    assert writer.blocked_time >= 0.3
+    writer.reset()
+    assert writer.blocked_time == 0
+
+
+@pytest.mark.parametrize("offset, count", [(0, 1024 * 1024), (1000, 5000)])
+def test_sendfile_waits_for_slow_reader(
+    socket_pair: tuple[socket.socket, socket.socket],
+    tmp_path: pathlib.Path,
+    offset: int,
+    count: int,
+):
+    server_side, client_side = socket_pair
+    data = bytes(range(256)) * 4096
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    received = bytearray()
+
+    def slow_reader() -> None:
+        while len(received) < count:
+            time.sleep(0.001)
+            received.extend(client_side.recv(65536))
+
+    reader = threading.Thread(target=slow_reader)
+    reader.start()
+    writer = SocketWriter(server_side, timeout=5.0)
+    with open(path, "rb") as file:
+        writer.sendfile(file.fileno(), offset, count)
+    reader.join()
+
+    assert bytes(received) == data[offset : offset + count]
+    assert writer.bytes_written == count
@@ -1,21 +1,24 @@
+import dataclasses
 import glob
 import os
 
 import pytest
 
 from tests.http import treq
+from web_server.config import PARSER_BACKENDS
 
 dirname = os.path.dirname(__file__)
 reqdir = os.path.join(dirname, "requests", "valid")
 httpfiles = glob.glob(os.path.join(reqdir, "*.http"))
 
 
+@pytest.mark.parametrize("parser_backend", PARSER_BACKENDS)
 @pytest.mark.parametrize("fname", httpfiles)
-def test_http_parser(fname):
+def test_http_parser(fname, parser_backend):
     env = treq.load_py(os.path.splitext(fname)[0] + ".py")
 
     expect = env["request"]
-    cfg = env["cfg"]
+    cfg = dataclasses.replace(env["cfg"], parser_backend=parser_backend)
     req = treq.request(fname, expect)
 
     for case in req.gen_cases(cfg):
@@ -1,10 +1,11 @@
 import tempfile
+import time
 from collections.abc import Generator, Sequence
-from typing import IO
+from typing import IO, Any
 
 import pytest
 
-from web_server.wsgi import WSGIErrorStream
+from web_server.wsgi import BufferedErrorStream, WSGIErrorStream
 
 
 @pytest.fixture
@@ -59,3 +60,73 @@ def test_writelines(
     tmp_file.seek(0)
 
     assert tmp_file.read() == expected
+
+
+@pytest.fixture
+def buffered_error_stream(
+    tmp_file: IO[str], request: pytest.FixtureRequest
+) -> Generator[BufferedErrorStream, None, None]:
+    options: dict[str, Any] = getattr(request, "param", dict())
+    stream = BufferedErrorStream(WSGIErrorStream([tmp_file]), **options)
+    yield stream
+    stream.close()
+
+
+def test_buffered_write(buffered_error_stream: BufferedErrorStream, tmp_file: IO[str]):
+    buffered_error_stream.write("line1\n")
+    buffered_error_stream.writelines(["line2", "\n"])
+    tmp_file.seek(0)
+
+    assert tmp_file.read() == ""
+
+    buffered_error_stream.close()
+    buffered_error_stream.write("late\n")
+    tmp_file.seek(0)
+
+    assert tmp_file.read() == "line1\nline2\n"
+
+
+@pytest.mark.parametrize(
+    "buffered_error_stream",
+    [dict(flush_interval=None)],
+    indirect=["buffered_error_stream"],
+)
+def test_buffered_flush_in_background(
+    buffered_error_stream: BufferedErrorStream, tmp_file: IO[str]
+):
+    buffered_error_stream.start()
+    buffered_error_stream.write("line1\n")
+    buffered_error_stream.flush()
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        tmp_file.seek(0)
+        if tmp_file.read():
+            break
+        time.sleep(0.01)
+    buffered_error_stream.write("line2\n")
+    buffered_error_stream.close()
+    tmp_file.seek(0)
+
+    assert tmp_file.read() == "line1\nline2\n"
+
+
+@pytest.mark.parametrize(
+    "buffered_error_stream, expected",
+    [
+        (dict(buffer_size=10, overflow="drop-new"), ("1234567890", 14)),
+        (dict(buffer_size=10, overflow="drop-old"), ("67890abc", 16)),
+    ],
+    indirect=["buffered_error_stream"],
+)
+def test_buffered_overflow(
+    buffered_error_stream: BufferedErrorStream,
+    tmp_file: IO[str],
+    expected: tuple[str, int],
+):
+    for data in ["12345", "67890", "abc", "x" * 11]:
+        buffered_error_stream.write(data)
+    buffered_error_stream.close()
+    tmp_file.seek(0)
+
+    assert (tmp_file.read(), buffered_error_stream.dropped) == expected
@@ -9,7 +9,7 @@ from typing import cast
 
 from tests import fake
 from web_server.config import MessageConfig
-from web_server.http.parser import RequestParser
+from web_server.http import parser
 from web_server.http.reader import SocketReader
 from web_server.util import split_request_uri
 
@@ -256,7 +256,7 @@ class request:
         fake_sock = fake.FakeSocket(sender())
         fake_sock = cast(socket.socket, fake_sock)
         socket_reader = SocketReader(sock=fake_sock, max_chunk=8192)
-        p = RequestParser(cfg=cfg, socket_reader=socket_reader)
+        p = parser.create_parser(cfg=cfg, socket_reader=socket_reader)
         parsed_request_idx = -1
         for parsed_request_idx, req in enumerate(p.parse()):
             self.same(req, sizer, matcher, cases.pop(0))
@@ -304,7 +304,7 @@ class badrequest:
         fake_sock = fake.FakeSocket(self.send())
         fake_sock = cast(socket.socket, fake_sock)
         socket_reader = SocketReader(sock=fake_sock, max_chunk=8192)
-        p = RequestParser(cfg=cfg, socket_reader=socket_reader)
+        p = parser.create_parser(cfg=cfg, socket_reader=socket_reader)
         # must fully consume iterator, otherwise EOF errors could go unnoticed
         for _ in p.parse():
             pass
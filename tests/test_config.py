@@ -1,3 +1,5 @@
+import dataclasses
+
 import pytest
 
 from web_server.config import Config, EnvConfig
@@ -44,3 +46,20 @@ def test_parse_path_with_non_subset_path(cfg: Config, path: str):
         match=f"Request path {path} does not start with SCRIPT_NAME {cfg.env.script_name}",
     ):
         cfg.parse_path(path)
+
+
+@pytest.mark.parametrize(
+    "cfg, expected",
+    [("", 0), ("/", 0), ("/app", 4), ("/app/", 4)],
+    indirect=["cfg"],
+)
+def test_script_name_length(cfg: Config, expected: int):
+    assert cfg.env.script_name_length == expected
+
+
+@pytest.mark.parametrize("cfg", [""], indirect=["cfg"])
+def test_frozen(cfg: Config):
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cfg.env = EnvConfig.custom(script_name="/app")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cfg.message.limit_request_line = 0
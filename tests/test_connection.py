@@ -10,7 +10,9 @@ from web_server.types import ExcInfo
 
 @pytest.fixture
 def mock_sock() -> mock.Mock:
-    return mock.Mock(spec=socket.socket)
+    sock = mock.Mock(spec=socket.socket)
+    sock.send.side_effect = len
+    return sock
 
 
 @pytest.fixture
@@ -21,17 +23,21 @@ def connection(mock_sock: mock.Mock) -> Connection:
 @pytest.mark.parametrize(
     "response_body, expected",
     [
-        (b"Hello, World!", b"Hello, World!"),
-        (b"", b""),
-        (b"Response with some data", b"Response with some data"),
+        (b"Hello, World!", [mock.call(b"Hello, World!")]),
+        (b"", []),
+        (b"Response with some data", [mock.call(b"Response with some data")]),
     ],
 )
 def test_write(
-    connection: Connection, response_body: bytes, mock_sock: mock.Mock, expected: bytes
+    connection: Connection,
+    response_body: bytes,
+    mock_sock: mock.Mock,
+    expected: MockCallList,
 ):
     connection.write(response_body)
 
-    mock_sock.sendall.assert_called_once_with(expected)
+    assert mock_sock.send.call_args_list == expected
+    assert connection.writer.bytes_written == len(response_body)
 
 
 @pytest.mark.parametrize(
@@ -102,9 +108,9 @@ def test_start_response(
         status=status,
         headers=headers,
     )
-    mock_sock.sendall.assert_not_called()
+    mock_sock.send.assert_not_called()
     write(response_body)
-    mock_sock.sendall.assert_has_calls(expected)
+    mock_sock.send.assert_has_calls(expected)
 
 
 @pytest.mark.parametrize(
@@ -167,10 +173,10 @@ def test_start_response_duplication_called(
             headers=headers,
             exc_info=exc_info,
         )
-        mock_sock.sendall.assert_not_called()
-        mock_sock.sendall.assert_has_calls(b"")
+        mock_sock.send.assert_not_called()
+        mock_sock.send.assert_has_calls(b"")
     write(response_body)
-    mock_sock.sendall.assert_has_calls(expected)
+    mock_sock.send.assert_has_calls(expected)
 
 
 @pytest.mark.parametrize(
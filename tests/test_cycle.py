@@ -1,4 +1,5 @@
 import socket
+import zlib
 from collections.abc import Callable, Iterable
 from unittest import mock
 
@@ -6,31 +7,43 @@ import pytest
 
 from tests import support
 from tests.conftest import MockCallList
-from web_server.config import Config
+from web_server.config import Config, ResponseConfig
 from web_server.connection import Connection
 from web_server.cycle import Cycle
 from web_server.http import Request, RequestBody, Response
-from web_server.wsgi import WSGIEnviron
-from web_server.types import ExcInfo
+from web_server.wsgi import WSGIEnviron, WSGIErrorStream
+from web_server.types import ExcInfo, WSGIApplication
+
+TEMPLATE = WSGIEnviron.template(
+    cfg=Config.default(),
+    server=("localhost", 8000),
+    errors=mock.Mock(spec=WSGIErrorStream),
+)
 
 
 @pytest.fixture
 def mock_sock() -> mock.Mock:
-    return mock.Mock(spec=socket.socket)
+    sock = mock.Mock(spec=socket.socket)
+    sock.send.side_effect = len
+    return sock
 
 
 @pytest.fixture
-def request_factory() -> Callable[[tuple[int, int]], Request]:
+def request_factory() -> Callable[..., Request]:
     fake_request_body = mock.Mock(spec=RequestBody)
 
-    def _factory(protocol_version: tuple[int, int]) -> Request:
+    def _factory(
+        protocol_version: tuple[int, int] = (1, 1),
+        method: str = "GET",
+        headers: list[tuple[str, str]] | None = None,
+    ) -> Request:
         return Request(
-            method="GET",
+            method=method,
             path="/path/to/resource",
             query="query=string",
             fragment="fragment",
             version=protocol_version,
-            headers=[],
+            headers=headers or [],
             body=fake_request_body,
             trailers=[],
         )
@@ -39,22 +52,35 @@ def request_factory() -> Callable[[tuple[int, int]], Request]:
 
 
 @pytest.fixture
-def cycle(
-    mock_sock: mock.Mock,
-    request_factory: Callable[[tuple[int, int]], Request],
-    request: pytest.FixtureRequest,
-) -> Cycle:
+def cycle_factory(
+    mock_sock: mock.Mock, request_factory: Callable[..., Request]
+) -> Callable[..., Cycle]:
+    def _factory(
+        protocol_version: tuple[int, int] = (1, 1),
+        method: str = "GET",
+        headers: list[tuple[str, str]] | None = None,
+        app: WSGIApplication = support.app,
+        cfg: ResponseConfig = ResponseConfig.default(),
+    ) -> Cycle:
+        req = request_factory(protocol_version, method, headers)
+        environ = WSGIEnviron.build(
+            cfg=Config.default(), template=TEMPLATE, request=req
+        )
+        return Cycle(
+            conn=Connection(sock=mock_sock),
+            request=req,
+            environ=environ,
+            app=app,
+            cfg=cfg,
+        )
+
+    return _factory
+
+
+@pytest.fixture
+def cycle(cycle_factory: Callable[..., Cycle], request: pytest.FixtureRequest) -> Cycle:
     protocol_version: tuple[int, int] = request.param
-    req = request_factory(protocol_version)
-    conn = Connection(sock=mock_sock)
-    environ = WSGIEnviron.build(
-        cfg=Config.default(), server=("localhost", "8000"), request=req
-    )
-    return Cycle(
-        conn=conn,
-        environ=environ,
-        app=support.app,
-    )
+    return cycle_factory(protocol_version)
 
 
 @pytest.mark.parametrize(
@@ -75,10 +101,10 @@ def cycle(
                     b"Server: hello-web-server\r\n"
                     b"Connection: close\r\n"
                     b"Content-Type: text/plain\r\n"
-                    b"Content-Length: 13\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
                     b"\r\n"
                 ),
-                mock.call(b"Hello, World!"),
+                mock.call(b"d\r\nHello, World!\r\n"),
             ],
         ),
         (
@@ -96,7 +122,6 @@ def cycle(
                     b"Server: hello-web-server\r\n"
                     b"Connection: close\r\n"
                     b"Content-Type: text/html\r\n"
-                    b"Content-Length: 18\r\n"
                     b"\r\n"
                 ),
                 mock.call(b"<h1>Not Found</h1>"),
@@ -117,10 +142,10 @@ def cycle(
                     b"Server: hello-web-server\r\n"
                     b"Connection: close\r\n"
                     b"Content-Type: application/json\r\n"
-                    b"Content-Length: 34\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
                     b"\r\n"
                 ),
-                mock.call(b'{"error": "Internal Server Error"}'),
+                mock.call(b'22\r\n{"error": "Internal Server Error"}\r\n'),
             ],
         ),
         (
@@ -138,10 +163,10 @@ def cycle(
                     b"Server: hello-web-server\r\n"
                     b"Connection: close\r\n"
                     b"Content-Type: text/plain\r\n"
-                    b"Content-Length: 13\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
                     b"\r\n"
                 ),
-                mock.call(b"Hello, World!"),
+                mock.call(b"d\r\nHello, World!\r\n"),
             ],
         ),
     ],
@@ -158,9 +183,17 @@ def test_start_response(
         "email.utils.formatdate", return_value="Fri, 04 Jul 2025 10:00:00 GMT"
     ):
         write = cycle.start_response(*response_params)
-        mock_sock.sendall.assert_not_called()
+        mock_sock.send.assert_not_called()
         write(response_body)
-        mock_sock.sendall.assert_has_calls(expected)
+        mock_sock.send.assert_has_calls(expected)
+
+
+@pytest.mark.parametrize("cycle", [(1, 1)], indirect=["cycle"])
+def test_start_response_drafts_from_parsed_request(cycle: Cycle):
+    with mock.patch.object(Response, "draft", wraps=Response.draft) as draft:
+        cycle.start_response("200 OK", [("Content-Type", "text/plain")])
+
+    draft.assert_called_once_with(cycle.request, keep_alive=False)
 
 
 @pytest.mark.parametrize(
@@ -184,10 +217,10 @@ def test_start_response(
                     b"Server: hello-web-server\r\n"
                     b"Connection: close\r\n"
                     b"Content-Type: text/html\r\n"
-                    b"Content-Length: 18\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
                     b"\r\n"
                 ),
-                mock.call(b"<h1>Not Found</h1>"),
+                mock.call(b"12\r\n<h1>Not Found</h1>\r\n"),
             ],
         ),
         (
@@ -212,10 +245,10 @@ def test_start_response(
                     b"Server: hello-web-server\r\n"
                     b"Connection: close\r\n"
                     b"Content-Type: application/json\r\n"
-                    b"Content-Length: 34\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
                     b"\r\n"
                 ),
-                mock.call(b"{'error': 'Internal Server Error'}"),
+                mock.call(b"22\r\n{'error': 'Internal Server Error'}\r\n"),
             ],
         ),
     ],
@@ -239,10 +272,10 @@ def test_start_response_duplication_called(
                 headers=headers,
                 exc_info=exc_info,
             )
-            mock_sock.sendall.assert_not_called()
-            mock_sock.sendall.assert_has_calls(b"")
+            mock_sock.send.assert_not_called()
+            mock_sock.send.assert_has_calls(b"")
         write(response_body)
-        mock_sock.sendall.assert_has_calls(expected)
+        mock_sock.send.assert_has_calls(expected)
 
 
 @pytest.mark.parametrize(
@@ -334,21 +367,10 @@ def test_start_response_raise_error(
 
 @pytest.fixture
 def response_ready_cycle(
-    mock_sock: mock.Mock,
-    request_factory: Callable[[tuple[int, int]], Request],
-    request: pytest.FixtureRequest,
+    cycle_factory: Callable[..., Cycle], request: pytest.FixtureRequest
 ) -> Cycle:
     protocol_version, status, headers, resp_body = request.param
-    req = request_factory(protocol_version)
-    conn = Connection(sock=mock_sock)
-    environ = WSGIEnviron.build(
-        cfg=Config.default(), server=("localhost", "8000"), request=req
-    )
-    cycle = Cycle(
-        conn=conn,
-        environ=environ,
-        app=support.app,
-    )
+    cycle = cycle_factory(protocol_version)
     cycle.resp = Response(
         version=protocol_version,
         status=status,
@@ -414,7 +436,6 @@ def response_ready_cycle(
                 ),
                 mock.call(b"7\r\nHello, \r\n"),
                 mock.call(b"6\r\nWorld!\r\n"),
-                mock.call(b"0\r\n\r\n"),
             ],
         ),
     ],
@@ -429,4 +450,225 @@ def test_write(
     for data in response_body:
         response_ready_cycle.write(data)
 
-    mock_sock.sendall.assert_has_calls(expected)
+    mock_sock.send.assert_has_calls(expected)
+
+
+def test_handle_request_with_head_request(cycle_factory: Callable[..., Cycle]):
+    closed = []
+
+    class ClosingBody:
+        def __iter__(self):
+            raise AssertionError("HEAD response body must not be iterated")
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return ClosingBody()
+
+    cycle = cycle_factory(method="HEAD", app=app)
+
+    resp = cycle.handle_request()
+
+    assert resp.headers.get("content-length") is None
+    assert list(resp.body_stream()) == []
+    assert closed == [True]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected_encoding",
+    [("gzip, deflate", "gzip"), ("identity", None)],
+)
+def test_handle_request_with_compression(
+    cycle_factory: Callable[..., Cycle],
+    accept_encoding: str,
+    expected_encoding: str | None,
+):
+    payload = b'{"message": "' + b"Hello, World! " * 100 + b'"}'
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return [payload]
+
+    cycle = cycle_factory(
+        headers=[("Accept-Encoding", accept_encoding)],
+        app=app,
+        cfg=ResponseConfig.custom(compression=True),
+    )
+
+    resp = cycle.handle_request()
+
+    body = b"".join(resp.body)
+    assert resp.headers.get("content-encoding") == expected_encoding
+    assert resp.headers.get("vary") == "Accept-Encoding"
+    assert resp.headers.get("content-length") == str(len(body))
+    if expected_encoding is not None:
+        body = zlib.decompress(body, wbits=31)
+    assert body == payload
+
+
+@pytest.mark.parametrize(
+    "response_ready_cycle, response_body, expected",
+    [
+        (
+            (
+                (1, 1),
+                "200 OK",
+                [
+                    ("Date", "Fri, 07 Jul 2025 10:00:00 GMT"),
+                    ("Server", "hello-web-server"),
+                    ("Connection", "keep-alive"),
+                    ("Content-Type", "text/plain"),
+                ],
+                None,
+            ),
+            [b"Hello, World!"],
+            [
+                mock.call(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Date: Fri, 07 Jul 2025 10:00:00 GMT\r\n"
+                    b"Server: hello-web-server\r\n"
+                    b"Connection: keep-alive\r\n"
+                    b"Content-Type: text/plain\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
+                    b"\r\n"
+                ),
+            ],
+        ),
+    ],
+    indirect=["response_ready_cycle"],
+)
+def test_write_with_head_request(
+    response_ready_cycle: Cycle,
+    response_body: Iterable[bytes],
+    mock_sock: mock.Mock,
+    expected: MockCallList,
+):
+    response_ready_cycle.request.method = "HEAD"
+
+    for data in response_body:
+        response_ready_cycle.write(data)
+
+    assert mock_sock.send.call_args_list == expected
+
+
+def test_close(cycle_factory: Callable[..., Cycle]):
+    closed = []
+
+    class ClosingBody(list):
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return ClosingBody([b"Hello, World!"])
+
+    cycle = cycle_factory(app=app)
+    cycle.handle_request()
+
+    assert closed == []
+    cycle.close()
+    cycle.close()
+    assert closed == [True]
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ([("Content-Type", "text/plain")], "keep-alive"),
+        ([("Content-Type", "text/plain"), ("Content-Length", "13")], "keep-alive"),
+    ],
+)
+def test_write_chooses_connection(
+    cycle_factory: Callable[..., Cycle],
+    headers: list[tuple[str, str]],
+    expected: str,
+):
+    cycle = cycle_factory(cfg=ResponseConfig.custom(keepalive_timeout=2.0))
+
+    cycle.start_response("200 OK", headers)(b"Hello, World!")
+
+    assert cycle.resp.headers.get("connection") == expected
+
+
+@pytest.mark.parametrize(
+    "protocol_version, expected",
+    [
+        (
+            (1, 1),
+            b"Transfer-Encoding: chunked\r\n\r\n"
+            b"6\r\nhello \r\n5\r\nworld\r\n1\r\n!\r\n0\r\n\r\n",
+        ),
+        ((1, 0), b"Content-Type: text/plain\r\n\r\nhello world!"),
+    ],
+)
+def test_handle_request_with_write(
+    cycle_factory: Callable[..., Cycle],
+    mock_sock: mock.Mock,
+    protocol_version: tuple[int, int],
+    expected: bytes,
+):
+    def app(environ, start_response):
+        write = start_response("200 OK", [("Content-Type", "text/plain")])
+        write(b"hello ")
+        write(b"world")
+        return [b"!"]
+
+    cycle = cycle_factory(protocol_version, app=app)
+
+    resp = cycle.handle_request()
+
+    sent = b"".join(call.args[0] for call in mock_sock.send.call_args_list)
+    assert sent.endswith(expected)
+    assert "content-length" not in resp.headers
+    assert resp.headers.get("connection") == "close"
+
+
+@pytest.mark.parametrize(
+    "response_body, accept_encoding, expected",
+    [
+        (
+            [b"x" * 3008],
+            "gzip",
+            [("Vary", "Accept-Encoding"), ("Content-Encoding", "gzip")],
+        ),
+        (
+            [b"x" * 3008],
+            "identity",
+            [("Vary", "Accept-Encoding"), ("Content-Length", "3008")],
+        ),
+        ([b"x" * 100], "gzip", [("Content-Length", "100")]),
+        (
+            (data for data in [b"x" * 100]),
+            "gzip",
+            [("Vary", "Accept-Encoding"), ("Content-Encoding", "gzip")],
+        ),
+    ],
+)
+def test_handle_request_with_head_request_and_compression(
+    cycle_factory: Callable[..., Cycle],
+    response_body: Iterable[bytes],
+    accept_encoding: str,
+    expected: list[tuple[str, str]],
+):
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return response_body
+
+    cycle = cycle_factory(
+        method="HEAD",
+        headers=[("Accept-Encoding", accept_encoding)],
+        app=app,
+        cfg=ResponseConfig.custom(compression=True),
+    )
+
+    resp = cycle.handle_request()
+
+    headers = [
+        (name, value)
+        for name, value in resp.headers
+        if name not in ("Date", "Server", "Connection", "Content-Type")
+    ]
+    assert headers == expected
+    assert list(resp.body_stream()) == []
@@ -1,6 +1,10 @@
+import sys
+from typing import Any
+
 import pytest
 
 from web_server.config import EnvConfig
+from web_server.errors import ConfigurationProblem
 
 
 @pytest.fixture
@@ -10,7 +14,14 @@ def expected(request: pytest.FixtureRequest) -> EnvConfig:
 
 @pytest.mark.parametrize(
     "expected",
-    [dict(script_name="")],
+    [
+        dict(
+            script_name="",
+            error_buffer_size=65536,
+            error_flush_interval=1.0,
+            error_overflow="drop-new",
+        )
+    ],
     indirect=["expected"],
 )
 def test_default(expected: EnvConfig):
@@ -32,3 +43,25 @@ def test_custom(options: dict[str, str], expected: EnvConfig):
     cfg = EnvConfig(**options)
 
     assert cfg == expected
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        (dict(error_buffer_size=1024), dict(error_buffer_size=1024)),
+        (dict(error_buffer_size=0), dict(error_buffer_size=sys.maxsize)),
+        (dict(error_buffer_size=-1), dict(error_buffer_size=65536)),
+        (dict(error_flush_interval=0.1), dict(error_flush_interval=0.1)),
+        (dict(error_flush_interval=0), dict(error_flush_interval=None)),
+        (dict(error_flush_interval=-1), dict(error_flush_interval=1.0)),
+        (dict(error_overflow="drop-old"), dict(error_overflow="drop-old")),
+    ],
+    indirect=["expected"],
+)
+def test_custom_error_stream(options: dict[str, Any], expected: EnvConfig):
+    assert EnvConfig.custom(**options) == expected
+
+
+def test_custom_unknown_error_overflow():
+    with pytest.raises(ConfigurationProblem):
+        EnvConfig.custom(error_overflow="block")
@@ -4,6 +4,7 @@ from typing import Any
 import pytest
 
 from web_server.config import MessageConfig
+from web_server.errors import ConfigurationProblem
 
 
 @pytest.fixture
@@ -18,8 +19,11 @@ def expected(request: pytest.FixtureRequest) -> MessageConfig:
             limit_request_line=4094,
             limit_request_fields=100,
             limit_request_field_size=8190,
+            limit_request_headers_total=65536,
             permit_unconventional_http_method=False,
             permit_unconventional_http_version=False,
+            parser_backend="reference",
+            request_head_cache_size=0,
         ),
     ],
     indirect=["expected"],
@@ -111,8 +115,59 @@ def test_default(expected: MessageConfig):
                 permit_unconventional_http_version=False,
             ),
         ),
+        (
+            dict(limit_request_headers_total=0),
+            dict(
+                limit_request_line=4094,
+                limit_request_fields=100,
+                limit_request_field_size=8190,
+                limit_request_headers_total=sys.maxsize,
+            ),
+        ),
+        (
+            dict(limit_request_headers_total=-1),
+            dict(
+                limit_request_line=4094,
+                limit_request_fields=100,
+                limit_request_field_size=8190,
+                limit_request_headers_total=65536,
+            ),
+        ),
+        (
+            dict(limit_request_headers_total=1024),
+            dict(
+                limit_request_line=4094,
+                limit_request_fields=100,
+                limit_request_field_size=8190,
+                limit_request_headers_total=1024,
+            ),
+        ),
+        (
+            dict(parser_backend="fast"),
+            dict(
+                limit_request_line=4094,
+                limit_request_fields=100,
+                limit_request_field_size=8190,
+                permit_unconventional_http_method=False,
+                permit_unconventional_http_version=False,
+                parser_backend="fast",
+            ),
+        ),
+        (
+            dict(request_head_cache_size=128),
+            dict(request_head_cache_size=128),
+        ),
+        (
+            dict(request_head_cache_size=-1),
+            dict(request_head_cache_size=0),
+        ),
     ],
     indirect=["expected"],
 )
 def test_custom(options: dict[str, Any], expected: MessageConfig):
     assert MessageConfig.custom(**options) == expected
+
+
+def test_custom_with_unknown_parser_backend():
+    with pytest.raises(ConfigurationProblem):
+        MessageConfig.custom(parser_backend="turbo")
@@ -0,0 +1,79 @@
+from typing import Any
+
+import pytest
+
+from web_server.config import ResponseConfig
+
+
+@pytest.fixture
+def expected(request: pytest.FixtureRequest) -> ResponseConfig:
+    return ResponseConfig(**request.param)
+
+
+@pytest.mark.parametrize(
+    "expected",
+    [
+        dict(
+            max_buffered_body_size=65536,
+            write_timeout=30.0,
+            read_timeout=5.0,
+            keepalive_timeout=0.0,
+            compression=False,
+            compression_level=6,
+            compression_min_size=1024,
+        )
+    ],
+    indirect=["expected"],
+)
+def test_default(expected: ResponseConfig):
+    assert ResponseConfig.default() == expected
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        (dict(), dict(max_buffered_body_size=65536, write_timeout=30.0)),
+        (
+            dict(max_buffered_body_size=0),
+            dict(max_buffered_body_size=0, write_timeout=30.0),
+        ),
+        (
+            dict(max_buffered_body_size=1024),
+            dict(max_buffered_body_size=1024, write_timeout=30.0),
+        ),
+        (
+            dict(max_buffered_body_size=-1),
+            dict(max_buffered_body_size=65536, write_timeout=30.0),
+        ),
+        (
+            dict(write_timeout=5.0),
+            dict(max_buffered_body_size=65536, write_timeout=5.0),
+        ),
+        (
+            dict(write_timeout=0),
+            dict(max_buffered_body_size=65536, write_timeout=None),
+        ),
+        (
+            dict(write_timeout=-1),
+            dict(max_buffered_body_size=65536, write_timeout=30.0),
+        ),
+        (dict(read_timeout=1.0), dict(read_timeout=1.0)),
+        (dict(read_timeout=0), dict(read_timeout=None)),
+        (dict(read_timeout=-1), dict(read_timeout=5.0)),
+        (dict(keepalive_timeout=5.0), dict(keepalive_timeout=5.0)),
+        (dict(keepalive_timeout=0), dict(keepalive_timeout=0)),
+        (dict(keepalive_timeout=-1), dict(keepalive_timeout=0.0)),
+        (dict(compression=True), dict(compression=True)),
+        (dict(compression_level=1), dict(compression_level=1)),
+        (dict(compression_level=0), dict(compression_level=0)),
+        (dict(compression_level=12), dict(compression_level=9)),
+        (dict(compression_level=-1), dict(compression_level=6)),
+        (dict(compression_min_size=0), dict(compression_min_size=0)),
+        (dict(compression_min_size=-1), dict(compression_min_size=1024)),
+    ],
+    indirect=["expected"],
+)
+def test_custom(options: dict[str, Any], expected: ResponseConfig):
+    cfg = ResponseConfig.custom(**options)
+
+    assert cfg == expected
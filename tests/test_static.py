@@ -0,0 +1,459 @@
+import email.utils
+import gzip
+import mmap
+import os
+import pathlib
+from collections.abc import Iterable
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from web_server.config import Config, ResponseConfig
+from web_server.connection import Connection
+from web_server.cycle import Cycle
+from web_server.http import FileWrapper, Request, RequestBody
+from web_server.static import (
+    FileCache,
+    FileCacheStats,
+    StaticFiles,
+    etag_matches,
+    parse_range,
+)
+from web_server.wsgi import WSGIEnviron, WSGIErrorStream
+
+CONTENT = b"body { color: black; }\n" * 100
+MTIME = 1751600000
+
+
+@pytest.fixture
+def static_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / "public"
+    (root / "css").mkdir(parents=True)
+    (root / "css" / "site.css").write_bytes(CONTENT)
+    (root / "app.js").write_bytes(b"console.log(1);\n")
+    (root / "app.js.gz").write_bytes(gzip.compress(b"console.log(1);\n"))
+    (tmp_path / "secret.txt").write_bytes(b"secret")
+    for path in (root / "css" / "site.css", root / "app.js", root / "app.js.gz"):
+        os.utime(path, (MTIME, MTIME))
+    return root
+
+
+@pytest.fixture(params=[None, dict(mmap_threshold=1024)], ids=["disk", "cache"])
+def static_files(
+    static_dir: pathlib.Path, request: pytest.FixtureRequest
+) -> StaticFiles:
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"from app"]
+
+    cache = None if request.param is None else FileCache(**request.param)
+    return StaticFiles(str(static_dir), prefix="/static", app=app, cache=cache)
+
+
+class StartResponse:
+    def __init__(self):
+        self.status: str | None = None
+        self.headers: dict[str, str] = {}
+
+    def __call__(self, status: str, headers: list[tuple[str, str]], exc_info=None):
+        self.status = status
+        self.headers = dict(headers)
+
+
+def call(
+    static_files: StaticFiles, path: str, method: str = "GET", **headers: str
+) -> tuple[StartResponse, bytes]:
+    environ: dict[str, Any] = {"REQUEST_METHOD": method, "PATH_INFO": path}
+    environ |= {f"HTTP_{name.upper()}": value for name, value in headers.items()}
+    start_response = StartResponse()
+    body: Iterable[bytes] = static_files(environ, start_response)
+    data = b"".join(body)
+    if isinstance(body, FileWrapper):
+        body.close()
+    return start_response, data
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("bytes=0-9", range(0, 10)),
+        ("bytes=10-", range(10, 100)),
+        ("bytes=-10", range(90, 100)),
+        ("bytes=-200", range(0, 100)),
+        ("bytes=90-200", range(90, 100)),
+        ("bytes=100-", range(0)),
+        ("bytes=-0", range(100, 100)),
+        ("bytes=9-0", None),
+        ("bytes=0-9, 20-29", None),
+        ("items=0-9", None),
+        ("bytes=-", None),
+        ("bytes=a-b", None),
+        ("bytes=\u00b2-", None),
+        ("bytes=-\u0661", None),
+    ],
+)
+def test_parse_range(value: str, expected: range | None):
+    assert parse_range(value, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+    ],
+)
+def test_etag_matches(value: str, expected: bool):
+    assert etag_matches(value, '"abc"') is expected
+
+
+def test_serve_file(static_files: StaticFiles):
+    start_response, body = call(static_files, "/static/css/site.css")
+
+    assert start_response.status == "200 OK"
+    assert start_response.headers["Content-Type"] == "text/css"
+    assert start_response.headers["Content-Length"] == str(len(CONTENT))
+    assert start_response.headers["Last-Modified"] == email.utils.formatdate(
+        MTIME, usegmt=True
+    )
+    assert start_response.headers["Accept-Ranges"] == "bytes"
+    assert "Vary" not in start_response.headers
+    assert body == CONTENT
+
+
+def test_serve_head(static_files: StaticFiles):
+    start_response, body = call(static_files, "/static/css/site.css", method="HEAD")
+
+    assert start_response.status == "200 OK"
+    assert start_response.headers["Content-Length"] == str(len(CONTENT))
+    assert body == b""
+
+
+@pytest.mark.parametrize(
+    "path, method, expected",
+    [
+        ("/static/missing.css", "GET", "404 Not Found"),
+        ("/static/css", "GET", "404 Not Found"),
+        ("/static/../secret.txt", "GET", "404 Not Found"),
+        ("/static/%2e%2e/secret.txt", "GET", "404 Not Found"),
+        ("/static/css/site.css%00", "GET", "404 Not Found"),
+        ("/static/css/site.css", "POST", "405 Method Not Allowed"),
+    ],
+)
+def test_serve_error(static_files: StaticFiles, path: str, method: str, expected: str):
+    start_response, body = call(static_files, path, method=method)
+
+    assert start_response.status == expected
+    assert body == b""
+
+
+@pytest.mark.parametrize("path", ["/", "/staticfiles/app.js", "/api/items"])
+def test_outside_prefix(static_files: StaticFiles, path: str):
+    start_response, body = call(static_files, path)
+
+    assert start_response.status == "200 OK"
+    assert body == b"from app"
+
+
+def test_outside_prefix_without_app(static_dir: pathlib.Path):
+    start_response, _ = call(StaticFiles(str(static_dir), prefix="/static"), "/")
+
+    assert start_response.status == "404 Not Found"
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        dict(if_modified_since=email.utils.formatdate(MTIME, usegmt=True)),
+        dict(if_modified_since=email.utils.formatdate(MTIME + 60, usegmt=True)),
+        dict(if_none_match="*"),
+    ],
+)
+def test_not_modified(static_files: StaticFiles, headers: dict[str, str]):
+    start_response, body = call(static_files, "/static/css/site.css", **headers)
+
+    assert start_response.status == "304 Not Modified"
+    assert "Content-Length" not in start_response.headers
+    assert body == b""
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        dict(if_modified_since=email.utils.formatdate(MTIME - 60, usegmt=True)),
+        dict(if_modified_since="not a date"),
+        dict(
+            if_none_match='"other"',
+            if_modified_since=email.utils.formatdate(MTIME, usegmt=True),
+        ),
+    ],
+)
+def test_modified(static_files: StaticFiles, headers: dict[str, str]):
+    start_response, body = call(static_files, "/static/css/site.css", **headers)
+
+    assert start_response.status == "200 OK"
+    assert body == CONTENT
+
+
+def test_not_modified_with_etag(static_files: StaticFiles):
+    first, _ = call(static_files, "/static/css/site.css")
+
+    start_response, _ = call(
+        static_files, "/static/css/site.css", if_none_match=first.headers["ETag"]
+    )
+
+    assert start_response.status == "304 Not Modified"
+    assert start_response.headers["ETag"] == first.headers["ETag"]
+
+
+@pytest.mark.parametrize(
+    "range_header, expected_range, expected",
+    [
+        ("bytes=0-9", "bytes 0-9/2300", CONTENT[:10]),
+        ("bytes=-5", "bytes 2295-2299/2300", CONTENT[-5:]),
+        ("bytes=2290-", "bytes 2290-2299/2300", CONTENT[2290:]),
+    ],
+)
+def test_range(
+    static_files: StaticFiles, range_header: str, expected_range: str, expected: bytes
+):
+    start_response, body = call(
+        static_files, "/static/css/site.css", range=range_header
+    )
+
+    assert start_response.status == "206 Partial Content"
+    assert start_response.headers["Content-Range"] == expected_range
+    assert start_response.headers["Content-Length"] == str(len(expected))
+    assert body == expected
+
+
+def test_range_not_satisfiable(static_files: StaticFiles):
+    start_response, body = call(
+        static_files, "/static/css/site.css", range="bytes=5000-"
+    )
+
+    assert start_response.status == "416 Range Not Satisfiable"
+    assert start_response.headers["Content-Range"] == "bytes */2300"
+    assert body == b""
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        dict(range="bytes=0-9, 20-29"),
+        dict(range="bytes=0-9", if_range='"stale"'),
+        dict(
+            range="bytes=0-9",
+            if_range=email.utils.formatdate(MTIME - 60, usegmt=True),
+        ),
+    ],
+)
+def test_range_ignored(static_files: StaticFiles, headers: dict[str, str]):
+    start_response, body = call(static_files, "/static/css/site.css", **headers)
+
+    assert start_response.status == "200 OK"
+    assert body == CONTENT
+
+
+def test_range_with_if_range(static_files: StaticFiles):
+    first, _ = call(static_files, "/static/css/site.css")
+
+    start_response, body = call(
+        static_files,
+        "/static/css/site.css",
+        range="bytes=0-9",
+        if_range=first.headers["ETag"],
+    )
+
+    assert start_response.status == "206 Partial Content"
+    assert body == CONTENT[:10]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected_encoding",
+    [("gzip, deflate", "gzip"), ("gzip;q=0", None), (None, None)],
+)
+def test_precompressed_sibling(
+    static_files: StaticFiles, accept_encoding: str | None, expected_encoding: str
+):
+    headers = {} if accept_encoding is None else dict(accept_encoding=accept_encoding)
+
+    start_response, body = call(static_files, "/static/app.js", **headers)
+
+    assert start_response.headers["Content-Type"] == "text/javascript"
+    assert start_response.headers.get("Content-Encoding") == expected_encoding
+    assert start_response.headers["Vary"] == "Accept-Encoding"
+    if expected_encoding is not None:
+        body = gzip.decompress(body)
+    assert body == b"console.log(1);\n"
+
+
+@pytest.fixture
+def cache(request: pytest.FixtureRequest) -> FileCache:
+    return FileCache(**request.param)
+
+
+@pytest.mark.parametrize(
+    "cache, path, expected_type",
+    [
+        (dict(), "css/site.css", bytes),
+        (dict(mmap_threshold=1024), "css/site.css", mmap.mmap),
+        (dict(max_file_size=1024), "css/site.css", type(None)),
+        (dict(max_size=1024), "css/site.css", type(None)),
+    ],
+    indirect=["cache"],
+)
+def test_file_cache_get(
+    cache: FileCache, static_dir: pathlib.Path, path: str, expected_type: type
+):
+    filename = str(static_dir / path)
+
+    file, data = cache.get(filename, accept_gzip=False)
+
+    assert file.filename == filename
+    assert isinstance(data, expected_type)
+    if data is not None:
+        assert data[:] == CONTENT
+    assert len(cache) == (data is not None)
+
+
+@pytest.mark.parametrize("cache", [dict()], indirect=["cache"])
+def test_file_cache_get_missing(cache: FileCache, static_dir: pathlib.Path):
+    assert cache.get(str(static_dir / "missing.css"), accept_gzip=False) is None
+    assert cache.stats() == FileCacheStats(
+        hits=0, misses=1, evictions=0, entries=0, size=0, mapped_size=0
+    )
+
+
+@pytest.mark.parametrize("cache", [dict(mmap_threshold=20)], indirect=["cache"])
+def test_file_cache_stats(cache: FileCache, static_dir: pathlib.Path):
+    for _ in range(3):
+        cache.get(str(static_dir / "css" / "site.css"), accept_gzip=False)
+    cache.get(str(static_dir / "app.js"), accept_gzip=False)
+    cache.get(str(static_dir / "app.js"), accept_gzip=True)
+
+    stats = cache.stats()
+
+    gz_size = (static_dir / "app.js.gz").stat().st_size
+    assert stats == FileCacheStats(
+        hits=2,
+        misses=3,
+        evictions=0,
+        entries=3,
+        size=len(CONTENT) + 16 + gz_size,
+        mapped_size=len(CONTENT) + gz_size,
+    )
+    assert stats.hit_rate == 0.4
+    assert FileCacheStats(0, 0, 0, 0, 0, 0).hit_rate == 0.0
+
+
+@pytest.mark.parametrize("cache", [dict()], indirect=["cache"])
+def test_file_cache_shares_file_across_accept_encoding(
+    cache: FileCache, static_dir: pathlib.Path
+):
+    filename = str(static_dir / "css" / "site.css")
+
+    plain, plain_data = cache.get(filename, accept_gzip=False)
+    accepting, accepting_data = cache.get(filename, accept_gzip=True)
+
+    assert accepting is plain
+    assert accepting_data is plain_data
+    assert cache.stats() == FileCacheStats(
+        hits=1, misses=1, evictions=0, entries=1, size=len(CONTENT), mapped_size=0
+    )
+
+
+@pytest.mark.parametrize("cache", [dict(max_size=5000)], indirect=["cache"])
+def test_file_cache_evicts_least_recently_used(
+    cache: FileCache, static_dir: pathlib.Path
+):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (static_dir / name).write_bytes(b"x" * 2000)
+
+    cache.get(str(static_dir / "a.txt"), accept_gzip=False)
+    cache.get(str(static_dir / "b.txt"), accept_gzip=False)
+    cache.get(str(static_dir / "a.txt"), accept_gzip=False)
+    cache.get(str(static_dir / "c.txt"), accept_gzip=False)
+
+    assert cache.stats() == FileCacheStats(
+        hits=1, misses=3, evictions=1, entries=2, size=4000, mapped_size=0
+    )
+    cache.get(str(static_dir / "a.txt"), accept_gzip=False)
+    assert cache.hits == 2
+
+
+@pytest.mark.parametrize(
+    "cache, expected",
+    [
+        (dict(revalidate_interval=3600), b"body { color: black; }\n"),
+        (dict(revalidate_interval=0), b"body { color: white; }\n"),
+    ],
+    indirect=["cache"],
+)
+def test_file_cache_revalidates(
+    cache: FileCache, static_dir: pathlib.Path, expected: bytes
+):
+    path = static_dir / "css" / "site.css"
+    cache.get(str(path), accept_gzip=False)
+    path.write_bytes(CONTENT.replace(b"black", b"white"))
+    os.utime(path, (MTIME + 60, MTIME + 60))
+
+    _, data = cache.get(str(path), accept_gzip=False)
+
+    assert data[: len(expected)] == expected
+    assert len(cache) == 1
+
+
+@pytest.mark.parametrize("cache", [dict(revalidate_interval=0)], indirect=["cache"])
+def test_file_cache_revalidates_removed_file(
+    cache: FileCache, static_dir: pathlib.Path
+):
+    path = static_dir / "css" / "site.css"
+    cache.get(str(path), accept_gzip=False)
+    path.unlink()
+
+    assert cache.get(str(path), accept_gzip=False) is None
+    assert cache.stats().size == 0
+
+
+@pytest.mark.parametrize(
+    "cache", [None, FileCache(mmap_threshold=1024)], ids=["disk", "cache"]
+)
+def test_static_response_is_not_compressed(
+    static_dir: pathlib.Path, cache: FileCache | None
+):
+    app = StaticFiles(str(static_dir), prefix="/static", cache=cache)
+    req = Request(
+        method="GET",
+        path="/static/css/site.css",
+        query="",
+        fragment="",
+        version=(1, 1),
+        headers=[("Accept-Encoding", "gzip")],
+        body=mock.Mock(spec=RequestBody),
+        trailers=[],
+    )
+    cfg = Config.default()
+    template = WSGIEnviron.template(
+        cfg=cfg, server=("localhost", 8000), errors=mock.Mock(spec=WSGIErrorStream)
+    )
+    cycle = Cycle(
+        conn=mock.Mock(spec=Connection),
+        request=req,
+        environ=WSGIEnviron.build(cfg=cfg, template=template, request=req),
+        app=app,
+        cfg=ResponseConfig.custom(compression=True),
+    )
+
+    resp = cycle.handle_request()
+    body = b"".join(bytes(data) for data in resp.body)
+    cycle.close()
+
+    assert resp.headers.get("content-encoding") is None
+    assert resp.headers.get("etag").startswith('"')
+    assert resp.headers.get("content-length") == str(len(CONTENT))
+    assert body == CONTENT
@@ -1,3 +1,5 @@
+import glob
+import os
 from urllib.parse import SplitResult
 
 import pytest
@@ -34,7 +36,48 @@ from web_server import util
             "///a/b?c=1#d",
             SplitResult(scheme="", netloc="", path="///a/b", query="c=1", fragment="d"),
         ),
+        (
+            "/a/b#c?d",
+            SplitResult(scheme="", netloc="", path="/a/b", query="", fragment="c?d"),
+        ),
+        (
+            "/a\tb?c=1",
+            SplitResult(scheme="", netloc="", path="/ab", query="c=1", fragment=""),
+        ),
+        (
+            "example.org:443",
+            SplitResult(
+                scheme="example.org", netloc="", path="443", query="", fragment=""
+            ),
+        ),
+        ("*", SplitResult(scheme="", netloc="", path="*", query="", fragment="")),
     ],
 )
 def test_split_request_uri(test_input, expected):
     assert util.split_request_uri(test_input) == expected
+
+
+def request_targets() -> list[str]:
+    reqdir = os.path.join(os.path.dirname(__file__), "http", "requests")
+    targets = []
+    for fname in glob.glob(os.path.join(reqdir, "**", "*.http"), recursive=True):
+        with open(fname, "rb") as handle:
+            data = handle.read()
+        data = data.replace(b"\n", b"").replace(b"\\r\\n", b"\r\n")
+        data = data.replace(b"\\t", b"\t").replace(b"\\0", b"\000")
+        tokens = util.bytes_to_str(data.split(b"\r\n", 1)[0]).split(" ")
+        if len(tokens) == 3 and tokens[1]:
+            targets.append(tokens[1])
+    return targets
+
+
+@pytest.mark.parametrize("target", request_targets())
+def test_split_request_uri_matches_urlsplit(target):
+    try:
+        expected = util.urlsplit_request_uri(target)
+    except ValueError:
+        with pytest.raises(ValueError):
+            util.split_request_uri(target)
+        return
+
+    assert util.split_request_uri(target) == expected
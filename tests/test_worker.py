@@ -1,14 +1,22 @@
+import os
+import pathlib
 import socket
+import threading
+from collections.abc import Callable, Generator, Iterable
 from unittest import mock
 
 import pytest
 
+from web_server.config import Config, ResponseConfig
+from web_server.static import FileCache, StaticFiles
 from web_server.worker import Worker
 
 
 @pytest.fixture
 def mock_sock() -> mock.Mock:
-    return mock.Mock(spec=socket.socket)
+    sock = mock.Mock(spec=socket.socket)
+    sock.getsockname.return_value = ("127.0.0.1", 8000)
+    return sock
 
 
 @pytest.fixture
@@ -32,3 +40,219 @@ def test_shutdown(worker: Worker, mock_sock: mock.Mock):
 
     assert worker.alive is False
     mock_sock.close.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "worker",
+    [True],
+    indirect=["worker"],
+)
+def test_run_stops_after_accept_timeout(worker: Worker, mock_sock: mock.Mock):
+    def accept():
+        worker.alive = False
+        raise TimeoutError
+
+    mock_sock.accept.side_effect = accept
+
+    worker.run()
+
+    mock_sock.close.assert_called_once()
+    assert not worker.error_stream._thread.is_alive()
+
+
+@pytest.fixture
+def socket_pair() -> Generator[tuple[socket.socket, socket.socket], None, None]:
+    server, client = socket.socketpair()
+    server.setblocking(False)
+    with server, client:
+        yield server, client
+
+
+@pytest.mark.parametrize(
+    "keepalive_timeout, expected",
+    [(0.5, [b"/a", b"/b"]), (0, [b"/a"])],
+)
+def test_handle_keep_alive(
+    mock_sock: mock.Mock,
+    socket_pair: tuple[socket.socket, socket.socket],
+    keepalive_timeout: float,
+    expected: list[bytes],
+):
+    server, client = socket_pair
+    seen = []
+
+    def app(environ, start_response):
+        seen.append((environ["PATH_INFO"].encode(), environ["wsgi.input"]))
+        start_response("204 No Content", [])
+        return []
+
+    worker = Worker(
+        server_socket=mock_sock,
+        app=app,
+        cfg=Config.custom(
+            response=ResponseConfig.custom(keepalive_timeout=keepalive_timeout)
+        ),
+    )
+    client.sendall(
+        b"GET /a HTTP/1.1\r\nHost: example.com\r\n\r\n"
+        b"GET /b HTTP/1.1\r\nHost: example.com\r\n\r\n"
+    )
+    client.shutdown(socket.SHUT_WR)
+    worker.handle(server, None)
+    worker.error_stream.close()
+    server.close()
+    responses = client.recv(65536)
+
+    assert [path for path, _ in seen] == expected
+    assert len({id(body) for _, body in seen}) == 1
+    assert responses.count(b"HTTP/1.1 204 No Content\r\n") == len(expected)
+    assert responses.count(b"Connection: keep-alive\r\n") == (
+        len(expected) if keepalive_timeout else 0
+    )
+
+
+def test_default_keepalive_timeout(mock_sock: mock.Mock):
+    worker = Worker(server_socket=mock_sock, app=lambda environ, start_response: [])
+    worker.error_stream.close()
+
+    assert worker.cfg.response.keepalive_timeout == 0
+
+
+@pytest.mark.parametrize(
+    "response_body",
+    [
+        lambda: [b"hi"],
+        lambda: (data for data in [b"x" * 100_000, b"x" * 20_000]),
+    ],
+    ids=["length", "chunked"],
+)
+def test_handle_keep_alive_with_body(
+    mock_sock: mock.Mock,
+    socket_pair: tuple[socket.socket, socket.socket],
+    response_body: Callable[[], Iterable[bytes]],
+):
+    server, client = socket_pair
+    seen = []
+
+    def app(environ, start_response):
+        seen.append(environ["PATH_INFO"])
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return response_body()
+
+    worker = Worker(
+        server_socket=mock_sock,
+        app=app,
+        cfg=Config.custom(response=ResponseConfig.custom(keepalive_timeout=0.5)),
+    )
+    received = bytearray()
+
+    def drain() -> None:
+        while data := client.recv(65536):
+            received.extend(data)
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    client.sendall(
+        b"GET /a HTTP/1.1\r\nHost: example.com\r\n\r\n"
+        b"GET /b HTTP/1.1\r\nHost: example.com\r\n\r\n"
+    )
+    client.shutdown(socket.SHUT_WR)
+    worker.handle(server, None)
+    worker.error_stream.close()
+    server.shutdown(socket.SHUT_WR)
+    reader.join()
+
+    assert seen == ["/a", "/b"]
+    assert received.count(b"HTTP/1.1 200 OK\r\n") == 2
+    assert received.count(b"Connection: keep-alive\r\n") == 2
+
+
+def test_handle_waits_for_first_request(
+    mock_sock: mock.Mock, socket_pair: tuple[socket.socket, socket.socket]
+):
+    server, client = socket_pair
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"Hello, World!"]
+
+    worker = Worker(server_socket=mock_sock, app=app)
+    sender = threading.Timer(
+        0.1, client.sendall, [b"GET / HTTP/1.1\r\nHost: example.com\r\n\r\n"]
+    )
+    sender.start()
+
+    worker.handle(server, None)
+    worker.error_stream.close()
+    sender.join()
+    server.close()
+
+    assert client.recv(65536).startswith(b"HTTP/1.1 200 OK\r\n")
+
+
+@pytest.mark.parametrize(
+    "worker",
+    [True],
+    indirect=["worker"],
+)
+def test_handle_without_request(worker: Worker, mock_sock: mock.Mock):
+    server, client = socket.socketpair()
+    server.setblocking(False)
+    with server, client:
+        worker.cfg = Config.custom(response=ResponseConfig.custom(read_timeout=0.05))
+        worker.handle(server, None)
+    worker.error_stream.close()
+
+
+def test_handle_with_disconnected_client(
+    mock_sock: mock.Mock, socket_pair: tuple[socket.socket, socket.socket]
+):
+    server, client = socket_pair
+    worker = Worker(
+        server_socket=mock_sock,
+        app=lambda environ, start_response: (b"x" * 65536 for _ in range(64)),
+    )
+    client.sendall(b"GET / HTTP/1.1\r\nHost: example.com\r\n\r\n")
+    client.close()
+
+    worker.handle(server, None)
+    worker.error_stream.close()
+
+
+@pytest.mark.parametrize(
+    "cache, sent_with_sendfile",
+    [(None, True), (FileCache(mmap_threshold=1024), False)],
+)
+def test_handle_static_file(
+    mock_sock: mock.Mock,
+    socket_pair: tuple[socket.socket, socket.socket],
+    tmp_path: pathlib.Path,
+    cache: FileCache | None,
+    sent_with_sendfile: bool,
+):
+    server, client = socket_pair
+    content = bytes(range(256)) * 64
+    (tmp_path / "data.bin").write_bytes(content)
+    worker = Worker(
+        server_socket=mock_sock,
+        app=StaticFiles(str(tmp_path), prefix="/static", cache=cache),
+        cfg=Config.custom(response=ResponseConfig.custom(keepalive_timeout=0)),
+    )
+    client.sendall(
+        b"GET /static/data.bin HTTP/1.1\r\nHost: example.com\r\nRange: bytes=100-\r\n\r\n"
+    )
+    client.shutdown(socket.SHUT_WR)
+
+    with mock.patch("os.sendfile", wraps=os.sendfile) as sendfile:
+        worker.handle(server, None)
+    worker.error_stream.close()
+    server.close()
+    responses = b""
+    while data := client.recv(65536):
+        responses += data
+
+    head, _, body = responses.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 206 Partial Content\r\n")
+    assert b"Content-Range: bytes 100-16383/16384\r\n" in head
+    assert body == content[100:]
+    assert sendfile.called is sent_with_sendfile
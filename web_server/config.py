@@ -1,5 +1,6 @@
 import dataclasses
 import sys
+import zlib
 from typing import Self
 
 from web_server.errors import ConfigurationProblem
@@ -7,15 +8,33 @@ from web_server.errors import ConfigurationProblem
 MAX_REQUEST_LINE = 8190
 MAX_HEADERS = 32768
 DEFAULT_MAX_HEADERFIELD_SIZE = 8190
-
-
-@dataclasses.dataclass
+DEFAULT_LIMIT_REQUEST_HEADERS_TOTAL = 65536
+DEFAULT_MAX_BUFFERED_BODY_SIZE = 65536
+DEFAULT_WRITE_TIMEOUT = 30.0
+# how long a new connection may hold up the accept loop before its request
+# starts to arrive
+DEFAULT_READ_TIMEOUT = 5.0
+# The worker serves one connection at a time and accepts no other while it
+# waits for the next request on an idle one, so keep-alive is opt-in.
+DEFAULT_KEEPALIVE_TIMEOUT = 0.0
+DEFAULT_COMPRESSION_LEVEL = 6
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+PARSER_BACKENDS = ("reference", "fast")
+DEFAULT_ERROR_BUFFER_SIZE = 65536
+DEFAULT_ERROR_FLUSH_INTERVAL = 1.0
+ERROR_OVERFLOW_POLICIES = ("drop-new", "drop-old")
+
+
+@dataclasses.dataclass(frozen=True)
 class MessageConfig:
     limit_request_line: int = 4094
     limit_request_fields: int = 100
     limit_request_field_size: int = 8190
+    limit_request_headers_total: int = DEFAULT_LIMIT_REQUEST_HEADERS_TOTAL
     permit_unconventional_http_method: bool = False
     permit_unconventional_http_version: bool = False
+    parser_backend: str = "reference"
+    request_head_cache_size: int = 0
 
     @classmethod
     def default(cls) -> Self:
@@ -27,9 +46,14 @@ class MessageConfig:
         limit_request_line: int = 4094,
         limit_request_fields: int = 100,
         limit_request_field_size: int = 8190,
+        limit_request_headers_total: int = DEFAULT_LIMIT_REQUEST_HEADERS_TOTAL,
         permit_unconventional_http_method: bool = False,
         permit_unconventional_http_version: bool = False,
+        parser_backend: str = "reference",
+        request_head_cache_size: int = 0,
     ) -> Self:
+        if parser_backend not in PARSER_BACKENDS:
+            raise ConfigurationProblem(f"Unknown parser backend {parser_backend!r}")
         limit_request_line = (
             MAX_REQUEST_LINE
             if limit_request_line < 0
@@ -40,38 +64,144 @@ class MessageConfig:
             if limit_request_field_size < 0
             else limit_request_field_size
         ) or sys.maxsize
+        limit_request_headers_total = (
+            DEFAULT_LIMIT_REQUEST_HEADERS_TOTAL
+            if limit_request_headers_total < 0
+            else limit_request_headers_total
+        ) or sys.maxsize
         return cls(
             limit_request_line=limit_request_line,
             limit_request_fields=min(limit_request_fields, MAX_HEADERS),
             limit_request_field_size=limit_request_field_size,
+            limit_request_headers_total=limit_request_headers_total,
             permit_unconventional_http_method=permit_unconventional_http_method,
             permit_unconventional_http_version=permit_unconventional_http_version,
+            parser_backend=parser_backend,
+            request_head_cache_size=max(request_head_cache_size, 0),
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class EnvConfig:
     script_name: str = ""
+    error_buffer_size: int = DEFAULT_ERROR_BUFFER_SIZE
+    error_flush_interval: float | None = DEFAULT_ERROR_FLUSH_INTERVAL
+    error_overflow: str = "drop-new"
+    # where PATH_INFO starts in a request path, worked out once
+    script_name_length: int = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self, "script_name_length", len(self.script_name.rstrip("/"))
+        )
 
     @classmethod
     def default(cls) -> Self:
         return cls()
 
     @classmethod
-    def custom(cls, script_name: str = "") -> Self:
-        return cls(script_name=script_name)
+    def custom(
+        cls,
+        script_name: str = "",
+        error_buffer_size: int = DEFAULT_ERROR_BUFFER_SIZE,
+        error_flush_interval: float = DEFAULT_ERROR_FLUSH_INTERVAL,
+        error_overflow: str = "drop-new",
+    ) -> Self:
+        if error_overflow not in ERROR_OVERFLOW_POLICIES:
+            raise ConfigurationProblem(
+                f"Unknown error overflow policy {error_overflow!r}"
+            )
+        error_buffer_size = (
+            DEFAULT_ERROR_BUFFER_SIZE if error_buffer_size < 0 else error_buffer_size
+        ) or sys.maxsize
+        error_flush_interval = (
+            DEFAULT_ERROR_FLUSH_INTERVAL
+            if error_flush_interval < 0
+            else error_flush_interval
+        ) or None
+        return cls(
+            script_name=script_name,
+            error_buffer_size=error_buffer_size,
+            error_flush_interval=error_flush_interval,
+            error_overflow=error_overflow,
+        )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
+class ResponseConfig:
+    max_buffered_body_size: int = DEFAULT_MAX_BUFFERED_BODY_SIZE
+    write_timeout: float | None = DEFAULT_WRITE_TIMEOUT
+    read_timeout: float | None = DEFAULT_READ_TIMEOUT
+    # 0 closes every connection after its first response; anything else is
+    # how long an idle connection holds up the accept loop
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT
+    compression: bool = False
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL
+    # bodies shorter than this are sent as they are
+    compression_min_size: int = DEFAULT_COMPRESSION_MIN_SIZE
+
+    @classmethod
+    def default(cls) -> Self:
+        return cls()
+
+    @classmethod
+    def custom(
+        cls,
+        max_buffered_body_size: int = DEFAULT_MAX_BUFFERED_BODY_SIZE,
+        write_timeout: float = DEFAULT_WRITE_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        compression: bool = False,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        compression_min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+    ) -> Self:
+        max_buffered_body_size = (
+            DEFAULT_MAX_BUFFERED_BODY_SIZE
+            if max_buffered_body_size < 0
+            else max_buffered_body_size
+        )
+        write_timeout = (
+            DEFAULT_WRITE_TIMEOUT if write_timeout < 0 else write_timeout
+        ) or None
+        read_timeout = (
+            DEFAULT_READ_TIMEOUT if read_timeout < 0 else read_timeout
+        ) or None
+        keepalive_timeout = (
+            DEFAULT_KEEPALIVE_TIMEOUT if keepalive_timeout < 0 else keepalive_timeout
+        )
+        compression_level = (
+            DEFAULT_COMPRESSION_LEVEL
+            if compression_level < 0
+            else min(compression_level, zlib.Z_BEST_COMPRESSION)
+        )
+        compression_min_size = (
+            DEFAULT_COMPRESSION_MIN_SIZE
+            if compression_min_size < 0
+            else compression_min_size
+        )
+        return cls(
+            max_buffered_body_size=max_buffered_body_size,
+            write_timeout=write_timeout,
+            read_timeout=read_timeout,
+            keepalive_timeout=keepalive_timeout,
+            compression=compression,
+            compression_level=compression_level,
+            compression_min_size=compression_min_size,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
 class Config:
     message: MessageConfig
     env: EnvConfig
+    response: ResponseConfig
 
     @classmethod
     def default(cls) -> Self:
         return cls(
             message=MessageConfig.default(),
             env=EnvConfig.default(),
+            response=ResponseConfig.default(),
         )
 
     @classmethod
@@ -79,16 +209,16 @@ class Config:
         cls,
         message: MessageConfig = MessageConfig.default(),
         env: EnvConfig = EnvConfig.default(),
+        response: ResponseConfig = ResponseConfig.default(),
     ) -> Self:
-        return cls(message=message, env=env)
+        return cls(message=message, env=env, response=response)
 
     def parse_path(self, path: str) -> tuple[str, str]:
-        if not path.startswith(self.env.script_name):
+        script_name = self.env.script_name
+        if not script_name:
+            return script_name, path
+        if not path.startswith(script_name):
             raise ConfigurationProblem(
-                f"Request path {path} does not start with SCRIPT_NAME {self.env.script_name}"
+                f"Request path {path} does not start with SCRIPT_NAME {script_name}"
             )
-
-        script_name = self.env.script_name.rstrip("/")
-        path_info = path[len(script_name) :]
-
-        return self.env.script_name, path_info
+        return script_name, path[self.env.script_name_length :]
@@ -1,15 +1,30 @@
 import socket
-from collections.abc import Callable
+from collections.abc import Callable, Sequence
+
+from web_server.http.writer import SocketWriter
 from web_server.types import ExcInfo
 
 
 class Connection:
-    def __init__(self, sock: socket.socket):
+    __slots__ = ("sock", "writer", "_sent_headers")
+
+    def __init__(self, sock: socket.socket, write_timeout: float | None = None):
         self.sock = sock
+        self.writer = SocketWriter(sock, timeout=write_timeout)
         self._sent_headers = []
 
+    def reset(self) -> None:
+        self._sent_headers.clear()
+        self.writer.reset()
+
     def write(self, response_body: bytes) -> None:
-        self.sock.sendall(response_body)
+        self.writer.write(response_body)
+
+    def writev(self, buffers: Sequence[bytes]) -> None:
+        self.writer.writev(buffers)
+
+    def sendfile(self, fileno: int, offset: int, count: int) -> None:
+        self.writer.sendfile(fileno, offset, count)
 
     def start_response(
         self,
@@ -28,7 +43,7 @@ class Connection:
 
         def _write(data: bytes) -> None:
             pre_body = (status_line + header_fields).encode("latin-1") + b"\r\n"
-            self.sock.sendall(pre_body)
+            self.write(pre_body)
             self._sent_headers.append(headers)
             self.write(data)
 
@@ -1,13 +1,25 @@
 from collections.abc import Callable, Iterable
 from typing import Any
 
-from web_server import wsgi, connection, http
+from web_server import config, wsgi, connection, http
 
 
 class Cycle:
+    __slots__ = (
+        "conn",
+        "cfg",
+        "request",
+        "environ",
+        "app",
+        "headers_sent",
+        "resp",
+        "response_body",
+    )
+
     def __init__(
         self,
         conn: connection.Connection,
+        request: http.Request,
         environ: wsgi.WSGIEnviron,
         app: Callable[
             [
@@ -19,29 +31,44 @@ class Cycle:
             ],
             Iterable[bytes],
         ],
+        cfg: config.ResponseConfig = config.ResponseConfig.default(),
     ):
         self.conn = conn
+        self.cfg = cfg
+        self.request = request
         self.environ = environ
         self.app = app
         self.headers_sent = False
         self.resp: http.Response | None = None
+        self.response_body: Iterable[bytes] | None = None
+
+    def reset(self, request: http.Request, environ: wsgi.WSGIEnviron) -> None:
+        self.request = request
+        self.environ = environ
+        self.headers_sent = False
+        self.resp = None
+        self.response_body = None
+
+    @property
+    def is_head_request(self) -> bool:
+        return self.request.method == "HEAD"
 
     def write(self, data: bytes) -> None:
         if self.resp is None:
             raise AssertionError("Response headers not set!")
         if self.resp.body is None:
-            self.resp.set_body([data])
+            self.resp.stream_body()
         if not self.headers_sent:
-            self.conn.sock.sendall(self.resp.headers_data())
+            self.conn.write(self.resp.headers_data())
             self.headers_sent = True
+        if self.is_head_request or not data:
+            return
         if self.resp.is_chunked:
             if isinstance(data, str):
                 data = data.encode("utf-8")
-            chunk_size = f"{len(data)}\r\n"
-            chunk = b"".join([chunk_size.encode("utf-8"), data, b"\r\n"])
-            self.conn.sock.sendall(chunk)
+            self.conn.writev(http.frame_chunk(data))
         else:
-            self.conn.sock.sendall(data)
+            self.conn.write(data)
 
     def start_response(
         self,
@@ -54,12 +81,40 @@ class Cycle:
                 raise AssertionError("Response headers already set!")
             raise exc_info[1].with_traceback(exc_info[2])
 
-        self.resp = http.Response.draft(self.environ.http_request)
+        self.resp = http.Response.draft(
+            self.request, keep_alive=self.cfg.keepalive_timeout > 0
+        )
         self.resp.set_status(status)
         self.resp.extend_headers(headers)
         return self.write
 
+    def close(self) -> None:
+        response_body, self.response_body = self.response_body, None
+        if hasattr(response_body, "close"):
+            response_body.close()
+
     def handle_request(self) -> http.Response:
         response_body = self.app(self.environ.dict(), self.start_response)
-        self.resp.set_body(response_body)
+        self.response_body = response_body
+        if self.headers_sent:
+            # The application started the body with write(), so the rest of
+            # it goes out the same way.
+            if not self.is_head_request:
+                for data in response_body:
+                    self.write(data)
+                if self.resp.is_chunked:
+                    self.conn.write(http.LAST_CHUNK)
+            return self.resp
+        compressor = http.Compressor.negotiate(
+            self.cfg, self.request.headers, self.resp.status_code, self.resp.headers
+        )
+        if self.is_head_request:
+            # Only the headers go out, so the body is never pulled from the
+            # application; its length is taken when it is known up front.
+            self.resp.omit_body(response_body, compressor=compressor)
+            self.close()
+            return self.resp
+        self.resp.set_body(
+            response_body, self.cfg.max_buffered_body_size, compressor=compressor
+        )
         return self.resp
@@ -105,6 +105,18 @@ class ChunkMissingTerminator(IOError):
         return "Invalid chunk terminator is not '\\r\\n': %r" % self.term
 
 
+class WriteTimeout(IOError):
+    def __init__(self, timeout, written):
+        self.timeout = timeout
+        self.written = written
+
+    def __str__(self):
+        return "Write timed out after %ss with %d bytes written" % (
+            self.timeout,
+            self.written,
+        )
+
+
 class LimitRequestLine(ParseException):
     def __str__(self):
         return "Request Line is too large"
@@ -118,6 +130,15 @@ class LimitRequestHeaders(ParseException):
         return self.msg
 
 
+class LimitRequestHeadersTotal(LimitRequestHeaders):
+    def __init__(self, limit):
+        self.limit = limit
+        self.code = 431
+
+    def __str__(self):
+        return "Request header block is larger than %d bytes" % self.limit
+
+
 class InvalidProxyLine(ParseException):
     def __init__(self, line):
         self.line = line
@@ -1,6 +1,35 @@
-from .message import Request, Response
+from .headers import Headers, environ_key
+from .compression import Compressor
+from .file import FileWrapper
+from .message import LAST_CHUNK, Request, Response, frame_chunk
 from .body import RequestBody
-from .parser import RequestParser
+from .parser import (
+    FastRequestParser,
+    IncrementalParser,
+    Parser,
+    RequestHeadCache,
+    RequestParser,
+    create_parser,
+)
 from .reader import SocketReader
+from .writer import SocketWriter
 
-__all__ = ["Request", "Response", "RequestBody", "RequestParser", "SocketReader"]
+__all__ = [
+    "LAST_CHUNK",
+    "frame_chunk",
+    "Headers",
+    "environ_key",
+    "Compressor",
+    "FileWrapper",
+    "Request",
+    "Response",
+    "RequestBody",
+    "FastRequestParser",
+    "IncrementalParser",
+    "Parser",
+    "RequestHeadCache",
+    "RequestParser",
+    "create_parser",
+    "SocketReader",
+    "SocketWriter",
+]
@@ -1,5 +1,6 @@
 import io
 import sys
+from collections.abc import Iterable
 from typing import Self
 
 from web_server.http import reader
@@ -7,6 +8,8 @@ from web_server.errors import InvalidHeader, UnsupportedTransferCoding
 
 
 class RequestBody:
+    __slots__ = ("reader", "buf", "_read_cursor")
+
     def __init__(self, body_reader: reader.BodyReader):
         self.reader = body_reader
         self.buf = io.BytesIO()
@@ -28,66 +31,13 @@ class RequestBody:
         headers: list[tuple[str, str]],
         socket_reader: reader.SocketReader,
     ) -> Self:
-        chunked = False
-        content_length = None
-
-        for name, value in headers:
-            name = name.upper()
-            if name == "CONTENT-LENGTH":
-                if content_length is not None:
-                    raise InvalidHeader("CONTENT-LENGTH")
-                if not str(value).isnumeric():
-                    raise InvalidHeader("CONTENT-LENGTH")
-                content_length = int(value)
-            elif name == "TRANSFER-ENCODING":
-                # T-E can be a list
-                # https://datatracker.ietf.org/doc/html/rfc9112#name-transfer-encoding
-                vals = [v.strip() for v in value.split(",")]
-                for val in vals:
-                    if val.lower() == "chunked":
-                        # DANGER: transfer codings stack, and stacked chunking is never intended
-                        if chunked:
-                            raise InvalidHeader("TRANSFER-ENCODING")
-                        chunked = True
-                    elif val.lower() == "identity":
-                        # does not do much, could still plausibly desync from what the proxy does
-                        # safe option: nuke it, its never needed
-                        if chunked:
-                            raise InvalidHeader("TRANSFER-ENCODING")
-                    elif val.lower() in ("compress", "deflate", "gzip"):
-                        # chunked should be the last one
-                        if chunked:
-                            raise InvalidHeader("TRANSFER-ENCODING")
-                    else:
-                        raise UnsupportedTransferCoding(value)
-
-        if not chunked and content_length is None:
-            # RFC 9112 Section 6.1: If no Transfer-Encoding or Content-Length header is present,
-            # the message body is considered to be empty.
-            return cls(body_reader=reader.EOFReader(io.BytesIO(b"")))
-
-        if chunked:
-            # two potentially dangerous cases:
-            #  a) CL + TE (TE overrides CL.. only safe if the recipient sees it that way too)
-            #  b) chunked HTTP/1.0 (always faulty)
-            if protocol_version < (1, 1):
-                # framing wonky, see RFC 9112 Section 6.1
-                raise InvalidHeader("TRANSFER-ENCODING")
-            if content_length is not None:
-                # we cannot be certain the message framing we understood matches proxy intent
-                #  -> whatever happens next, remaining input must not be trusted
-                raise InvalidHeader("CONTENT-LENGTH")
-            return cls(body_reader=reader.ChunkedReader.parse_chunked(socket_reader))
-        elif content_length is not None:
-            if content_length < 0:
-                raise InvalidHeader("CONTENT-LENGTH")
-            return cls(
-                body_reader=reader.LengthReader.parse_content(
-                    socket_reader, content_length
-                )
-            )
-        else:
-            return cls(body_reader=reader.EOFReader.parse_content(socket_reader))
+        return cls(body_reader=create_reader(protocol_version, headers, socket_reader))
+
+    def reset(self, body_reader: reader.BodyReader) -> None:
+        self.reader = body_reader
+        self.buf.seek(0, io.SEEK_SET)
+        self.buf.truncate()
+        self._read_cursor = 0
 
     def read(self, size: int | None = None) -> bytes:
         if size is not None and not isinstance(size, int):
@@ -137,3 +87,70 @@ class RequestBody:
                 break
             lines.append(line)
         return lines
+
+
+def create_reader(
+    protocol_version: tuple[int, int],
+    headers: list[tuple[str, str]],
+    socket_reader: reader.SocketReader,
+) -> reader.BodyReader:
+    chunked, content_length = framing(protocol_version, headers)
+    if chunked:
+        return reader.ChunkedReader.parse_chunked(socket_reader)
+    if content_length is not None:
+        return reader.LengthReader.parse_content(socket_reader, content_length)
+    # RFC 9112 Section 6.1: If no Transfer-Encoding or Content-Length header is present,
+    # the message body is considered to be empty.
+    return reader.EOFReader(io.BytesIO(b""))
+
+
+def framing(
+    protocol_version: tuple[int, int], headers: Iterable[tuple[str, str]]
+) -> tuple[bool, int | None]:
+    chunked = False
+    content_length = None
+
+    for name, value in headers:
+        name = name.upper()
+        if name == "CONTENT-LENGTH":
+            if content_length is not None:
+                raise InvalidHeader("CONTENT-LENGTH")
+            if not str(value).isnumeric():
+                raise InvalidHeader("CONTENT-LENGTH")
+            content_length = int(value)
+        elif name == "TRANSFER-ENCODING":
+            # T-E can be a list
+            # https://datatracker.ietf.org/doc/html/rfc9112#name-transfer-encoding
+            vals = [v.strip() for v in value.split(",")]
+            for val in vals:
+                if val.lower() == "chunked":
+                    # DANGER: transfer codings stack, and stacked chunking is never intended
+                    if chunked:
+                        raise InvalidHeader("TRANSFER-ENCODING")
+                    chunked = True
+                elif val.lower() == "identity":
+                    # does not do much, could still plausibly desync from what the proxy does
+                    # safe option: nuke it, its never needed
+                    if chunked:
+                        raise InvalidHeader("TRANSFER-ENCODING")
+                elif val.lower() in ("compress", "deflate", "gzip"):
+                    # chunked should be the last one
+                    if chunked:
+                        raise InvalidHeader("TRANSFER-ENCODING")
+                else:
+                    raise UnsupportedTransferCoding(value)
+
+    if chunked:
+        # two potentially dangerous cases:
+        #  a) CL + TE (TE overrides CL.. only safe if the recipient sees it that way too)
+        #  b) chunked HTTP/1.0 (always faulty)
+        if protocol_version < (1, 1):
+            # framing wonky, see RFC 9112 Section 6.1
+            raise InvalidHeader("TRANSFER-ENCODING")
+        if content_length is not None:
+            # we cannot be certain the message framing we understood matches proxy intent
+            #  -> whatever happens next, remaining input must not be trusted
+            raise InvalidHeader("CONTENT-LENGTH")
+    elif content_length is not None and content_length < 0:
+        raise InvalidHeader("CONTENT-LENGTH")
+    return chunked, content_length
@@ -0,0 +1,143 @@
+import zlib
+from collections.abc import Generator, Iterable
+from typing import Self
+
+from web_server import config
+from web_server.http.headers import Headers
+
+# Content codings in the order they are preferred when a client accepts
+# several with the same weight, with the zlib window bits producing each.
+ENCODINGS = {"gzip": 31, "deflate": 15}
+# Media types whose payload is already compressed, so another pass only
+# costs CPU.
+COMPRESSED_CONTENT_TYPES = frozenset(
+    {
+        "application/gzip",
+        "application/octet-stream",
+        "application/pdf",
+        "application/vnd.rar",
+        "application/x-7z-compressed",
+        "application/x-bzip2",
+        "application/x-gzip",
+        "application/x-rar-compressed",
+        "application/x-xz",
+        "application/zip",
+        "application/zstd",
+        "font/woff",
+        "font/woff2",
+    }
+)
+COMPRESSED_CONTENT_TYPE_PREFIXES = ("image/", "audio/", "video/")
+UNCOMPRESSED_CONTENT_TYPES = frozenset({"image/svg+xml", "image/bmp"})
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    weights = _weights(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for name in ENCODINGS:
+        if (weight := weights.get(name, wildcard)) > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def accepts(accept_encoding: str | None, encoding: str) -> bool:
+    weights = _weights(accept_encoding)
+    return weights.get(encoding, weights.get("*", 0.0)) > 0
+
+
+def _weights(accept_encoding: str | None) -> dict[str, float]:
+    weights: dict[str, float] = {}
+    if not accept_encoding:
+        return weights
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def is_compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.partition(";")[0].strip().lower()
+    if media_type in UNCOMPRESSED_CONTENT_TYPES:
+        return True
+    return media_type not in COMPRESSED_CONTENT_TYPES and not media_type.startswith(
+        COMPRESSED_CONTENT_TYPE_PREFIXES
+    )
+
+
+class Compressor:
+    __slots__ = ("encoding", "level", "min_size")
+
+    def __init__(self, encoding: str | None, level: int, min_size: int):
+        self.encoding = encoding
+        self.level = level
+        self.min_size = min_size
+
+    @classmethod
+    def negotiate(
+        cls,
+        cfg: config.ResponseConfig,
+        request_headers: Headers,
+        status_code: int | None,
+        response_headers: Headers,
+    ) -> Self | None:
+        if not cfg.compression:
+            return None
+        if status_code is None or status_code < 200 or status_code in (204, 206, 304):
+            return None
+        if (
+            "content-encoding" in response_headers
+            or "content-range" in response_headers
+        ):
+            return None
+        # byte ranges were promised over the identity body, as static files
+        # do, so a compressed one would not match them
+        if (response_headers.get("accept-ranges") or "none").lower() != "none":
+            return None
+        if not is_compressible(response_headers.get("content-type")):
+            return None
+        if "no-transform" in (response_headers.get("cache-control") or "").lower():
+            return None
+        # A client that accepts no coding still gets a compressor without
+        # one, so the response says it varies by Accept-Encoding.
+        return cls(
+            negotiate(request_headers.get("accept-encoding")),
+            cfg.compression_level,
+            cfg.compression_min_size,
+        )
+
+    def compressobj(self) -> "zlib._Compress":
+        return zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[self.encoding])
+
+    def compress(self, data: bytes) -> bytes:
+        compressobj = self.compressobj()
+        return compressobj.compress(data) + compressobj.flush()
+
+    def stream(self, body: Iterable[bytes]) -> Generator[bytes, None, None]:
+        # Output is sync-flushed once min_size bytes have gone in since the
+        # last flush, so a streamed response reaches the client in steady
+        # pieces without paying for a flush on every tiny yield.
+        compressobj = self.compressobj()
+        pending = 0
+        for data in body:
+            if not data:
+                continue
+            pending += len(data)
+            out = compressobj.compress(data)
+            if pending >= self.min_size:
+                out += compressobj.flush(zlib.Z_SYNC_FLUSH)
+                pending = 0
+            if out:
+                yield out
+        yield compressobj.flush()
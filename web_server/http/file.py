@@ -0,0 +1,57 @@
+import io
+import os
+import stat
+from collections.abc import Iterator
+from typing import IO
+
+DEFAULT_BLOCK_SIZE = 8192
+
+
+class FileWrapper:
+    __slots__ = ("filelike", "block_size", "length")
+
+    def __init__(
+        self,
+        filelike: IO[bytes],
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        length: int | None = None,
+    ):
+        self.filelike = filelike
+        self.block_size = block_size
+        # at most this many bytes are sent from the current position
+        self.length = length
+
+    def __iter__(self) -> Iterator[bytes]:
+        remaining = self.length
+        while remaining is None or remaining > 0:
+            size = (
+                self.block_size
+                if remaining is None
+                else min(self.block_size, remaining)
+            )
+            data = self.filelike.read(size)
+            if not data:
+                return
+            if remaining is not None:
+                remaining -= len(data)
+            yield data
+
+    def close(self) -> None:
+        if hasattr(self.filelike, "close"):
+            self.filelike.close()
+
+    def sendfile_range(self) -> tuple[int, int, int] | None:
+        # The descriptor, offset and byte count to hand to os.sendfile, or
+        # None when the wrapped object is not a regular file.
+        try:
+            fileno = self.filelike.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return None
+        st = os.fstat(fileno)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        offset = self.filelike.tell()
+        count = max(st.st_size - offset, 0)
+        if self.length is not None:
+            count = min(count, self.length)
+        return fileno, offset, count
@@ -0,0 +1,164 @@
+import functools
+from collections.abc import Iterable, Iterator
+from typing import Self
+
+MAX_CACHED_HEADER_NAMES = 256
+COMMON_HEADER_NAMES = (
+    "Accept",
+    "Accept-Charset",
+    "Accept-Encoding",
+    "Accept-Language",
+    "Authorization",
+    "Cache-Control",
+    "Connection",
+    "Content-Encoding",
+    "Content-Length",
+    "Content-Type",
+    "Cookie",
+    "Expect",
+    "Forwarded",
+    "Host",
+    "If-Match",
+    "If-Modified-Since",
+    "If-None-Match",
+    "If-Range",
+    "If-Unmodified-Since",
+    "Origin",
+    "Pragma",
+    "Range",
+    "Referer",
+    "TE",
+    "Trailer",
+    "Transfer-Encoding",
+    "Upgrade",
+    "Upgrade-Insecure-Requests",
+    "User-Agent",
+    "Via",
+    "X-Forwarded-For",
+    "X-Forwarded-Host",
+    "X-Forwarded-Proto",
+    "X-Real-IP",
+    "X-Requested-With",
+)
+# raw header-name bytes, in the spellings clients send, -> canonical name
+HEADER_NAMES: dict[bytes, str] = {
+    spelling.encode("latin1"): name.upper()
+    for name in COMMON_HEADER_NAMES
+    for spelling in (name, name.lower(), name.upper())
+}
+# canonical name -> WSGI environ key
+ENVIRON_KEYS: dict[str, str] = {
+    name: f"HTTP_{name.replace('-', '_')}" for name in HEADER_NAMES.values()
+}
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_HEADER_NAMES)
+def canonical_name(name: str) -> str:
+    return name.upper()
+
+
+def environ_key(name: str) -> str:
+    if (key := ENVIRON_KEYS.get(name)) is not None:
+        return key
+    return _uncommon_environ_key(name)
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_HEADER_NAMES)
+def _uncommon_environ_key(name: str) -> str:
+    return f"HTTP_{name.upper().replace('-', '_')}"
+
+
+class Headers:
+    __slots__ = ("_names", "_values", "_index")
+
+    def __init__(self, fields: Iterable[tuple[str, str]] = ()):
+        self._names: list[str] = []
+        self._values: list[str] = []
+        # lowercased name -> positions of its fields in _names/_values
+        self._index: dict[str, list[int]] = {}
+        for name, value in fields:
+            self.append(name, value)
+
+    @classmethod
+    def of(cls, fields: Iterable[tuple[str, str]]) -> Self:
+        if isinstance(fields, cls):
+            return fields
+        return cls(fields)
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return zip(self._names, self._values)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._index
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Headers):
+            return self._names == other._names and self._values == other._values
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def append(self, name: str, value: str) -> None:
+        self._index.setdefault(name.lower(), []).append(len(self._names))
+        self._names.append(name)
+        self._values.append(value)
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        positions = self._index.get(name.lower())
+        if positions is None:
+            return default
+        return self._values[positions[0]]
+
+    def get_all(self, name: str) -> list[str]:
+        return [self._values[pos] for pos in self._index.get(name.lower(), ())]
+
+    def fields(self, name: str) -> list[tuple[str, str]]:
+        return [
+            (self._names[pos], self._values[pos])
+            for pos in self._index.get(name.lower(), ())
+        ]
+
+    def set(self, name: str, value: str) -> None:
+        positions = self._index.get(name.lower())
+        if positions is None:
+            self.append(name, value)
+            return
+        first, *duplicates = positions
+        self._names[first] = name
+        self._values[first] = value
+        if duplicates:
+            self._remove_positions(duplicates)
+
+    def remove(self, name: str) -> None:
+        positions = self._index.get(name.lower())
+        if positions is not None:
+            self._remove_positions(positions)
+
+    def combined(self, separator: str = ",") -> list[tuple[str, str]]:
+        return [
+            (
+                self._names[positions[0]],
+                separator.join(self._values[pos] for pos in positions),
+            )
+            for positions in self._index.values()
+        ]
+
+    def copy(self) -> Self:
+        headers = type(self)()
+        headers._names = self._names.copy()
+        headers._values = self._values.copy()
+        headers._index = {key: pos.copy() for key, pos in self._index.items()}
+        return headers
+
+    def _remove_positions(self, positions: list[int]) -> None:
+        removed = set(positions)
+        fields = [field for pos, field in enumerate(self) if pos not in removed]
+        self._names, self._values, self._index = [], [], {}
+        for name, value in fields:
+            self.append(name, value)
@@ -1,14 +1,54 @@
 import email.utils
+import itertools
 import time
 from collections.abc import Iterable, Generator
 from typing import Self, ClassVar
 
-from web_server import constants
+from web_server import config, constants
 from web_server.http.body import RequestBody
+from web_server.http.compression import Compressor
+from web_server.http.file import FileWrapper
+from web_server.http.headers import Headers
 from web_server.errors import InvalidHeader, ParseException
 
 
+CRLF = b"\r\n"
+LAST_CHUNK = b"0\r\n\r\n"
+# Size lines for every chunk up to 4 KiB, so framing a small chunk is a
+# tuple lookup instead of formatting and encoding a new hex string.
+CHUNK_SIZE_LINES: tuple[bytes, ...] = tuple(b"%x\r\n" % size for size in range(4097))
+# Below this size copying the payload once is cheaper than handing the
+# kernel three separate buffers, so small chunks are coalesced.
+MAX_COALESCED_CHUNK_SIZE = 32 * 1024
+
+
+def frame_chunk(data: bytes) -> tuple[bytes, ...]:
+    size = len(data)
+    if size < len(CHUNK_SIZE_LINES):
+        size_line = CHUNK_SIZE_LINES[size]
+    else:
+        size_line = b"%x\r\n" % size
+    if size <= MAX_COALESCED_CHUNK_SIZE:
+        return (b"".join((size_line, data, CRLF)),)
+    return size_line, data, CRLF
+
+
 class Request:
+    __slots__ = (
+        "url_scheme",
+        "method",
+        "path",
+        "query",
+        "fragment",
+        "version",
+        "headers",
+        "body",
+        "trailers",
+        "has_connection_close_header",
+        "upgrade_header",
+        "has_transfer_encoding_and_content_length_headers",
+    )
+
     def __init__(
         self,
         method: str,
@@ -16,7 +56,7 @@ class Request:
         query: str,
         fragment: str,
         version: tuple[int, int],
-        headers: list[tuple[str, str]],
+        headers: Iterable[tuple[str, str]],
         body: RequestBody,
         trailers: list[tuple[str, str]],
     ):
@@ -26,41 +66,28 @@ class Request:
         self.query = query
         self.fragment = fragment
         self.version = version
-        self.headers = headers
+        self.headers = Headers.of(headers)
         self.body = body
         self.trailers = trailers
 
-    @property
-    def has_connection_close_header(self) -> bool:
-        for name, value in self.headers:
-            if name.lower() == "connection" and value.lower() == "close":
-                return True
-        return False
-
-    @property
-    def upgrade_header(self) -> tuple[str, str] | None:
-        upgrade_header = None
-        has_connection_upgrade_header = False
-        for name, value in self.headers:
-            if name.lower() == "upgrade":
-                upgrade_header = (name, value)
-            elif name.lower() == "connection" and value.lower() == "upgrade":
-                has_connection_upgrade_header = True
-        return upgrade_header if has_connection_upgrade_header else None
-
-    @property
-    def has_transfer_encoding_and_content_length_headers(self) -> bool:
-        has_transfer_encoding = False
-        has_content_length = False
-        for name, value in self.headers:
-            if name.lower() == "transfer-encoding":
-                has_transfer_encoding = True
-            elif name.lower() == "content-length":
-                has_content_length = True
-        return has_transfer_encoding and has_content_length
+        connection_tokens = {
+            value.lower() for value in self.headers.get_all("connection")
+        }
+        upgrade_fields = self.headers.fields("upgrade")
+        self.has_connection_close_header = "close" in connection_tokens
+        self.upgrade_header = (
+            upgrade_fields[-1]
+            if upgrade_fields and "upgrade" in connection_tokens
+            else None
+        )
+        self.has_transfer_encoding_and_content_length_headers = (
+            "transfer-encoding" in self.headers and "content-length" in self.headers
+        )
 
 
 class Response:
+    __slots__ = ("version", "status", "headers", "body")
+
     hob_by_hob_headers: ClassVar[set[str]] = {
         "connection",
         "keep-alive",
@@ -78,20 +105,19 @@ class Response:
         self,
         version: tuple[int, int],
         status: str | None,
-        headers: list[tuple[str, str]],
+        headers: Iterable[tuple[str, str]],
         body: Iterable[bytes] | None,
     ):
         self.version = version
         self.status = status
-        self.headers = headers
+        self.headers = Headers.of(headers)
         self.body = body
 
     @property
     def is_chunked(self) -> bool:
         return any(
-            name.upper().replace("_", "-") == "TRANSFER-ENCODING"
-            and value.lower() == "chunked"
-            for name, value in self.headers
+            value.lower() == "chunked"
+            for value in self.headers.get_all("transfer-encoding")
         )
 
     @property
@@ -101,7 +127,7 @@ class Response:
         return int(self.status[:3])
 
     @classmethod
-    def draft(cls, request: Request) -> Self:
+    def draft(cls, request: Request, keep_alive: bool = True) -> Self:
         http_date = email.utils.formatdate(time.time(), localtime=False, usegmt=True)
         headers = [
             ("Date", http_date),
@@ -110,15 +136,17 @@ class Response:
         connection = (
             "close"
             if (
-                request.has_connection_close_header
+                not keep_alive
+                or request.has_connection_close_header
                 or request.version == (1, 0)
                 or request.has_transfer_encoding_and_content_length_headers
             )
             else "keep-alive"
         )
         if (upgrade_header := request.upgrade_header) is not None:
+            name, value = upgrade_header
             connection = "upgrade"
-            headers.append(upgrade_header)
+            headers.append((name.title(), value))
         headers.append(("Connection", connection))
 
         return cls(
@@ -143,6 +171,23 @@ class Response:
             body=[content],
         )
 
+    @classmethod
+    def request_header_fields_too_large(cls, exc: ParseException) -> Self:
+        content = f"<h1>431 Request Header Fields Too Large</h1><p>{exc}</p>".encode(
+            "utf-8"
+        )
+        headers = [
+            ("Content-Type", "text/html"),
+            ("Connection", "close"),
+            ("Content-Length", f"{len(content)}"),
+        ]
+        return cls(
+            version=(1, 1),
+            status="431 Request Header Fields Too Large",
+            headers=headers,
+            body=[content],
+        )
+
     @classmethod
     def internal_server_error(cls, exc: BaseException) -> Self:
         content = f"<h1>500 Internal Server Error</h1><p>{exc}</p>".encode("utf-8")
@@ -159,56 +204,185 @@ class Response:
         )
 
     def extend_headers(self, headers: list[tuple[str, str]]) -> None:
-        new_headers = {
-            name.upper().replace("_", "-"): value for name, value in self.headers
-        }
-        for name, value in headers:
+        for name, _ in headers:
             if name.lower().replace("_", "-") in self.hob_by_hob_headers:
                 raise InvalidHeader(name)
-            new_headers[name.upper().replace("_", "-")] = value
-        for idx, (name, value) in enumerate(new_headers.items()):
-            if name.upper() == "CONNECTION" and self.should_conn_close():
-                new_headers[name.upper().replace("_", "-")] = "close"
-        self.headers = [(name.title(), value) for name, value in new_headers.items()]
+        extended = set()
+        for name, value in headers:
+            name = name.replace("_", "-").title()
+            key = name.lower()
+            if key not in extended and key in self.headers:
+                self.headers.set(name, value)
+            else:
+                self.headers.append(name, value)
+            extended.add(key)
 
     def set_status(self, status: str) -> None:
         if self.status is not None:
             raise AssertionError("Response status already set!")
         self.status = status
 
-    def set_body(self, body: Iterable[bytes]) -> None:
-        content_length = next(
-            (
-                value
-                for name, value in self.headers
-                if name.upper().replace("_", "-") == "CONTENT-LENGTH"
-            ),
-            None,
-        )
-        transfer_encoding = next(
-            (
-                value
-                for name, value in self.headers
-                if name.upper().replace("_", "-") == "TRANSFER-ENCODING"
-            ),
-            None,
-        )
-        body_iter = iter(body)
-        body_length = len(next(body_iter))
-        if content_length is not None and int(content_length) != body_length:
+    def set_body(
+        self,
+        body: Iterable[bytes],
+        max_buffered_size: int = config.DEFAULT_MAX_BUFFERED_BODY_SIZE,
+        compressor: Compressor | None = None,
+    ) -> None:
+        self._frame_body(body, max_buffered_size, compressor)
+        self._choose_connection()
+
+    def stream_body(self) -> None:
+        # The application writes the body itself, so its length is known
+        # only if it set one. Taking it from the first write would let the
+        # writes after it overrun the length.
+        self.body = []
+        if (
+            "content-length" not in self.headers
+            and "transfer-encoding" not in self.headers
+            and self.status_code >= 200
+            and self.status_code not in (204, 304)
+            and self.version >= (1, 1)
+        ):
+            self.headers.append("Transfer-Encoding", "chunked")
+        self._choose_connection()
+
+    def _choose_connection(self) -> None:
+        # Only now is it known how the body is framed; one that is neither
+        # chunked nor of a known length ends when the connection closes.
+        if (
+            self.headers.get("connection", "").lower() == "keep-alive"
+            and self.should_conn_close()
+        ):
+            self.headers.set("Connection", "close")
+
+    def _frame_body(
+        self,
+        body: Iterable[bytes],
+        max_buffered_size: int,
+        compressor: Compressor | None,
+    ) -> None:
+        content_length = self.headers.get("content-length")
+        if "transfer-encoding" in self.headers or self.status_code in (204, 304):
+            self.body = body
+            return
+        if (
+            isinstance(body, FileWrapper)
+            and (file_range := body.sendfile_range()) is not None
+        ):
+            # sent straight from the file, so it is neither buffered nor
+            # compressed here
+            if content_length is None:
+                self.headers.append("Content-Length", str(file_range[2]))
+            self.body = body
+            return
+
+        if isinstance(body, (list, tuple)):
+            body_length = sum(len(data) for data in body)
+        else:
+            body, body_length = self._buffer_body(body, max_buffered_size)
+
+        if (
+            body_length is not None
+            and content_length is not None
+            and int(content_length) != body_length
+        ):
             raise ValueError(
                 f"Content-Length is wrong: expected {body_length}, got {content_length}"
             )
-        if transfer_encoding is None and content_length is None:
-            content_length = body_length
-            self.headers.append(("Content-Length", str(body_length)))
+        if compressor is not None and (
+            body_length is None or body_length >= compressor.min_size
+        ):
+            body, body_length = self._compress_body(body, body_length, compressor)
 
-        if content_length is not None and next(body_iter, None) is not None:
-            raise ValueError(
-                "Content-Length data must be a single byte string, not multiple chunks"
-            )
+        if body_length is None:
+            # The stream outgrew the buffer, so its length cannot be known
+            # up front. HTTP/1.0 clients do not understand chunking and
+            # read the body until the connection is closed instead.
+            if "content-length" not in self.headers and self.version >= (1, 1):
+                self.headers.append("Transfer-Encoding", "chunked")
+            self.body = body
+            return
+
+        if "content-length" not in self.headers:
+            self.headers.append("Content-Length", str(body_length))
         self.body = body
 
+    def omit_body(
+        self, body: Iterable[bytes], compressor: Compressor | None = None
+    ) -> None:
+        # the headers a GET for the same resource would get
+        self.body = []
+        content_length = self.headers.get("content-length")
+        if (
+            isinstance(body, FileWrapper)
+            and (file_range := body.sendfile_range()) is not None
+        ):
+            # a GET sends the file as it is, uncompressed
+            if content_length is None:
+                self.headers.append("Content-Length", str(file_range[2]))
+            return
+        if content_length is not None:
+            body_length = int(content_length)
+        elif isinstance(body, (list, tuple)):
+            body_length = sum(len(data) for data in body)
+        else:
+            body_length = None
+        if (
+            compressor is not None
+            and (body_length is None or body_length >= compressor.min_size)
+            and self._set_content_encoding(compressor)
+        ):
+            # the compressed length is not known without compressing
+            return
+        if body_length is not None and content_length is None:
+            self.headers.append("Content-Length", str(body_length))
+
+    def _set_content_encoding(self, compressor: Compressor) -> bool:
+        vary = {
+            token.strip().lower()
+            for value in self.headers.get_all("vary")
+            for token in value.split(",")
+        }
+        if "*" not in vary and "accept-encoding" not in vary:
+            self.headers.append("Vary", "Accept-Encoding")
+        if compressor.encoding is None:
+            return False
+        self.headers.remove("content-length")
+        self.headers.append("Content-Encoding", compressor.encoding)
+        # the compressed bytes differ from the ones a strong tag names
+        if (etag := self.headers.get("etag")) is not None and not etag.startswith("W/"):
+            self.headers.set("ETag", f"W/{etag}")
+        return True
+
+    def _compress_body(
+        self,
+        body: Iterable[bytes],
+        body_length: int | None,
+        compressor: Compressor,
+    ) -> tuple[Iterable[bytes], int | None]:
+        if not self._set_content_encoding(compressor):
+            return body, body_length
+        if body_length is None:
+            return compressor.stream(body), None
+        data = compressor.compress(b"".join(body))
+        return [data], len(data)
+
+    @staticmethod
+    def _buffer_body(
+        body: Iterable[bytes], max_buffered_size: int
+    ) -> tuple[Iterable[bytes], int | None]:
+        body_iter = iter(body)
+        buffered = []
+        buffered_size = 0
+        for data in body_iter:
+            buffered.append(data)
+            buffered_size += len(data)
+            if buffered_size > max_buffered_size:
+                return itertools.chain(buffered, body_iter), None
+        if len(buffered) > 1:
+            buffered = [b"".join(buffered)]
+        return buffered, buffered_size
+
     def headers_data(self) -> bytes:
         if self.status is None:
             raise AssertionError("Response status not set!")
@@ -218,23 +392,30 @@ class Response:
         header_fields = "".join(f"{name}: {value}\r\n" for name, value in self.headers)
         return (status_line + header_fields).encode("latin-1") + b"\r\n"
 
-    def body_stream(self) -> Generator[bytes, None, None]:
-        is_chunked = self.is_chunked
-        last_chunk = b"0\r\n\r\n"
+    def sendfile_range(self) -> tuple[int, int, int] | None:
+        if not isinstance(self.body, FileWrapper) or self.is_chunked:
+            return None
+        if (file_range := self.body.sendfile_range()) is None:
+            return None
+        fileno, offset, count = file_range
+        if (content_length := self.headers.get("content-length")) is not None:
+            count = min(count, int(content_length))
+        return fileno, offset, count
+
+    def body_stream(self) -> Generator[tuple[bytes, ...], None, None]:
+        if not self.is_chunked:
+            for data in self.body:
+                yield (data,)
+            return
         for data in self.body:
-            if is_chunked:
-                chunk_size = f"{len(data)}\r\n"
-                last_chunk = b"".join([chunk_size.encode("utf-8"), data, b"\r\n"])
-                yield last_chunk
-            else:
-                yield data
-        if is_chunked and last_chunk != b"0\r\n\r\n":
-            yield b"0\r\n\r\n"
+            if data:
+                yield frame_chunk(data)
+        yield (LAST_CHUNK,)
 
     def should_conn_close(self) -> bool:
         if self.status is None:
             raise AssertionError("Response status not set!")
-        if self.is_chunked:
+        if self.is_chunked or "content-length" in self.headers:
             return False
         if self.status_code < 200 or self.status_code in (204, 304):
             return False
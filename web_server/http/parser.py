@@ -1,9 +1,14 @@
+import abc
+import collections
+import dataclasses
+import io
 import re
-from collections.abc import Generator
-from typing import ClassVar
+from collections.abc import Callable, Generator, Iterable
 
 from web_server import config
 from web_server.http import reader, message, body
+from web_server.http.reader import decode_chunk_size_line
+from web_server.http.headers import HEADER_NAMES, Headers, canonical_name
 from web_server.errors import (
     InvalidHTTPVersion,
     InvalidRequestLine,
@@ -11,49 +16,532 @@ from web_server.errors import (
     LimitRequestLine,
     InvalidHeader,
     LimitRequestHeaders,
+    LimitRequestHeadersTotal,
     InvalidHeaderName,
     NoMoreData,
+    InvalidChunkSize,
+    ChunkMissingTerminator,
 )
 from web_server.util import split_request_uri, bytes_to_str
 
 
-def should_close(version: tuple[int, int], headers: list[tuple[str, str]]) -> bool:
-    upper_headers = set((h.upper(), v.upper()) for h, v in headers)
+PROTOCOL_VERSION_TOKEN = re.compile(r"HTTP/(?P<major>\d+)\.(?P<minor>\d+)")
+RFC9110_5_6_2_TOKEN_SPECIALS = b"!#$%&'*+-.^_`|~"
+TOKEN_CHARS = (
+    RFC9110_5_6_2_TOKEN_SPECIALS
+    + b"0123456789"
+    + b"abcdefghijklmnopqrstuvwxyz"
+    + b"ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+)
+ALL_BYTES = bytes(range(256))
+# translate(None, ...) deletes these to keep only what matches [a-z#]
+NOT_METHOD_BADCHARS = ALL_BYTES.translate(None, b"abcdefghijklmnopqrstuvwxyz#")
+# what str.strip() removes from a latin-1 decoded line
+LATIN1_WHITESPACE = bytes(c for c in ALL_BYTES if chr(c).isspace())
+
+
+def is_token(data: bytes) -> bool:
+    return bool(data) and not data.translate(None, TOKEN_CHARS)
+
+
+def should_close(version: tuple[int, int], headers: Iterable[tuple[str, str]]) -> bool:
+    connection_tokens = {
+        value.upper() for value in Headers.of(headers).get_all("connection")
+    }
     if version < (1, 1):
-        if ("CONNECTION", "KEEP-ALIVE") in upper_headers:
-            return False
-        return True
-    if ("CONNECTION", "CLOSE") in upper_headers:
-        return True
-    return False
+        return "KEEP-ALIVE" not in connection_tokens
+    return "CLOSE" in connection_tokens
+
+
+def decode_request_line(
+    cfg: config.MessageConfig, line: bytes
+) -> tuple[str, tuple[str, str, str], tuple[int, int]]:
+    if not line:
+        raise InvalidRequestLine(line)
+
+    decoded_line = bytes_to_str(line)
+    if not line.endswith(b"\r\n"):
+        raise LimitRequestLine()
+    tokens = line.split(b" ")
+    if len(tokens) < 3:
+        raise InvalidRequestLine(decoded_line)
+
+    raw_method, raw_uri, raw_version = tokens
+    method = bytes_to_str(raw_method)
+
+    # validate method
+    if not cfg.permit_unconventional_http_method:
+        if raw_method.translate(None, NOT_METHOD_BADCHARS):
+            raise InvalidRequestMethod(method)
+        if not 3 <= len(raw_method) <= 20:
+            raise InvalidRequestMethod(method)
+    if not is_token(raw_method):
+        raise InvalidRequestMethod(method)
 
+    # validate uri
+    if not raw_uri:
+        raise InvalidRequestLine(decoded_line)
 
-class RequestParser:
-    PROTOCOL_VERSION_TOKEN: ClassVar[re.Pattern] = re.compile(
-        r"HTTP/(?P<major>\d+)\.(?P<minor>\d+)"
+    try:
+        parts = split_request_uri(bytes_to_str(raw_uri))
+    except ValueError:
+        raise InvalidRequestLine(decoded_line)
+    path, query, fragment = (
+        parts.path or "",
+        parts.query or "",
+        parts.fragment or "",
     )
-    RFC9110_5_6_2_TOKEN_SPECIALS: ClassVar[str] = r"!#$%&'*+-.^_`|~"
-    TOKEN_PATTERN: ClassVar[re.Pattern] = re.compile(
-        rf"[{re.escape(RFC9110_5_6_2_TOKEN_SPECIALS)}0-9a-zA-Z]+"
+
+    # validate http version
+    version = bytes_to_str(raw_version)
+    matched = PROTOCOL_VERSION_TOKEN.match(version)
+    if not matched:
+        raise InvalidHTTPVersion(version)
+    version = (int(matched.group("major")), int(matched.group("minor")))
+    if not (1, 0) <= version < (2, 0):
+        if not cfg.permit_unconventional_http_version:
+            raise InvalidHTTPVersion(version)
+
+    return method, (path, query, fragment), version
+
+
+def max_header_block_size(cfg: config.MessageConfig) -> int:
+    # A valid header block is at most limit_request_fields lines of
+    # limit_request_field_size bytes. Reading a little further than that
+    # lets an oversized block fail with the same limit errors as before.
+    # limit_request_headers_total caps it so that a hostile client cannot
+    # make us buffer all of that.
+    return min(
+        (cfg.limit_request_fields + 2) * (cfg.limit_request_field_size + 2),
+        cfg.limit_request_headers_total,
     )
-    METHOD_BADCHAR_RE: ClassVar[re.Pattern] = re.compile("[a-z#]")
 
-    def __init__(self, cfg: config.MessageConfig, socket_reader: reader.SocketReader):
+
+def decode_header_block(cfg: config.MessageConfig, block: bytes) -> Headers:
+    lines = block.split(b"\r\n")
+    # A block that was cut short by EOF or by the size cap ends with an
+    # incomplete line instead of the empty line.
+    is_complete = block.endswith(b"\r\n\r\n")
+    if len(block) > cfg.limit_request_headers_total or (
+        len(block) == cfg.limit_request_headers_total and not is_complete
+    ):
+        raise LimitRequestHeadersTotal(cfg.limit_request_headers_total)
+    partial_line = lines.pop()
+    if is_complete:
+        lines.pop()
+
+    headers = Headers()
+    for line in lines:
+        if len(headers) > cfg.limit_request_fields:
+            raise LimitRequestHeaders("limit request headers fields")
+        if len(line) + 2 > cfg.limit_request_field_size:
+            raise LimitRequestHeaders("limit request header field size")
+        raw_name, colon, raw_value = line.partition(b":")
+        if not colon:
+            raise InvalidHeader(line + b"\r\n")
+        if (name := HEADER_NAMES.get(raw_name)) is None:
+            raw_name = raw_name.lstrip(LATIN1_WHITESPACE)
+            if not is_token(raw_name):
+                raise InvalidHeaderName(bytes_to_str(raw_name))
+            name = canonical_name(bytes_to_str(raw_name))
+        headers.append(name, bytes_to_str(raw_value).rstrip().strip(" \t"))
+
+    if len(headers) > cfg.limit_request_fields:
+        raise LimitRequestHeaders("limit request headers fields")
+    if not is_complete:
+        if len(partial_line) + 2 > cfg.limit_request_field_size:
+            raise LimitRequestHeaders("limit request header field size")
+        raise NoMoreData(partial_line)
+    return headers
+
+
+DecodedHead = tuple[str, tuple[str, str, str], tuple[int, int], Headers]
+
+
+class RequestHeadCache:
+    # Heads larger than this are hardly ever repeated byte for byte, and
+    # keeping them would let a few requests take up most of the memory.
+    MAX_HEAD_SIZE = 4096
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._heads: collections.OrderedDict[tuple[bytes, bytes], DecodedHead] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._heads)
+
+    def get(self, line: bytes, block: bytes) -> DecodedHead | None:
+        key = (line, block)
+        if (head := self._heads.get(key)) is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._heads.move_to_end(key)
+        method, uri_parts, version, headers = head
+        # the request may change its headers, the cached ones must not change
+        return method, uri_parts, version, headers.copy()
+
+    def put(self, line: bytes, block: bytes, head: DecodedHead) -> None:
+        if len(line) + len(block) > self.MAX_HEAD_SIZE:
+            return
+        method, uri_parts, version, headers = head
+        self._heads[(line, block)] = (method, uri_parts, version, headers.copy())
+        if len(self._heads) > self.maxsize:
+            self._heads.popitem(last=False)
+
+
+def decode_head(
+    cfg: config.MessageConfig,
+    line: bytes,
+    block: bytes,
+    head_cache: RequestHeadCache | None = None,
+) -> DecodedHead:
+    if head_cache is not None and (head := head_cache.get(line, block)):
+        return head
+    method, uri_parts, version = decode_request_line(cfg, line)
+    headers = Headers() if block == b"\r\n" else decode_header_block(cfg, block)
+    if head_cache is not None:
+        head_cache.put(line, block, (method, uri_parts, version, headers))
+    return method, uri_parts, version, headers
+
+
+@dataclasses.dataclass(frozen=True)
+class RequestHead:
+    method: str
+    path: str
+    query: str
+    fragment: str
+    version: tuple[int, int]
+    headers: Headers
+
+
+@dataclasses.dataclass(frozen=True)
+class BodyData:
+    data: bytes
+
+
+@dataclasses.dataclass(frozen=True)
+class Trailers:
+    headers: Headers
+
+
+@dataclasses.dataclass(frozen=True)
+class MessageComplete:
+    keep_alive: bool
+
+
+Event = RequestHead | BodyData | Trailers | MessageComplete
+
+
+class IncrementalParser:
+    def __init__(
+        self, cfg: config.MessageConfig, head_cache: RequestHeadCache | None = None
+    ):
+        self.cfg = cfg
+        self.head_cache = head_cache
+        self._buf = bytearray()
+        # start of the bytes not consumed yet
+        self._pos = 0
+        # where the next delimiter search resumes, so nothing is scanned twice
+        self._scan = 0
+        self._line = b""
+        self._request_line_parts: tuple | None = None
+        self._head: RequestHead | None = None
+        self._remaining = 0
+        self._state: Callable[[], Event | None] = self._request_line
+        self._after_body: Callable[[], Event | None] = self._complete
+        self.closed = False
+
+    def feed(self, data: bytes) -> list[Event]:
+        if self.closed:
+            return []
+        if not data:
+            if self._state != self._request_line or self._pos < len(self._buf):
+                raise NoMoreData(bytes(self._buf[self._pos :]))
+            self.closed = True
+            return []
+
+        self._buf += data
+        events = []
+        while not self.closed and (event := self._state()) is not None:
+            events.append(event)
+        del self._buf[: self._pos]
+        self._scan = max(0, self._scan - self._pos)
+        self._pos = 0
+        return events
+
+    @property
+    def pending(self) -> int:
+        return len(self._buf) - self._pos
+
+    @property
+    def in_message(self) -> bool:
+        # the head of a message went out and its MessageComplete has not
+        return self._head is not None
+
+    def _find(self, target: bytes, limit: int) -> int:
+        start = max(self._pos, self._scan)
+        end = min(len(self._buf), self._pos + limit)
+        index = self._buf.find(target, start, end)
+        if index == -1:
+            self._scan = max(self._pos, end - len(target) + 1)
+        return index
+
+    def _take(self, end: int) -> bytes:
+        data = bytes(self._buf[self._pos : end])
+        self._pos = self._scan = end
+        return data
+
+    def _request_line(self) -> Event | None:
+        # RFC 9112 Section 2.2: empty lines before a request line are ignored
+        while self._buf.startswith(b"\r\n", self._pos):
+            self._take(self._pos + 2)
+        limit = self.cfg.limit_request_line
+        if (index := self._find(b"\r\n", limit)) == -1:
+            if len(self._buf) - self._pos >= limit:
+                raise LimitRequestLine()
+            return None
+        self._line = self._take(index + 2)
+        # A cached head is decoded with its header block. Without a cache
+        # the line is checked as soon as it is complete.
+        if self.head_cache is None:
+            self._request_line_parts = decode_request_line(self.cfg, self._line)
+        self._state = self._headers
+        return self._state()
+
+    def _header_block(self) -> bytes | None:
+        if len(self._buf) - self._pos < 2:
+            return None
+        if self._buf.startswith(b"\r\n", self._pos):
+            return self._take(self._pos + 2)
+        limit = max_header_block_size(self.cfg)
+        if (index := self._find(b"\r\n\r\n", limit)) == -1:
+            if len(self._buf) - self._pos >= limit:
+                # an unterminated block never decodes, this raises its error
+                decode_header_block(self.cfg, self._take(self._pos + limit))
+            return None
+        return self._take(index + 4)
+
+    def _headers(self) -> Event | None:
+        if (block := self._header_block()) is None:
+            return None
+        if self._request_line_parts is None:
+            method, (path, query, fragment), version, headers = decode_head(
+                self.cfg, self._line, block, self.head_cache
+            )
+        else:
+            method, (path, query, fragment), version = self._request_line_parts
+            self._request_line_parts = None
+            headers = (
+                Headers() if block == b"\r\n" else decode_header_block(self.cfg, block)
+            )
+        head = self._head = RequestHead(
+            method=method,
+            path=path,
+            query=query,
+            fragment=fragment,
+            version=version,
+            headers=headers,
+        )
+        chunked, content_length = body.framing(head.version, headers)
+        if chunked:
+            self._state = self._chunk_size
+        elif content_length:
+            self._remaining = content_length
+            self._after_body = self._complete
+            self._state = self._body
+        else:
+            self._state = self._complete
+        return head
+
+    def _body(self) -> Event | None:
+        if self._pos == len(self._buf):
+            return None
+        end = min(len(self._buf), self._pos + self._remaining)
+        self._remaining -= end - self._pos
+        if not self._remaining:
+            self._state = self._after_body
+        return BodyData(self._take(end))
+
+    def _chunk_size(self) -> Event | None:
+        if (index := self._find(b"\r\n", self.cfg.limit_request_field_size)) == -1:
+            if len(self._buf) - self._pos >= self.cfg.limit_request_field_size:
+                raise InvalidChunkSize(self._take(len(self._buf)))
+            return None
+        size = decode_chunk_size_line(self._take(index + 2))
+        if size == 0:
+            self._state = self._trailers
+        else:
+            self._remaining = size
+            self._after_body = self._chunk_terminator
+            self._state = self._body
+        return self._state()
+
+    def _chunk_terminator(self) -> Event | None:
+        if len(self._buf) - self._pos < 2:
+            return None
+        if (term := self._take(self._pos + 2)) != b"\r\n":
+            raise ChunkMissingTerminator(term)
+        self._state = self._chunk_size
+        return self._state()
+
+    def _trailers(self) -> Event | None:
+        if (block := self._header_block()) is None:
+            return None
+        self._state = self._complete
+        if block != b"\r\n":
+            return Trailers(decode_header_block(self.cfg, block))
+        return self._state()
+
+    def _complete(self) -> Event | None:
+        keep_alive = not should_close(self._head.version, self._head.headers)
+        self._head = None
+        self._state = self._request_line
+        self.closed = not keep_alive
+        return MessageComplete(keep_alive=keep_alive)
+
+
+class Parser(abc.ABC):
+    def __init__(
+        self,
+        cfg: config.MessageConfig,
+        socket_reader: reader.SocketReader,
+        head_cache: RequestHeadCache | None = None,
+    ):
         self.cfg = cfg
         self.reader = socket_reader
+        self.head_cache = head_cache
+        # body of a finished request, handed back to be reused by the next
+        self.spare_body: body.RequestBody | None = None
+
+    @abc.abstractmethod
+    def parse(self) -> Generator[message.Request, None, None]:
+        raise NotImplementedError
+
+    @property
+    def has_pending(self) -> bool:
+        # received bytes that may already hold the next request
+        return bool(self.reader.pending)
+
+    def reset(self, spare_body: body.RequestBody | None = None) -> None:
+        # Called between requests on a keep-alive connection, once the
+        # previous request is done with.
+        self.reader.reset()
+        self.spare_body = spare_body
+
+    def request_body(self, body_reader: reader.BodyReader) -> body.RequestBody:
+        if (req_body := self.spare_body) is None:
+            return body.RequestBody(body_reader)
+        self.spare_body = None
+        req_body.reset(body_reader)
+        return req_body
+
+    def decode_head(self, line: bytes, block: bytes) -> DecodedHead:
+        return decode_head(self.cfg, line, block, self.head_cache)
+
+
+class RequestParser(Parser):
+    def __init__(
+        self,
+        cfg: config.MessageConfig,
+        socket_reader: reader.SocketReader,
+        head_cache: RequestHeadCache | None = None,
+    ):
+        super().__init__(cfg, socket_reader, head_cache)
+        # The socket reads below only feed it. It keeps its state across the
+        # requests of a connection, so it outlives reset().
+        self.incremental = IncrementalParser(cfg, head_cache)
+        self.events: collections.deque[Event] = collections.deque()
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self.events or self.incremental.pending or self.reader.pending)
+
+    def next_event(self) -> Event | None:
+        while not self.events:
+            if self.incremental.closed:
+                return None
+            # The incremental parser keeps whatever it has not used yet, so
+            # bytes go to it straight from the socket unless some are
+            # already buffered.
+            if pending := self.reader.pending:
+                data = self.reader.read(pending)
+                self.reader.reset()
+            else:
+                data = self.reader.chunk()
+            try:
+                self.events.extend(self.incremental.feed(data))
+            except NoMoreData:
+                # As before, a body or trailer section cut short by EOF ends
+                # the request instead of failing it.
+                if not self.incremental.in_message:
+                    raise
+                self.incremental.closed = True
+                self.events.append(MessageComplete(keep_alive=False))
+        return self.events.popleft()
 
     def parse(self) -> Generator[message.Request, None, None]:
         try:
-            while self.reader.read(1):
-                self.reader.unread(1)
-                method, (path, query, fragment), version = self.parse_request_line()
-                headers = self.parse_headers()
-                req_body = body.RequestBody.create(version, headers, self.reader)
-                trailers = (
-                    req_body.reader.trailers
-                    if hasattr(req_body.reader, "trailers")
-                    else []
+            while (head := self.next_event()) is not None:
+                content = io.BytesIO()
+                trailers = []
+                while isinstance(event := self.next_event(), BodyData | Trailers):
+                    if isinstance(event, BodyData):
+                        content.write(event.data)
+                    else:
+                        trailers = list(event.headers)
+                length = content.tell()
+                content.seek(0)
+                yield message.Request(
+                    method=head.method,
+                    path=head.path,
+                    query=head.query,
+                    fragment=head.fragment,
+                    headers=head.headers,
+                    body=self.request_body(reader.LengthReader(content, length)),
+                    version=head.version,
+                    trailers=trailers,
+                )
+        except BlockingIOError:
+            # If the socket is non-blocking and no data is available, we just return
+            return
+
+    def parse_request_line(self) -> tuple[str, tuple[str, str, str], tuple[int, int]]:
+        line = self.reader.read_until(b"\r\n", self.cfg.limit_request_line)
+        return decode_request_line(self.cfg, line)
+
+    def parse_headers(self) -> Headers:
+        if (block := self.read_header_block()) == b"\r\n":
+            return Headers()
+        return decode_header_block(self.cfg, block)
+
+    def read_header_block(self) -> bytes:
+        if (first := self.reader.read_until(b"\r\n", 2)) == b"\r\n":
+            return first
+        self.reader.unread(len(first))
+        return self.reader.read_until(b"\r\n\r\n", max_header_block_size(self.cfg))
+
+
+class FastRequestParser(Parser):
+    def parse(self) -> Generator[message.Request, None, None]:
+        # The request line and the header block are read with one search
+        # for the blank line, instead of probing, unreading and searching
+        # again for each part.
+        max_head_size = self.cfg.limit_request_line + max_header_block_size(self.cfg)
+        try:
+            while head := self.reader.read_until(b"\r\n\r\n", max_head_size):
+                line_end = head.find(b"\r\n", 0, self.cfg.limit_request_line)
+                line = head[
+                    : self.cfg.limit_request_line if line_end == -1 else line_end + 2
+                ]
+                method, (path, query, fragment), version, headers = self.decode_head(
+                    line, head[len(line) :]
                 )
+                req_body, trailers = self.parse_body(version, headers)
                 yield message.Request(
                     method=method,
                     path=path,
@@ -70,72 +558,35 @@ class RequestParser:
             # If the socket is non-blocking and no data is available, we just return
             return
 
-    def parse_request_line(self) -> tuple[str, tuple[str, str, str], tuple[int, int]]:
-        line = self.reader.read_until(b"\r\n", self.cfg.limit_request_line)
-        if not line:
-            raise InvalidRequestLine(line)
-
-        decoded_line = bytes_to_str(line)
-        if not decoded_line.endswith("\r\n"):
-            raise LimitRequestLine()
-        tokens = decoded_line.split(" ")
-        if len(tokens) < 3:
-            raise InvalidRequestLine(decoded_line)
-
-        method, uri, version = tokens
-
-        # validate method
-        if not self.cfg.permit_unconventional_http_method:
-            if self.METHOD_BADCHAR_RE.search(method):
-                raise InvalidRequestMethod(method)
-            if not 3 <= len(method) <= 20:
-                raise InvalidRequestMethod(method)
-        if not self.TOKEN_PATTERN.fullmatch(method):
-            raise InvalidRequestMethod(method)
-
-        # validate uri
-        if not uri:
-            raise InvalidRequestLine(decoded_line)
+    def parse_body(
+        self, version: tuple[int, int], headers: Headers
+    ) -> tuple[body.RequestBody, list[tuple[str, str]]]:
+        chunked, content_length = body.framing(version, headers)
+        if chunked:
+            chunked_reader = reader.ChunkedReader.parse_chunked(self.reader)
+            return self.request_body(chunked_reader), chunked_reader.trailers
 
-        try:
-            parts = split_request_uri(uri)
-        except ValueError:
-            raise InvalidRequestLine(decoded_line)
-        path, query, fragment = (
-            parts.path or "",
-            parts.query or "",
-            parts.fragment or "",
+        parts = []
+        remaining = content_length or 0
+        while remaining and (data := self.reader.read(remaining)):
+            parts.append(data)
+            remaining -= len(data)
+        content = b"".join(parts)
+        return (
+            self.request_body(reader.LengthReader(io.BytesIO(content), len(content))),
+            [],
         )
 
-        # validate http version
-        matched = self.PROTOCOL_VERSION_TOKEN.match(version)
-        if not matched:
-            raise InvalidHTTPVersion(version)
-        version = (int(matched.group("major")), int(matched.group("minor")))
-        if not (1, 0) <= version < (2, 0):
-            if not self.cfg.permit_unconventional_http_version:
-                raise InvalidHTTPVersion(version)
-
-        return method, (path, query, fragment), version
-
-    def parse_headers(self) -> list[tuple[str, str]]:
-        headers = []
-
-        while True:
-            if len(headers) > self.cfg.limit_request_fields:
-                raise LimitRequestHeaders("limit request headers fields")
-            header_line = self.reader.read_until(b"\r\n")
-            if not header_line.endswith(b"\r\n"):
-                raise NoMoreData(header_line)
-            if header_line == b"\r\n":
-                break
-            if len(header_line) > self.cfg.limit_request_field_size:
-                raise LimitRequestHeaders("limit request header field size")
-            header_parts = bytes_to_str(header_line).strip().split(":", 1)
-            if len(header_parts) != 2:
-                raise InvalidHeader(header_line)
-            raw_header = (header_parts[0], header_parts[1].strip(" \t"))
-            if not self.TOKEN_PATTERN.fullmatch(raw_header[0]):
-                raise InvalidHeaderName(raw_header[0])
-            headers.append((raw_header[0].upper(), raw_header[1]))
-        return headers
+
+PARSERS: dict[str, type[Parser]] = {
+    "reference": RequestParser,
+    "fast": FastRequestParser,
+}
+
+
+def create_parser(
+    cfg: config.MessageConfig,
+    socket_reader: reader.SocketReader,
+    head_cache: RequestHeadCache | None = None,
+) -> Parser:
+    return PARSERS[cfg.parser_backend](cfg, socket_reader, head_cache)
@@ -8,8 +8,28 @@ from typing import Self, IO, ClassVar
 
 from web_server.errors import InvalidChunkSize, InvalidHeader
 
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+# 16 hex digits already cover sizes up to 2**64 - 1, anything longer is a
+# client trying to make int() chew on an arbitrarily long number
+MAX_CHUNK_SIZE_DIGITS = 16
+
+
+def decode_chunk_size_line(line: bytes) -> int:
+    # The size runs up to the first ";", or up to the CRLF when there is no
+    # chunk extension. The extension itself is never copied.
+    end = line.find(b";")
+    chunk_size = line.removesuffix(b"\r\n") if end == -1 else line[:end]
+    if not 0 < len(chunk_size) <= MAX_CHUNK_SIZE_DIGITS:
+        raise InvalidChunkSize(chunk_size)
+    # deleting every hex digit leaves nothing behind for a valid size
+    if chunk_size.translate(None, HEX_DIGITS):
+        raise InvalidChunkSize(chunk_size)
+    return int(chunk_size, 16)
+
 
 class SocketReader:
+    __slots__ = ("buf", "sock", "max_chunk", "_read_cursor")
+
     def __init__(self, sock: socket.socket, max_chunk: int = 8192):
         self.buf = io.BytesIO()
         self.sock = sock
@@ -24,14 +44,29 @@ class SocketReader:
             raise TypeError("size parameter must be an int or long.")
 
         size = self.max_chunk if size is None else size
-        if chunk := self.chunk():
-            self.buf.seek(0, os.SEEK_END)
+        # Bytes already buffered, such as a pipelined request, are served
+        # without asking a non-blocking socket for more.
+        if self.pending < size and (chunk := self.chunk()):
             self.buf.write(chunk)
         self.buf.seek(self._read_cursor, os.SEEK_SET)
         data = self.buf.read(size)
         self._read_cursor = self.buf.tell()
         return data
 
+    @property
+    def pending(self) -> int:
+        return self.buf.seek(0, os.SEEK_END) - self._read_cursor
+
+    def reset(self) -> None:
+        # Drops what has been read, so the buffer of a keep-alive connection
+        # holds no more than the bytes of requests not yet parsed.
+        self.buf.seek(self._read_cursor, os.SEEK_SET)
+        rest = self.buf.read()
+        self.buf.seek(0, os.SEEK_SET)
+        self.buf.truncate()
+        self.buf.write(rest)
+        self._read_cursor = 0
+
     def unread(self, size: int) -> None:
         if not isinstance(size, int):
             raise TypeError("size must be an integer type")
@@ -49,22 +84,17 @@ class SocketReader:
         if not target:
             raise ValueError("target must be non-empty")
 
-        read_length = 0
+        self.buf.seek(self._read_cursor, os.SEEK_SET)
+        data = self.buf.read()
+        search_from = 0
         while True:
-            self.buf.seek(self._read_cursor, os.SEEK_SET)
-            data = self.buf.read()
-            read_length += len(data)
-
-            search_data = data
-            if limit is not None:
-                search_data = data[:limit]
-
-            if (target_index := search_data.find(target)) != -1:
+            search_to = len(data) if limit is None else limit
+            if (target_index := data.find(target, search_from, search_to)) != -1:
                 target_next_index = target_index + len(target)
                 self._read_cursor += target_next_index
                 return data[:target_next_index]
 
-            if limit is not None and read_length >= limit:
+            if limit is not None and len(data) >= limit:
                 self._read_cursor += limit
                 return data[:limit]
 
@@ -75,15 +105,23 @@ class SocketReader:
                 return data
 
             self.buf.write(chunk)
+            # Only the bytes that arrived with this chunk, plus enough of the
+            # old tail to catch a target split across chunks, are searched again.
+            search_from = max(0, len(data) - len(target) + 1)
+            data += chunk
 
 
 class BodyReader(abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def read(self, size: int) -> bytes:
         raise NotImplementedError
 
 
 class LengthReader(BodyReader):
+    __slots__ = ("buf", "length")
+
     def __init__(self, buf: IO[bytes], length: int):
         self.buf = buf
         self.length = length
@@ -119,6 +157,8 @@ class LengthReader(BodyReader):
 
 
 class Chunk:
+    __slots__ = ("data", "size")
+
     CRLF_NOT_FOUND: ClassVar[int] = -1
     CRLF: ClassVar[bytes] = b"\r\n"
 
@@ -151,13 +191,7 @@ class Chunk:
     ) -> Generator[Self, None, None]:
         while True:
             buf = io.BytesIO()
-            chunk_size_line = socket_reader.read_until(cls.CRLF).replace(cls.CRLF, b"")
-            chunk_size, *_ = chunk_size_line.split(b";", 1)
-            if not chunk_size or any(
-                n not in b"0123456789abcdefABCDEF" for n in chunk_size
-            ):
-                raise InvalidChunkSize(chunk_size)
-            size = int(chunk_size.rstrip(b" \t"), 16)
+            size = decode_chunk_size_line(socket_reader.read_until(cls.CRLF))
             if size == 0:
                 content = b""
                 data = socket_reader.read_until(cls.CRLF)
@@ -180,6 +214,8 @@ class Chunk:
 
 
 class ChunkedReader(BodyReader):
+    __slots__ = ("buf", "trailers")
+
     def __init__(self, buf: IO[bytes], trailers: list[tuple[str, str]]):
         self.buf = buf
         self.trailers = trailers
@@ -212,6 +248,8 @@ class ChunkedReader(BodyReader):
 
 
 class EOFReader(BodyReader):
+    __slots__ = ("buf",)
+
     def __init__(self, buf: IO[bytes]):
         self.buf = buf
 
@@ -0,0 +1,91 @@
+import os
+import selectors
+import socket
+import time
+from collections.abc import Sequence
+
+from web_server.errors import WriteTimeout
+
+
+class SocketWriter:
+    __slots__ = ("sock", "timeout", "bytes_written", "blocked_time")
+
+    def __init__(self, sock: socket.socket, timeout: float | None = None):
+        self.sock = sock
+        self.timeout = timeout
+        self.bytes_written = 0
+        self.blocked_time = 0.0
+
+    def reset(self) -> None:
+        # called between responses, each gets the whole timeout
+        self.blocked_time = 0.0
+
+    def write(self, data: bytes) -> None:
+        remaining = data
+        while remaining:
+            try:
+                sent = self.sock.send(remaining)
+            except BlockingIOError:
+                self._wait_writable()
+                continue
+            self.bytes_written += sent
+            if sent == len(remaining):
+                break
+            remaining = memoryview(remaining)[sent:]
+
+    def writev(self, buffers: Sequence[bytes]) -> None:
+        if len(buffers) == 1:
+            self.write(buffers[0])
+            return
+
+        remaining = sum(map(len, buffers))
+        while remaining:
+            try:
+                sent = self.sock.sendmsg(buffers)
+            except BlockingIOError:
+                self._wait_writable()
+                continue
+            self.bytes_written += sent
+            remaining -= sent
+            if remaining:
+                buffers = self._advance(buffers, sent)
+
+    def sendfile(self, fileno: int, offset: int, count: int) -> None:
+        sockno = self.sock.fileno()
+        while count > 0:
+            try:
+                sent = os.sendfile(sockno, fileno, offset, count)
+            except BlockingIOError:
+                self._wait_writable()
+                continue
+            if not sent:
+                # the file was truncated after its length was taken
+                break
+            self.bytes_written += sent
+            offset += sent
+            count -= sent
+
+    @staticmethod
+    def _advance(buffers: Sequence[bytes], sent: int) -> tuple[bytes, ...]:
+        for index, buf in enumerate(buffers):
+            if sent < len(buf):
+                return (memoryview(buf)[sent:], *buffers[index + 1 :])
+            sent -= len(buf)
+        return ()
+
+    def _wait_writable(self) -> None:
+        # The timeout is how long a peer may keep a whole response waiting,
+        # added up over every write, so one that reads a little now and then
+        # cannot hold the worker forever. A write that never blocks costs no
+        # clock reads.
+        started = time.monotonic()
+        left = None if self.timeout is None else self.timeout - self.blocked_time
+        if left is not None and left <= 0:
+            raise WriteTimeout(self.timeout, self.bytes_written)
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.sock, selectors.EVENT_WRITE)
+            ready = selector.select(left)
+        self.blocked_time += time.monotonic() - started
+        if not ready:
+            raise WriteTimeout(self.timeout, self.bytes_written)
@@ -0,0 +1,382 @@
+import collections
+import dataclasses
+import email.utils
+import mimetypes
+import mmap
+import os
+import stat
+import time
+import urllib.parse
+from collections.abc import Iterable
+from typing import Any, Self
+
+from web_server import http
+from web_server.http import compression
+from web_server.types import StartResponse, WSGIApplication
+
+DEFAULT_BLOCK_SIZE = 65536
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+DEFAULT_CACHE_MAX_SIZE = 64 * 1024 * 1024
+DEFAULT_CACHE_MAX_FILE_SIZE = 1024 * 1024
+# files up to this size are kept as bytes, larger ones are mmap'd
+DEFAULT_CACHE_MMAP_THRESHOLD = 16 * 1024
+DEFAULT_CACHE_REVALIDATE_INTERVAL = 1.0
+
+
+def parse_range(value: str, size: int) -> range | None:
+    # The bytes to send for a single byte range, an empty range when it
+    # cannot be satisfied, or None when the header is to be ignored
+    # (another unit, several ranges or a malformed spec).
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = (part.strip() for part in spec.partition("-"))
+    if not sep or not (first or last):
+        return None
+    # isdigit() alone also takes digits such as "²" that int() rejects
+    if not all(
+        part.isascii() and part.isdigit() for part in (first or "0", last or "0")
+    ):
+        return None
+    if not first:
+        return range(max(size - int(last), 0), size)
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    end = size if not last else min(int(last) + 1, size)
+    return range(start, end) if start < size else range(0)
+
+
+def etag_matches(value: str, etag: str) -> bool:
+    # weak comparison, as If-None-Match uses
+    if value.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for tag in value.split(",")
+    )
+
+
+def http_date_timestamp(value: str) -> int | None:
+    try:
+        return int(email.utils.parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def stat_file(filename: str) -> os.stat_result | None:
+    try:
+        st = os.stat(filename)
+    except (OSError, ValueError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+class StaticFile:
+    __slots__ = ("filename", "size", "mtime", "etag", "headers")
+
+    def __init__(
+        self, filename: str, st: os.stat_result, headers: list[tuple[str, str]]
+    ):
+        self.filename = filename
+        self.size = st.st_size
+        self.mtime = int(st.st_mtime)
+        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        # every response for the file starts with these, Content-Type first
+        self.headers = [
+            *headers,
+            ("ETag", self.etag),
+            ("Last-Modified", email.utils.formatdate(self.mtime, usegmt=True)),
+            ("Accept-Ranges", "bytes"),
+        ]
+
+    @classmethod
+    def select(cls, filename: str, accept_gzip: bool) -> Self | None:
+        # the file itself, or its .gz sibling for a client accepting gzip
+        if (st := stat_file(filename)) is None:
+            return None
+        content_type, _ = mimetypes.guess_type(filename)
+        headers = [("Content-Type", content_type or DEFAULT_CONTENT_TYPE)]
+        if (gz_st := stat_file(filename + ".gz")) is not None:
+            headers.append(("Vary", "Accept-Encoding"))
+            if accept_gzip:
+                filename, st = filename + ".gz", gz_st
+                headers.append(("Content-Encoding", "gzip"))
+        return cls(filename, st, headers)
+
+
+@dataclasses.dataclass(frozen=True)
+class FileCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size: int
+    mapped_size: int
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+class CachedFile:
+    __slots__ = ("file", "data", "checked_at", "keys")
+
+    def __init__(self, file: StaticFile, data: bytes | mmap.mmap, checked_at: float):
+        self.file = file
+        self.data = data
+        self.checked_at = checked_at
+        # the (path, accept_gzip) lookups that select this file
+        self.keys: list[tuple[str, bool]] = []
+
+
+class FileCache:
+    # Files are expected to be replaced, not rewritten in place: a mapped
+    # file truncated before it is revalidated faults when it is read.
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        max_file_size: int = DEFAULT_CACHE_MAX_FILE_SIZE,
+        mmap_threshold: int = DEFAULT_CACHE_MMAP_THRESHOLD,
+        revalidate_interval: float = DEFAULT_CACHE_REVALIDATE_INTERVAL,
+    ):
+        self.max_size = max_size
+        self.max_file_size = max_file_size
+        self.mmap_threshold = mmap_threshold
+        self.revalidate_interval = revalidate_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # bytes held by all entries, and the part of it that is mmap'd
+        self.size = 0
+        self.mapped_size = 0
+        # keyed on the file served, so a file without a .gz sibling is kept
+        # once for clients that accept gzip and those that do not
+        self._files: collections.OrderedDict[str, CachedFile] = (
+            collections.OrderedDict()
+        )
+        self._selected: dict[tuple[str, bool], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def stats(self) -> FileCacheStats:
+        return FileCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self._files),
+            size=self.size,
+            mapped_size=self.mapped_size,
+        )
+
+    def get(
+        self, filename: str, accept_gzip: bool
+    ) -> tuple[StaticFile, bytes | mmap.mmap | None] | None:
+        # The file to serve and its contents, which are None when it is too
+        # large to keep; None when there is no such file.
+        key = (filename, accept_gzip)
+        now = time.monotonic()
+        selected = self._selected.get(key)
+        if selected is not None and (cached := self._files.get(selected)) is not None:
+            if now - cached.checked_at < self.revalidate_interval:
+                return self._hit(cached)
+            file = StaticFile.select(filename, accept_gzip)
+            if (
+                file is not None
+                and file.filename == cached.file.filename
+                and file.etag == cached.file.etag
+            ):
+                cached.checked_at = now
+                return self._hit(cached)
+            self._remove(cached.file.filename)
+        else:
+            file = StaticFile.select(filename, accept_gzip)
+
+        if file is None:
+            self.misses += 1
+            return None
+        if (cached := self._files.get(file.filename)) is not None:
+            if cached.file.etag == file.etag:
+                # loaded already for the other Accept-Encoding
+                self._link(key, cached)
+                cached.checked_at = now
+                return self._hit(cached)
+            self._remove(file.filename)
+
+        self.misses += 1
+        if file.size > min(self.max_file_size, self.max_size):
+            return file, None
+        if (data := self._load(file)) is None:
+            return file, None
+        cached = self._files[file.filename] = CachedFile(file, data, now)
+        self._link(key, cached)
+        self.size += file.size
+        if isinstance(data, mmap.mmap):
+            self.mapped_size += file.size
+        while self.size > self.max_size:
+            self._remove(next(iter(self._files)))
+            self.evictions += 1
+        return file, data
+
+    def _hit(self, cached: CachedFile) -> tuple[StaticFile, bytes | mmap.mmap]:
+        self.hits += 1
+        self._files.move_to_end(cached.file.filename)
+        return cached.file, cached.data
+
+    def _link(self, key: tuple[str, bool], cached: CachedFile) -> None:
+        self._selected[key] = cached.file.filename
+        cached.keys.append(key)
+
+    def _load(self, file: StaticFile) -> bytes | mmap.mmap | None:
+        try:
+            with open(file.filename, "rb") as handle:
+                if file.size <= self.mmap_threshold:
+                    data = handle.read()
+                else:
+                    data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        # changed since it was stat'ed, so it is served from disk this time
+        return data if len(data) == file.size else None
+
+    def _remove(self, filename: str) -> None:
+        # A mapping is not closed here: responses in flight may still hold
+        # views of it, and it is unmapped once the last one is dropped.
+        cached = self._files.pop(filename)
+        for key in cached.keys:
+            if self._selected.get(key) == filename:
+                del self._selected[key]
+        self.size -= cached.file.size
+        if isinstance(cached.data, mmap.mmap):
+            self.mapped_size -= cached.file.size
+
+
+class StaticFiles:
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "/",
+        app: WSGIApplication | None = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        cache: FileCache | None = None,
+    ):
+        self.directory = os.path.realpath(directory)
+        self.prefix = prefix.rstrip("/")
+        # requests outside the prefix go here, or get a 404 without it
+        self.app = app
+        self.block_size = block_size
+        self.cache = cache
+
+    def __call__(
+        self, environ: dict[str, Any], start_response: StartResponse
+    ) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO") or "/"
+        if not self.mounts(path):
+            if self.app is None:
+                return self.respond(start_response, "404 Not Found")
+            return self.app(environ, start_response)
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return self.respond(
+                start_response, "405 Method Not Allowed", [("Allow", "GET, HEAD")]
+            )
+        if (filename := self.resolve(path[len(self.prefix) :])) is None:
+            return self.respond(start_response, "404 Not Found")
+
+        accept_gzip = compression.accepts(environ.get("HTTP_ACCEPT_ENCODING"), "gzip")
+        data = None
+        if self.cache is not None:
+            if (cached := self.cache.get(filename, accept_gzip)) is None:
+                return self.respond(start_response, "404 Not Found")
+            file, data = cached
+        elif (file := StaticFile.select(filename, accept_gzip)) is None:
+            return self.respond(start_response, "404 Not Found")
+
+        if self.not_modified(environ, file.etag, file.mtime):
+            # no body and no Content-Length, which would have to be the
+            # length of the full representation
+            start_response("304 Not Modified", file.headers[1:])
+            return []
+
+        status, headers, byte_range = "200 OK", [*file.headers], range(file.size)
+        range_header = environ.get("HTTP_RANGE")
+        if (
+            range_header
+            and environ["REQUEST_METHOD"] == "GET"
+            and self.range_applies(environ, file.etag, file.mtime)
+        ):
+            requested = parse_range(range_header, file.size)
+            if requested is not None and not requested:
+                return self.respond(
+                    start_response,
+                    "416 Range Not Satisfiable",
+                    [("Content-Range", f"bytes */{file.size}")],
+                )
+            if requested is not None:
+                status, byte_range = "206 Partial Content", requested
+                headers.append(
+                    (
+                        "Content-Range",
+                        f"bytes {requested.start}-{requested.stop - 1}/{file.size}",
+                    )
+                )
+        headers.append(("Content-Length", str(len(byte_range))))
+
+        if environ["REQUEST_METHOD"] == "HEAD":
+            start_response(status, headers)
+            return []
+        if data is not None:
+            start_response(status, headers)
+            if len(byte_range) == len(data):
+                return [data]
+            return [memoryview(data)[byte_range.start : byte_range.stop]]
+        try:
+            handle = open(file.filename, "rb")
+        except OSError:
+            return self.respond(start_response, "404 Not Found")
+        start_response(status, headers)
+        handle.seek(byte_range.start)
+        # http.FileWrapper rather than wsgi.file_wrapper, since only it
+        # bounds the body to the range when it is not sent with sendfile
+        return http.FileWrapper(handle, self.block_size, length=len(byte_range))
+
+    def mounts(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+    def resolve(self, path: str) -> str | None:
+        path = urllib.parse.unquote(path)
+        if "\x00" in path:
+            return None
+        filename = os.path.realpath(os.path.join(self.directory, path.lstrip("/")))
+        if os.path.commonpath((self.directory, filename)) != self.directory:
+            return None
+        return filename
+
+    @staticmethod
+    def not_modified(environ: dict[str, Any], etag: str, mtime: int) -> bool:
+        if (if_none_match := environ.get("HTTP_IF_NONE_MATCH")) is not None:
+            return etag_matches(if_none_match, etag)
+        if (if_modified_since := environ.get("HTTP_IF_MODIFIED_SINCE")) is not None:
+            since = http_date_timestamp(if_modified_since)
+            return since is not None and mtime <= since
+        return False
+
+    @staticmethod
+    def range_applies(environ: dict[str, Any], etag: str, mtime: int) -> bool:
+        if (if_range := environ.get("HTTP_IF_RANGE")) is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', "W/")):
+            # If-Range needs a strong match
+            return if_range == etag
+        return http_date_timestamp(if_range) == mtime
+
+    @staticmethod
+    def respond(
+        start_response: StartResponse,
+        status: str,
+        headers: list[tuple[str, str]] | None = None,
+    ) -> Iterable[bytes]:
+        start_response(status, [*(headers or []), ("Content-Length", "0")])
+        return []
@@ -1,3 +1,7 @@
+from collections.abc import Callable, Iterable
 from types import TracebackType
+from typing import Any
 
 ExcInfo = tuple[type[BaseException] | None, BaseException | None, TracebackType | None]
+StartResponse = Callable[..., Callable[[bytes], None]]
+WSGIApplication = Callable[[dict[str, Any], StartResponse], Iterable[bytes]]
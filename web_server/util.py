@@ -2,6 +2,25 @@ import urllib.parse
 
 
 def split_request_uri(uri: str) -> urllib.parse.SplitResult:
+    # urlsplit strips tabs and newlines from anywhere in the uri, and C0
+    # controls or spaces from either end, so such targets are left to it.
+    if (
+        uri.startswith("/")
+        and uri[-1] > " "
+        and "\t" not in uri
+        and "\r" not in uri
+        and "\n" not in uri
+    ):
+        # origin-form, the common case: only the query and fragment need
+        # splitting off, the same way urlsplit does it.
+        path, _, fragment = uri.partition("#")
+        path, _, query = path.partition("?")
+        return urllib.parse.SplitResult("", "", path, query, fragment)
+
+    return urlsplit_request_uri(uri)
+
+
+def urlsplit_request_uri(uri: str) -> urllib.parse.SplitResult:
     if uri.startswith("//"):
         # When the path starts with //, urlsplit considers it as a
         # relative uri while the RFC says we should consider it as abs_path
@@ -1,4 +1,5 @@
 import errno
+import selectors
 import signal
 import socket
 from collections.abc import Callable, Iterable
@@ -6,7 +7,9 @@ from typing import Any
 
 from web_server import config, http, wsgi, connection
 from web_server.cycle import Cycle
-from web_server.errors import ParseException
+from web_server.errors import LimitRequestHeadersTotal, ParseException, WriteTimeout
+
+ACCEPT_TIMEOUT = 0.5
 
 
 class Worker:
@@ -23,17 +26,37 @@ class Worker:
             ],
             Iterable[bytes],
         ],
+        cfg: config.Config = config.Config.default(),
     ):
         self.app = app
+        # frozen, so every connection shares this one instance
+        self.cfg = cfg
         self.alive = True
         self.server_socket = server_socket
         self.server_socket.listen(socket.SOMAXCONN)
+        # accept() wakes up this often to notice a shutdown signal
+        self.server_socket.settimeout(ACCEPT_TIMEOUT)
+        # before any thread starts, so a signal never finds one half made
         self._setup_signals()
+        # one wsgi.errors for every request, flushed off the request path
+        self.error_stream = wsgi.BufferedErrorStream.with_stderr(cfg.env)
+        self.error_stream.start()
+        self.environ_template = wsgi.WSGIEnviron.template(
+            cfg=cfg,
+            server=self.server_socket.getsockname(),
+            errors=self.error_stream,
+        )
+        # shared by every connection, so repeated requests hit it across them
+        head_cache_size = cfg.message.request_head_cache_size
+        self.head_cache = (
+            http.RequestHeadCache(head_cache_size) if head_cache_size else None
+        )
 
     def _setup_signals(self) -> None:
         def shutdown_signal_handler(signum, frame):
-            print(f"Received signal {signum}, shutting down gracefully.")
-            self.shutdown()
+            # The handler may interrupt code holding a lock (the error
+            # stream's, or stdout's), so it only asks run() to stop.
+            self.alive = False
 
         signal.signal(signal.SIGINT, shutdown_signal_handler)
         signal.signal(signal.SIGTERM, shutdown_signal_handler)
@@ -44,6 +67,7 @@ class Worker:
         print("Worker shutting down...")
         self.alive = False
         self.server_socket.close()
+        self.error_stream.close()
 
     def run(self) -> None:
         print("Worker started.")
@@ -55,32 +79,88 @@ class Worker:
                 print("Server socket closed, shutting down gracefully.")
             else:
                 raise exc
+        finally:
+            self.shutdown()
 
     def listen(self) -> None:
-        conn, addr = self.server_socket.accept()
+        try:
+            conn, addr = self.server_socket.accept()
+        except TimeoutError:
+            return
         conn.setblocking(False)
         with conn:
-            cfg = config.Config.default()
-            parser = http.RequestParser(
-                cfg=cfg.message, socket_reader=http.SocketReader(sock=conn)
-            )
-            try:
-                req = next(parser.parse())
-                environ = wsgi.WSGIEnviron.build(
-                    cfg=cfg, server=conn.getsockname(), request=req
-                )
-                cycle = Cycle(
-                    conn=connection.Connection(sock=conn),
-                    environ=environ,
-                    app=self.app,
-                )
-                resp = cycle.handle_request()
-            except ParseException as exc:
-                resp = http.Response.bad_request(exc)
-            except BaseException as exc:
-                resp = http.Response.internal_server_error(exc)
-            finally:
-                if not cycle.headers_sent:
-                    conn.sendall(resp.headers_data())
-                    for chunk in resp.body_stream():
-                        conn.sendall(chunk)
+            self.handle(conn, addr)
+
+    def handle(self, conn: socket.socket, addr: Any) -> None:
+        # One set of per-connection objects serves every request on a
+        # keep-alive connection; they are reset between requests.
+        cfg = self.cfg
+        client = connection.Connection(
+            sock=conn, write_timeout=cfg.response.write_timeout
+        )
+        socket_reader = http.SocketReader(sock=conn)
+        parser = http.create_parser(
+            cfg=cfg.message, socket_reader=socket_reader, head_cache=self.head_cache
+        )
+        requests = parser.parse()
+        cycle = None
+        with selectors.DefaultSelector() as selector:
+            selector.register(conn, selectors.EVENT_READ)
+            # accept() returns as soon as the connection is made, often
+            # before the request has arrived on the non-blocking socket
+            if not selector.select(cfg.response.read_timeout):
+                return
+            while self.alive:
+                current = None
+                try:
+                    req = next(requests, None)
+                    if req is None:
+                        return
+                    environ = wsgi.WSGIEnviron.build(
+                        cfg=cfg, template=self.environ_template, request=req
+                    )
+                    if cycle is None:
+                        cycle = Cycle(
+                            conn=client,
+                            request=req,
+                            environ=environ,
+                            app=self.app,
+                            cfg=cfg.response,
+                        )
+                    else:
+                        cycle.reset(request=req, environ=environ)
+                    current = cycle
+                    resp = cycle.handle_request()
+                except (WriteTimeout, ConnectionError) as exc:
+                    print(f"{exc}, aborting connection from {addr}.")
+                    return
+                except LimitRequestHeadersTotal as exc:
+                    resp = http.Response.request_header_fields_too_large(exc)
+                except ParseException as exc:
+                    resp = http.Response.bad_request(exc)
+                except BaseException as exc:
+                    resp = http.Response.internal_server_error(exc)
+
+                try:
+                    if current is None or not current.headers_sent:
+                        client.write(resp.headers_data())
+                        if (file_range := resp.sendfile_range()) is not None:
+                            client.sendfile(*file_range)
+                        else:
+                            for buffers in resp.body_stream():
+                                client.writev(buffers)
+                except (WriteTimeout, ConnectionError) as exc:
+                    print(f"{exc}, aborting connection from {addr}.")
+                    return
+                finally:
+                    if current is not None:
+                        current.close()
+
+                if resp.headers.get("connection", "").lower() != "keep-alive":
+                    return
+                parser.reset(spare_body=req.body)
+                client.reset()
+                if not parser.has_pending and not selector.select(
+                    cfg.response.keepalive_timeout
+                ):
+                    return
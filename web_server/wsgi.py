@@ -2,11 +2,15 @@ import collections
 import dataclasses
 import io
 import sys
+import threading
 from collections.abc import Sequence
 from typing import IO, Self, Any
 
 from web_server import http, config
 
+# these two are passed as CONTENT_TYPE and CONTENT_LENGTH instead
+NON_HTTP_ENVIRON_KEYS = ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH")
+
 
 class WSGIErrorStream(io.RawIOBase):
     def __init__(self, sub_streams: list[IO[str]]):
@@ -60,107 +64,183 @@ class WSGIErrorStream(io.RawIOBase):
             pass
 
 
-@dataclasses.dataclass
+class BufferedErrorStream(io.RawIOBase):
+    # Writes only append to a buffer; a background thread passes it on to
+    # the sink every flush_interval seconds or when flush() asks for it.
+    def __init__(
+        self,
+        sink: WSGIErrorStream,
+        buffer_size: int = config.DEFAULT_ERROR_BUFFER_SIZE,
+        flush_interval: float | None = config.DEFAULT_ERROR_FLUSH_INTERVAL,
+        overflow: str = "drop-new",
+    ):
+        # pylint: disable=super-init-not-called
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        # number of characters lost to overflow
+        self.dropped = 0
+        self._buffer: collections.deque[str] = collections.deque()
+        self._buffered = 0
+        self._flush_requested = False
+        self._is_closed = False
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def with_stderr(cls, cfg: config.EnvConfig) -> Self:
+        return cls(
+            WSGIErrorStream.with_stderr(),
+            buffer_size=cfg.error_buffer_size,
+            flush_interval=cfg.error_flush_interval,
+            overflow=cfg.error_overflow,
+        )
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="wsgi-errors", daemon=True
+            )
+            self._thread.start()
+
+    def write(self, data: str) -> None:
+        if not data:
+            return
+        with self._cond:
+            self._append(data)
+
+    def writelines(self, seq: Sequence[str]) -> None:
+        with self._cond:
+            for line in seq:
+                self._append(line)
+
+    def flush(self) -> None:
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            if self._is_closed:
+                return
+            self._is_closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self._drain(self._take())
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _append(self, data: str) -> None:
+        if self._is_closed:
+            return
+        size = len(data)
+        if self._buffered + size > self.buffer_size:
+            if self.overflow == "drop-new" or size > self.buffer_size:
+                self.dropped += size
+                return
+            while self._buffered + size > self.buffer_size:
+                dropped = len(self._buffer.popleft())
+                self._buffered -= dropped
+                self.dropped += dropped
+        self._buffer.append(data)
+        self._buffered += size
+
+    def _take(self) -> str:
+        batch = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        return batch
+
+    def _drain(self, batch: str) -> None:
+        if batch:
+            self.sink.write(batch)
+            self.sink.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not (self._flush_requested or self._is_closed):
+                    self._cond.wait(self.flush_interval)
+                self._flush_requested = False
+                batch = self._take()
+                is_closed = self._is_closed
+            self._drain(batch)
+            if is_closed:
+                return
+
+
+@dataclasses.dataclass(slots=True)
 class WSGIEnviron:
+    base: dict[str, Any]
     request_method: str
-    script_name: str
     path_info: str
     query_string: str
     content_type: str | None
     content_length: str | None
-    server_name: str
-    server_port: str
     server_protocol: str
     http_headers: list[tuple[str, str]]
-    wsgi_version: tuple[int, int]
-    wsgi_url_scheme: str
     wsgi_input: http.RequestBody
-    wsgi_errors: WSGIErrorStream
-    wsgi_multithread: bool
-    wsgi_multiprocess: bool
-    wsgi_run_once: bool
-
-    @property
-    def http_request(self) -> http.Request:
-        headers = [
-            (name[5:].replace("_", "-").title(), value)
-            for name, value in self.http_headers
-        ]
-        if self.content_type is not None:
-            headers.append(("Content-Type", self.content_type))
-        if self.content_length is not None:
-            headers.append(("Content-Length", self.content_length))
-        return http.Request(
-            method=self.request_method,
-            path=f"{self.script_name}{self.path_info}",
-            query=self.query_string,
-            fragment="",
-            version=self.wsgi_version,
-            headers=headers,
-            body=self.wsgi_input,
-            trailers=[],
-        )
+
+    @classmethod
+    def template(
+        cls,
+        cfg: config.Config,
+        server: tuple[str, int],
+        errors: WSGIErrorStream | BufferedErrorStream,
+    ) -> dict[str, Any]:
+        # the keys that stay the same for every request on a listener
+        return {
+            "SCRIPT_NAME": cfg.env.script_name,
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": errors,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": http.FileWrapper,
+        }
 
     @classmethod
     def build(
-        cls, cfg: config.Config, server: tuple[str, str], request: http.Request
+        cls, cfg: config.Config, template: dict[str, Any], request: http.Request
     ) -> Self:
-        script_name, path_info = cfg.parse_path(request.path)
-        http_header_list = []
-        content_type = None
-        content_length = None
-        for name, value in request.headers:
-            uname = name.upper().replace("-", "_")
-            if uname == "CONTENT_TYPE":
-                content_type = value
-                continue
-            elif uname == "CONTENT_LENGTH":
-                content_length = value
-                continue
-            http_header_list.append((f"HTTP_{uname}", value))
-        http_headers_dict = collections.defaultdict(list)
-        for name, value in http_header_list:
-            http_headers_dict[name].append(value)
+        _, path_info = cfg.parse_path(request.path)
         http_headers = [
-            (name, ",".join(value)) for name, value in http_headers_dict.items()
+            (key, value)
+            for name, value in request.headers.combined()
+            if (key := http.environ_key(name)) not in NON_HTTP_ENVIRON_KEYS
         ]
         return cls(
+            base=template,
             request_method=request.method,
-            script_name=script_name,
             path_info=path_info,
             query_string=request.query,
             http_headers=http_headers,
-            server_name=server[0],
-            server_port=server[1],
             server_protocol=f"HTTP/{request.version[0]}.{request.version[1]}",
-            wsgi_version=request.version,
-            wsgi_url_scheme=request.url_scheme,
             wsgi_input=request.body,
-            wsgi_errors=WSGIErrorStream.with_stderr(),
-            wsgi_multithread=False,
-            wsgi_multiprocess=False,
-            wsgi_run_once=False,
-            content_type=content_type,
-            content_length=content_length,
+            content_type=request.headers.get("content-type"),
+            content_length=request.headers.get("content-length"),
         )
 
     def dict(self) -> dict[str, Any]:
-        base_environ = {
-            "REQUEST_METHOD": self.request_method,
-            "SCRIPT_NAME": self.script_name,
-            "PATH_INFO": self.path_info,
-            "QUERY_STRING": self.query_string,
-            "CONTENT_TYPE": self.content_type,
-            "CONTENT_LENGTH": self.content_length,
-            "SERVER_NAME": self.server_name,
-            "SERVER_PORT": self.server_port,
-            "SERVER_PROTOCOL": self.server_protocol,
-            "wsgi.version": self.wsgi_version,
-            "wsgi.url_scheme": self.wsgi_url_scheme,
-            "wsgi.input": self.wsgi_input,
-            "wsgi.errors": self.wsgi_errors,
-            "wsgi.multithread": self.wsgi_multithread,
-            "wsgi.multiprocess": self.wsgi_multiprocess,
-            "wsgi.run_once": self.wsgi_run_once,
-        }
-        return base_environ | {name: value for name, value in self.http_headers}
+        # a plain copy of the template, then assignments and one update,
+        # is cheaper than building two dicts and merging them
+        environ = self.base.copy()
+        environ["REQUEST_METHOD"] = self.request_method
+        environ["PATH_INFO"] = self.path_info
+        environ["QUERY_STRING"] = self.query_string
+        environ["CONTENT_TYPE"] = self.content_type
+        environ["CONTENT_LENGTH"] = self.content_length
+        environ["SERVER_PROTOCOL"] = self.server_protocol
+        environ["wsgi.input"] = self.wsgi_input
+        environ.update(self.http_headers)
+        return environ